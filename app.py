@@ -1,275 +1,458 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response
 import os
-import re
-import base64
 import io
-import pdfplumber
+import json
+import mimetypes
+import secrets
+import time
+from werkzeug.exceptions import RequestEntityTooLarge
+from datetime import datetime, timedelta, timezone
 from banking_itau import ItauOpenBanking
-
-# Import para PostgreSQL com fallback para SQLite
-try:
-    import psycopg2
-    from psycopg2.extras import RealDictCursor
-    POSTGRES_AVAILABLE = True
-    print("✅ PostgreSQL disponível")
-except ImportError:
-    POSTGRES_AVAILABLE = False
-    import sqlite3
-    print("ℹ️ Usando SQLite (PostgreSQL não disponível)")
+from database import (USE_POSTGRES, transaction, execute_query, pool_stats, column_types, row_to_dict,
+                      stream_query)
+from resumo import calcular_resumo, intervalo_datas, filtro_datas
+from cache_respostas import resposta_em_cache
+from previsao import obter_previsao
+from versoes import criar_tabela_versoes
+from relatorios import gerar_relatorio, texto_relatorio, JANELA_PADRAO
+from importacao_itau import (criar_tabelas_importacao, importar_lote, obter_sync_estado,
+                             atualizar_sync_estado)
+from categorizacao import (criar_tabela_regras, categorizar_lote, listar_regras,
+                           salvar_regra, remover_regra)
+from modelo_categorias import criar_tabela_modelos, treinar_modelo, sugerir_categoria, sugerir_categorias
+from armazenamento import (criar_colunas_arquivos, receber_stream, guardar_recebido, caminho, existe,
+                           decodificar_blob, remover_se_orfao, migrar_blobs, ArquivoMuitoGrande,
+                           TAMANHO_MAXIMO_UPLOAD)
+from extrator_pdf import criar_tabela_extracoes, extrair, resultado_em_cache, iterar_extrato
+from intencoes_chat import interpretar
+from busca import criar_indice_busca, buscar, TABELAS_BUSCA
+from tokens_bancarios import TokenCache, criar_tabela_tokens
+from tarefas import (criar_tabela_tarefas, tarefa, enfileirar, em_andamento, obter as obter_tarefa,
+                     executar_worker, iniciar_worker_embutido)
+from saldos import (criar_tabela_saldos, registrar_movimento, registrar_movimentos, remover_movimentos,
+                    definir_fixa, reconciliar_saldos)
 
 app = Flask(__name__)
 
-# =============================================
-# CONFIGURAÇÃO PARA POSTGRESQL NO RENDER
-# =============================================
-DATABASE_URL = os.environ.get('DATABASE_URL')
-
-def get_db_connection():
-    """Conecta com PostgreSQL ou SQLite como fallback"""
-    if DATABASE_URL and POSTGRES_AVAILABLE:
-        # PostgreSQL no Render
-        conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-        conn.cursor_factory = RealDictCursor
-        return conn
+# Limite do corpo da requisição: o arquivo mais uma folga para os campos do formulário
+app.config['MAX_CONTENT_LENGTH'] = TAMANHO_MAXIMO_UPLOAD + 1024 * 1024
+
+def migrar_coluna_data(tx, tabela):
+    """Converte `data` de TEXT para TIMESTAMP (PostgreSQL) e descarta datas vazias"""
+    if USE_POSTGRES:
+        if column_types(tx, tabela).get('data') == 'text':
+            tx.execute(f'ALTER TABLE {tabela} ALTER COLUMN data DROP DEFAULT')
+            tx.execute(f"""ALTER TABLE {tabela} ALTER COLUMN data TYPE TIMESTAMP
+                           USING NULLIF(data, '')::timestamp""")
+            tx.execute(f'ALTER TABLE {tabela} ALTER COLUMN data SET DEFAULT CURRENT_TIMESTAMP')
+            print(f"✅ Coluna data de {tabela} convertida para TIMESTAMP")
     else:
-        # SQLite local (fallback)
-        import sqlite3
-        db_file = os.path.join(os.path.dirname(__file__), 'financas.db')
-        conn = sqlite3.connect(db_file)
-        conn.row_factory = sqlite3.Row
-        return conn
-
-def execute_query(query, params=()):
-    """Executa query de forma compatível com ambos os bancos"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Ajusta a query para PostgreSQL se necessário
-        if DATABASE_URL and POSTGRES_AVAILABLE:
-            query = query.replace('?', '%s')
-            query = query.replace('INSERT OR REPLACE', 'INSERT')
-            query = query.replace('BLOB', 'BYTEA')
-        
-        cursor.execute(query, params)
-        
-        if query.strip().upper().startswith('SELECT'):
-            result = cursor.fetchall()
-        else:
-            conn.commit()
-            result = cursor.rowcount
-            
-        return result
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+        # No SQLite as datas ficam em texto ISO (YYYY-MM-DD HH:MM:SS), que ordena corretamente
+        tx.execute(f"UPDATE {tabela} SET data = NULL WHERE data = ''")
+
+def migrar_ids_sqlite(tx, tabela):
+    """Tabelas SQLite antigas declaravam `id SERIAL`, que o SQLite nunca preenche"""
+    if USE_POSTGRES or column_types(tx, tabela).get('id') != 'serial':
+        return
+
+    ddl = tx.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                     (tabela,))[0]['sql']
+    ddl = ddl.replace(tabela, f'{tabela}_nova', 1).replace('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+    colunas = ', '.join(coluna for coluna in column_types(tx, tabela) if coluna != 'id')
+
+    tx.execute(ddl)
+    tx.execute(f'INSERT INTO {tabela}_nova (id, {colunas}) SELECT rowid, {colunas} FROM {tabela} ORDER BY rowid')
+    tx.execute(f'DROP TABLE {tabela}')
+    tx.execute(f'ALTER TABLE {tabela}_nova RENAME TO {tabela}')
+    print(f"✅ Ids da tabela {tabela} preenchidos")
 
 def init_db():
     """Inicializa todas as tabelas do banco"""
     try:
-        conn = get_db_connection()
-        # Tabela de entradas
-        execute_query('''CREATE TABLE IF NOT EXISTS entradas(
-            id SERIAL PRIMARY KEY,
-            descricao TEXT,
-            valor REAL,
-            data TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
-
-        # Tabela de gastos
-        execute_query('''CREATE TABLE IF NOT EXISTS gastos(
-            id SERIAL PRIMARY KEY,
-            descricao TEXT,
-            categoria TEXT,
-            valor REAL,
-            data TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
-
-        # Tabela de dívidas
-        execute_query('''CREATE TABLE IF NOT EXISTS dividas(
-            id SERIAL PRIMARY KEY,
-            descricao TEXT,
-            valor REAL,
-            vencimento TEXT,
-            data TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
-
-        # Tabela de fixas
-        execute_query('''CREATE TABLE IF NOT EXISTS fixas(
-            id SERIAL PRIMARY KEY,
-            nome TEXT UNIQUE,
-            valor REAL
-        )''')
-
-        # TABELA PARA COMPROVANTES
-        execute_query('''CREATE TABLE IF NOT EXISTS comprovantes(
-            id SERIAL PRIMARY KEY,
-            tipo TEXT,
-            descricao TEXT,
-            mes_ano TEXT,
-            arquivo_nome TEXT,
-            arquivo_dados BYTEA,
-            data_upload TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
-
-        # TABELA PARA CONTRACHEQUES
-        execute_query('''CREATE TABLE IF NOT EXISTS contracheques(
-            id SERIAL PRIMARY KEY,
-            mes TEXT,
-            arquivo_nome TEXT,
-            arquivo_dados BYTEA,
-            data_upload TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
+        with transaction() as tx:
+            # Tabela de entradas
+            tx.execute('''CREATE TABLE IF NOT EXISTS entradas(
+                id SERIAL PRIMARY KEY,
+                descricao TEXT,
+                valor REAL,
+                data TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''')
+
+            # Tabela de gastos
+            tx.execute('''CREATE TABLE IF NOT EXISTS gastos(
+                id SERIAL PRIMARY KEY,
+                descricao TEXT,
+                categoria TEXT,
+                valor REAL,
+                data TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''')
+
+            # Tabela de dívidas
+            tx.execute('''CREATE TABLE IF NOT EXISTS dividas(
+                id SERIAL PRIMARY KEY,
+                descricao TEXT,
+                valor REAL,
+                vencimento TEXT,
+                data TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''')
+
+            # Tabela de fixas
+            tx.execute('''CREATE TABLE IF NOT EXISTS fixas(
+                id SERIAL PRIMARY KEY,
+                nome TEXT UNIQUE,
+                valor REAL
+            )''')
+
+            # TABELA PARA COMPROVANTES
+            tx.execute('''CREATE TABLE IF NOT EXISTS comprovantes(
+                id SERIAL PRIMARY KEY,
+                tipo TEXT,
+                descricao TEXT,
+                mes_ano TEXT,
+                arquivo_nome TEXT,
+                arquivo_dados BYTEA,
+                data_upload TEXT DEFAULT CURRENT_TIMESTAMP
+            )''')
+
+            # TABELA PARA CONTRACHEQUES
+            tx.execute('''CREATE TABLE IF NOT EXISTS contracheques(
+                id SERIAL PRIMARY KEY,
+                mes TEXT,
+                arquivo_nome TEXT,
+                arquivo_dados BYTEA,
+                data_upload TEXT DEFAULT CURRENT_TIMESTAMP
+            )''')
+
+            # TABELA PARA TOKENS BANCÁRIOS
+            tx.execute('''CREATE TABLE IF NOT EXISTS bancos_tokens(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                banco TEXT,
+                access_token TEXT,
+                expires_at TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )''')
+
+            for tabela in ('entradas', 'gastos', 'dividas', 'fixas', 'comprovantes', 'contracheques'):
+                migrar_ids_sqlite(tx, tabela)
+
+            # Datas ordenáveis e índices para os filtros por período
+            for tabela in ('entradas', 'gastos', 'dividas'):
+                migrar_coluna_data(tx, tabela)
+                tx.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_data ON {tabela}(data)')
+            tx.execute('CREATE INDEX IF NOT EXISTS idx_gastos_categoria ON gastos(categoria)')
+
+            # Índice de busca textual nas descrições (busca e exclusão pelo chat)
+            criar_indice_busca(tx)
+
+            # Itens mostrados na prévia de uma exclusão pelo chat, até a confirmação
+            tx.execute('''CREATE TABLE IF NOT EXISTS delecoes_pendentes(
+                codigo TEXT PRIMARY KEY,
+                termo TEXT,
+                itens TEXT NOT NULL,
+                criado_em TEXT NOT NULL
+            )''')
+
+            # Arquivos ficam em disco; as tabelas guardam só hash e tamanho
+            criar_colunas_arquivos(tx)
+            criar_tabela_extracoes(tx)
+
+            # Palavras-chave da categorização automática
+            criar_tabela_regras(tx)
+            criar_tabela_modelos(tx)
+
+            # Fila de tarefas em segundo plano
+            criar_tabela_tarefas(tx)
+
+            # refresh_token e índice da tabela de tokens
+            criar_tabela_tokens(tx)
+
+            # Chave natural das transações importadas e estado da sincronização
+            criar_tabelas_importacao(tx)
+
+            # Versão de cada tabela, para os caches invalidarem só quando os dados mudam
+            criar_tabela_versoes(tx)
+
+            # Agregados materializados usados pelo /consultar
+            criar_tabela_saldos(tx)
+            saldos_vazio = tx.execute('SELECT COUNT(*) AS linhas FROM saldos')[0]['linhas'] == 0
+
+        if saldos_vazio:
+            reconciliar_saldos()
 
         print("✅ Banco inicializado com sucesso!")
-        if DATABASE_URL:
+        if USE_POSTGRES:
             print("📊 Usando PostgreSQL no Render")
         else:
             print("💾 Usando SQLite local")
-            
-    except Exception as e:
-        print(f"❌ Erro ao criar banco: {e}")
-    # NOVA TABELA PARA TOKENS BANCÁRIOS
-    conn.execute('''CREATE TABLE IF NOT EXISTS bancos_tokens(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            banco TEXT,
-            access_token TEXT,
-            expires_at TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )''')
-        
-        conn.commit()
-        conn.close()
-        print("✅ Banco inicializado com tabela de tokens bancários!")
+
     except Exception as e:
         print(f"❌ Erro ao criar banco: {e}")
+
 # Inicializar banco ao iniciar
 init_db()
 
 # =============================================
 # FUNÇÕES OTIMIZADAS (COMPATÍVEIS COM AMBOS)
 # =============================================
-def adicionar_entrada(desc, valor):
+def agora_utc():
+    """Mesmo valor que o DEFAULT CURRENT_TIMESTAMP das colunas `data`"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def adicionar_entradas(itens):
+    """Insere várias entradas ({descricao, valor, data?}) numa única transação"""
+    agora = agora_utc()
+    linhas = [(item['descricao'], item['valor'], item.get('data') or agora) for item in itens]
+    with transaction() as tx:
+        tx.executemany('INSERT INTO entradas (descricao, valor, data) VALUES (?, ?, ?)', linhas)
+        registrar_movimentos(tx, 'entradas', [(None, data, valor) for _, valor, data in linhas])
+    return len(linhas)
+
+def adicionar_gastos(itens):
+    """Insere vários gastos ({descricao, categoria, valor, data?}) numa única transação"""
+    agora = agora_utc()
+    linhas = [(item['descricao'], item['categoria'], item['valor'], item.get('data') or agora) for item in itens]
+    with transaction() as tx:
+        tx.executemany('INSERT INTO gastos (descricao, categoria, valor, data) VALUES (?, ?, ?, ?)', linhas)
+        registrar_movimentos(tx, 'gastos', [(categoria, data, valor) for _, categoria, valor, data in linhas])
+    return len(linhas)
+
+def adicionar_dividas(itens):
+    """Insere várias dívidas ({descricao, valor, vencimento?, data?}) numa única transação"""
+    agora = agora_utc()
+    linhas = [(item['descricao'], item['valor'], item.get('vencimento') or '', item.get('data') or agora)
+              for item in itens]
+    with transaction() as tx:
+        tx.executemany('INSERT INTO dividas (descricao, valor, vencimento, data) VALUES (?, ?, ?, ?)', linhas)
+        registrar_movimentos(tx, 'dividas', [(None, data, valor) for _, valor, _, data in linhas])
+    return len(linhas)
+
+def adicionar_entrada(desc, valor, data=None):
     try:
-        execute_query('INSERT INTO entradas (descricao, valor) VALUES (?, ?)', (desc, valor))
+        adicionar_entradas([{'descricao': desc, 'valor': valor, 'data': data}])
         print(f"✅ Entrada adicionada: {desc} - R${valor}")
         return True
     except Exception as e:
         print(f"❌ Erro ao adicionar entrada: {e}")
         return False
 
-def adicionar_gasto(desc, cat, valor):
+def adicionar_gasto(desc, cat, valor, data=None):
     try:
-        execute_query('INSERT INTO gastos (descricao, categoria, valor) VALUES (?, ?, ?)', (desc, cat, valor))
+        adicionar_gastos([{'descricao': desc, 'categoria': cat, 'valor': valor, 'data': data}])
         print(f"✅ Gasto adicionado: {desc} - {cat} - R${valor}")
         return True
     except Exception as e:
         print(f"❌ Erro ao adicionar gasto: {e}")
         return False
 
-def excluir_entrada_completa(desc):
-    try:
-        deleted = execute_query('DELETE FROM entradas WHERE descricao LIKE ?', (f'%{desc}%',))
-        if deleted > 0:
-            print(f"✅ {deleted} entrada(s) deletada(s): {desc}")
-            return True
-        else:
-            print(f"❌ Entrada não encontrada: {desc}")
-            return False
-    except Exception as e:
-        print(f"❌ Erro ao deletar entrada: {e}")
-        return False
-
-def excluir_gasto_completo(desc):
-    try:
-        deleted = execute_query('DELETE FROM gastos WHERE descricao LIKE ?', (f'%{desc}%',))
-        if deleted > 0:
-            print(f"✅ {deleted} gasto(s) deletado(s): {desc}")
-            return True
-        else:
-            print(f"❌ Gasto não encontrado: {desc}")
-            return False
-    except Exception as e:
-        print(f"❌ Erro ao deletar gasto: {e}")
-        return False
-
-def excluir_divida_completa(desc):
-    try:
-        deleted = execute_query('DELETE FROM dividas WHERE descricao LIKE ?', (f'%{desc}%',))
-        if deleted > 0:
-            print(f"✅ {deleted} dívida(s) deletada(s): {desc}")
-            return True
-        else:
-            print(f"❌ Dívida não encontrada: {desc}")
-            return False
-    except Exception as e:
-        print(f"❌ Erro ao deletar dívida: {e}")
-        return False
+def excluir_itens(itens):
+    """Exclui os itens (tabela, id) encontrados pela busca, numa única transação"""
+    ids_por_tabela = {}
+    for item in itens:
+        ids_por_tabela.setdefault(item['tabela'], []).append(item['id'])
+
+    excluidos = 0
+    with transaction() as tx:
+        for tabela, ids in ids_por_tabela.items():
+            marcadores = ', '.join('?' * len(ids))
+            remover_movimentos(tx, tabela, f'id IN ({marcadores})', tuple(ids))
+            excluidos += tx.execute(f'DELETE FROM {tabela} WHERE id IN ({marcadores})', tuple(ids))
+    print(f"✅ {excluidos} item(ns) excluído(s)")
+    return excluidos
 
 # =============================================
 # FUNÇÕES DOS COMPROVANTES (OTIMIZADAS)
 # =============================================
-def salvar_comprovante(tipo, descricao, mes_ano, arquivo_nome, arquivo_dados):
+def registrar_arquivo(tabela, campos, arquivo):
+    """Grava o arquivo em disco (em blocos, calculando o hash) e insere a linha; retorna o id"""
+    recebido = receber_stream(arquivo, TAMANHO_MAXIMO_UPLOAD)
     try:
-        execute_query('''INSERT INTO comprovantes
-                    (tipo, descricao, mes_ano, arquivo_nome, arquivo_dados)
-                    VALUES (?, ?, ?, ?, ?)''',
-                 (tipo, descricao, mes_ano, arquivo_nome, arquivo_dados))
-        print(f"✅ Comprovante salvo: {descricao} - {mes_ano}")
-        return True
-    except Exception as e:
-        print(f"❌ Erro ao salvar comprovante: {e}")
-        return False
+        # Arquivo e linha na mesma transação, com o hash travado contra remover_se_orfao()
+        with transaction() as tx:
+            arquivo_hash, arquivo_tamanho = guardar_recebido(tx, recebido)
+            campos = dict(campos, arquivo_hash=arquivo_hash, arquivo_tamanho=arquivo_tamanho)
+            return tx.insert(f'''INSERT INTO {tabela} ({', '.join(campos)})
+                                 VALUES ({', '.join('?' * len(campos))})''', tuple(campos.values()))
+    except Exception:
+        remover_se_orfao(recebido[1])
+        raise
+
+def salvar_comprovante(tipo, descricao, mes_ano, arquivo_nome, arquivo):
+    comprovante_id = registrar_arquivo('comprovantes', {
+        'tipo': tipo, 'descricao': descricao, 'mes_ano': mes_ano, 'arquivo_nome': arquivo_nome
+    }, arquivo)
+    print(f"✅ Comprovante salvo: {descricao} - {mes_ano}")
+    return comprovante_id
+
+def salvar_contracheque(mes, arquivo_nome, arquivo):
+    contracheque_id = registrar_arquivo('contracheques', {'mes': mes, 'arquivo_nome': arquivo_nome}, arquivo)
+    print(f"✅ Contracheque salvo: {mes}")
+    return contracheque_id
 
 def listar_comprovantes(mes_ano=None):
     try:
         if mes_ano and mes_ano != 'todos':
-            comprovantes = execute_query('''SELECT id, tipo, descricao, mes_ano, arquivo_nome, data_upload
+            comprovantes = execute_query('''SELECT id, tipo, descricao, mes_ano, arquivo_nome, arquivo_tamanho,
+                               data_upload
                         FROM comprovantes WHERE mes_ano = ? ORDER BY data_upload DESC''', (mes_ano,))
         else:
-            comprovantes = execute_query('''SELECT id, tipo, descricao, mes_ano, arquivo_nome, data_upload
+            comprovantes = execute_query('''SELECT id, tipo, descricao, mes_ano, arquivo_nome, arquivo_tamanho,
+                               data_upload
                         FROM comprovantes ORDER BY data_upload DESC''')
         
-        return [dict(row) for row in comprovantes]
+        return [row_to_dict(row) for row in comprovantes]
     except Exception as e:
         print(f"❌ Erro ao listar compprovantes: {e}")
         return []
 
+@tarefa('extrair_contracheque')
+def extrair_contracheque_tarefa(progresso, contracheque_id, criar_entrada=False):
+    """Extrai bruto/líquido/descontos do PDF e, se pedido, lança o líquido como entrada"""
+    linhas = execute_query('SELECT mes, arquivo_hash FROM contracheques WHERE id = ?', (contracheque_id,))
+    if not linhas or not linhas[0]['arquivo_hash']:
+        raise RuntimeError(f'Contracheque {contracheque_id} não encontrado')
+    mes, arquivo_hash = linhas[0]['mes'], linhas[0]['arquivo_hash']
+
+    progresso.atualizar(0, total=1, mensagem='Lendo PDF', forcar=True)
+    analise = extrair(arquivo_hash, caminho(arquivo_hash), 'contracheque')
+    progresso.atualizar(1, mensagem='PDF analisado', forcar=True)
+
+    if criar_entrada and analise.get('valor_liquido'):
+        valor = analise['valor_liquido']
+        data = f"{analise['data_detectada']}-01" if analise.get('data_detectada') else agora_utc()
+        with transaction() as tx:
+            # A chave pelo hash impede lançar o mesmo contracheque duas vezes
+            inseridas = tx.execute('''INSERT INTO entradas (descricao, valor, data, chave_externa)
+                                      VALUES (?, ?, ?, ?)
+                                      ON CONFLICT (chave_externa) DO NOTHING''',
+                                   (f'💰 Salário ({mes})', valor, data, f'contracheque:{arquivo_hash}'))
+            if inseridas:
+                registrar_movimento(tx, 'entradas', None, data, valor)
+        analise = dict(analise, entrada_criada=bool(inseridas))
+
+    return analise
+
+def listar_contracheques(mes=None):
+    try:
+        if mes and mes != 'todos':
+            contracheques = execute_query('''SELECT id, mes, arquivo_nome, arquivo_tamanho, data_upload
+                        FROM contracheques WHERE mes = ? ORDER BY data_upload DESC''', (mes,))
+        else:
+            contracheques = execute_query('''SELECT id, mes, arquivo_nome, arquivo_tamanho, data_upload
+                        FROM contracheques ORDER BY data_upload DESC''')
+
+        return [row_to_dict(row) for row in contracheques]
+    except Exception as e:
+        print(f"❌ Erro ao listar contracheques: {e}")
+        return []
+
+def excluir_contracheque(contracheque_id):
+    with transaction() as tx:
+        linhas = tx.execute('SELECT arquivo_hash FROM contracheques WHERE id = ?', (contracheque_id,))
+        if not linhas:
+            return False
+        tx.execute('DELETE FROM contracheques WHERE id = ?', (contracheque_id,))
+    # Fora da transação: o arquivo só sai do disco depois que a exclusão foi confirmada
+    remover_se_orfao(linhas[0]['arquivo_hash'])
+    print(f"✅ Contracheque {contracheque_id} excluído")
+    return True
+
+def enviar_arquivo(tabela, linha_id, como_anexo=True):
+    """Resposta com o arquivo de um comprovante/contracheque, com suporte a Range e ETag"""
+    linhas = execute_query(f'SELECT arquivo_nome, arquivo_hash FROM {tabela} WHERE id = ?', (linha_id,))
+    if not linhas:
+        return jsonify({'error': 'Arquivo não encontrado'}), 404
+    arquivo_nome, arquivo_hash = linhas[0]['arquivo_nome'] or 'arquivo', linhas[0]['arquivo_hash']
+    mimetype = mimetypes.guess_type(arquivo_nome)[0] or 'application/octet-stream'
+
+    if arquivo_hash:
+        if not existe(arquivo_hash):
+            return jsonify({'error': 'Arquivo ausente no armazenamento'}), 404
+        # O conteúdo nunca muda para o mesmo hash: o navegador pode guardar em cache
+        return send_file(caminho(arquivo_hash), mimetype=mimetype, as_attachment=como_anexo,
+                         download_name=arquivo_nome, conditional=True, etag=arquivo_hash,
+                         max_age=31536000)
+
+    # Linha ainda não migrada (flask migrar-arquivos): serve o blob do banco
+    blob = execute_query(f'SELECT arquivo_dados FROM {tabela} WHERE id = ?', (linha_id,))[0]['arquivo_dados']
+    if blob is None:
+        return jsonify({'error': 'Arquivo não encontrado'}), 404
+    return send_file(io.BytesIO(decodificar_blob(blob)), mimetype=mimetype, as_attachment=como_anexo,
+                     download_name=arquivo_nome, conditional=True)
+
 # =============================================
 # FUNÇÕES DA IA SIMPLES (OTIMIZADAS)
 # =============================================
-def processar_delecao_simples(msg):
+# Exclusões pelo chat: quantos itens aparecem na prévia e o máximo apagado de uma vez
+PREVIA_DELECAO = 10
+LIMITE_DELECAO = 50
+
+# Por quanto tempo (segundos) uma prévia de exclusão pode ser confirmada
+VALIDADE_DELECAO = int(os.environ.get('CHAT_VALIDADE_DELECAO', 600))
+
+def guardar_previa_delecao(termo, itens):
+    """Guarda os itens (tabela, id) mostrados na prévia e retorna o código da confirmação"""
+    limite = (datetime.now(timezone.utc) - timedelta(seconds=VALIDADE_DELECAO)).strftime('%Y-%m-%d %H:%M:%S')
+    codigo = secrets.token_hex(4)
+    with transaction() as tx:
+        tx.execute('DELETE FROM delecoes_pendentes WHERE criado_em < ?', (limite,))
+        tx.execute('''INSERT INTO delecoes_pendentes (codigo, termo, itens, criado_em) VALUES (?, ?, ?, ?)''',
+                   (codigo, termo, json.dumps([[item['tabela'], item['id']] for item in itens]), agora_utc()))
+    return codigo
+
+def confirmar_delecao(codigo):
+    """Exclui exatamente os itens da prévia `codigo`; retorna (termo, excluídos) ou None se expirou"""
+    limite = (datetime.now(timezone.utc) - timedelta(seconds=VALIDADE_DELECAO)).strftime('%Y-%m-%d %H:%M:%S')
+    with transaction() as tx:
+        linhas = tx.execute('''SELECT termo, itens FROM delecoes_pendentes
+                               WHERE codigo = ? AND criado_em >= ?''', (codigo, limite))
+        if not linhas or not tx.execute('DELETE FROM delecoes_pendentes WHERE codigo = ?', (codigo,)):
+            return None
+        itens = [{'tabela': tabela, 'id': item_id} for tabela, item_id in json.loads(linhas[0]['itens'])]
+        return linhas[0]['termo'], excluir_itens(itens)
+
+def descrever_item(item):
+    nomes = {'entradas': '📥 Entrada', 'gastos': '📤 Gasto', 'dividas': '💳 Dívida'}
+    data = str(item['data'] or '')[:10]
+    return f"{nomes[item['tabela']]}: {item['descricao']} - R$ {float(item['valor'] or 0):.2f} ({data})"
+
+def processar_delecao_simples(descricao, confirmado=False):
+    """Mostra os itens que casam com o termo; só apaga com "confirmar delete <código da prévia>"."""
     try:
-        palavras_delecao = ['delete', 'deletar', 'remover', 'apagar', 'excluir']
-        descricao = msg.lower()
+        if confirmado:
+            confirmacao = confirmar_delecao(descricao.strip())
+            if confirmacao is None:
+                return f'❌ Confirmação "{descricao}" inválida ou expirada. Envie "delete <item>" de novo.'
+            termo, excluidos = confirmacao
+            return f'✅ {excluidos} item(ns) contendo "{termo}" removido(s)!'
 
-        for palavra in palavras_delecao:
-            descricao = descricao.replace(palavra, '').strip()
+        if not descricao:
+            return '❌ Diga o que deletar, ex.: "delete uber"'
 
         print(f"🔍 Procurando para deletar: '{descricao}'")
+        candidatos = buscar(descricao, limite=LIMITE_DELECAO + 1)
 
-        sucesso_entrada = excluir_entrada_completa(descricao)
-        sucesso_gasto = excluir_gasto_completo(descricao)
-        sucesso_divida = excluir_divida_completa(descricao)
-
-        if sucesso_entrada or sucesso_gasto or sucesso_divida:
-            return f'✅ Item contendo "{descricao}" foi removido!'
-        else:
+        if not candidatos:
             return f'❌ Não encontrei nenhum item com "{descricao}"'
+        if len(candidatos) > LIMITE_DELECAO:
+            return (f'⚠️ Mais de {LIMITE_DELECAO} itens contêm "{descricao}". '
+                    f'Use um termo mais específico.')
+
+        # Só os itens desta prévia podem ser apagados na confirmação
+        codigo = guardar_previa_delecao(descricao, candidatos)
+        linhas = '\n'.join(descrever_item(item) for item in candidatos[:PREVIA_DELECAO])
+        if len(candidatos) > PREVIA_DELECAO:
+            linhas += f'\n... e mais {len(candidatos) - PREVIA_DELECAO}'
+        return (f'🔍 Encontrei {len(candidatos)} item(ns) com "{descricao}":\n\n{linhas}\n\n'
+                f'Para apagar, envie: confirmar delete {codigo}')
     except Exception as e:
         return f'❌ Erro ao deletar: {str(e)}'
 
 def gerar_analise_simples():
     try:
-        entradas = execute_query('SELECT COALESCE(SUM(valor), 0) FROM entradas')[0][0] or 0
-        gastos = execute_query('SELECT COALESCE(SUM(valor), 0) FROM gastos')[0][0] or 0
-        fixas = execute_query('SELECT COALESCE(SUM(valor), 0) FROM fixas')[0][0] or 0
-        dividas = execute_query('SELECT COALESCE(SUM(valor), 0) FROM dividas')[0][0] or 0
-
-        total_gastos = gastos + fixas
-        saldo = entradas - total_gastos
+        resumo = calcular_resumo()
+        entradas = resumo['entradas']
+        total_gastos = resumo['total_gastos']
+        saldo = resumo['saldo']
 
         if saldo > 0:
             return f"💰 **Situação Positiva!**\n\n📥 Entradas: R$ {entradas:.2f}\n📤 Gastos: R$ {total_gastos:.2f}\n✅ Saldo: R$ {saldo:.2f}"
@@ -306,7 +489,8 @@ def add_gasto():
     try:
         data = request.get_json()
         descricao = data['descricao']
-        categoria = data.get('categoria', 'outros')
+        # Sem categoria informada, usa as regras e o modelo de categorização automática
+        categoria = data.get('categoria') or sugerir_categoria(descricao)
         valor = float(data['valor'])
 
         if adicionar_gasto(descricao, categoria, valor):
@@ -324,17 +508,120 @@ def add_divida():
         valor = float(data['valor'])
         vencimento = data.get('vencimento', '')
 
-        conn = get_db_connection()
-        conn.execute('INSERT INTO dividas (descricao, valor, vencimento) VALUES (?, ?, ?)',
-                   (descricao, valor, vencimento))
-        conn.commit()
-        conn.close()
+        adicionar_dividas([{'descricao': descricao, 'valor': valor, 'vencimento': vencimento}])
 
         return jsonify({'ok': True, 'message': 'Dívida adicionada'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Máximo de itens por requisição nos endpoints em lote
+LIMITE_LOTE = int(os.environ.get('LIMITE_LOTE', 1000))
+
+# Formatos aceitos para `data` nos lotes (o primeiro é o gravado para datas sem hora)
+FORMATOS_DATA_LOTE = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M')
+
+def normalizar_data_lote(texto):
+    """'2026-01-05' ou '2026-01-05[ T]10:30[:00]' -> 'YYYY-MM-DD[ HH:MM:SS]'; ValueError se inválida.
+
+    Só aceita o valor exato no formato (sem sobras e com zeros à esquerda), para que
+    SUBSTR(data, 1, 7) seja sempre o mês usado nos agregados de saldos.
+    """
+    texto = texto.strip().replace('T', ' ', 1)
+    for formato in FORMATOS_DATA_LOTE:
+        try:
+            data = datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+        if data.strftime(formato) == texto:
+            return data.strftime('%Y-%m-%d' if formato == '%Y-%m-%d' else '%Y-%m-%d %H:%M:%S')
+    raise ValueError('data deve estar no formato YYYY-MM-DD ou YYYY-MM-DD HH:MM:SS')
+
+def validar_item_lote(item, campos_texto=()):
+    """Normaliza um item do lote; levanta ValueError com a mensagem para o cliente"""
+    if not isinstance(item, dict):
+        raise ValueError('Item deve ser um objeto')
+    descricao = str(item.get('descricao') or '').strip()
+    if not descricao:
+        raise ValueError('descricao é obrigatória')
+    try:
+        valor = float(item['valor'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('valor inválido')
+    if valor != valor or valor in (float('inf'), float('-inf')):
+        raise ValueError('valor inválido')
+
+    normalizado = {'descricao': descricao, 'valor': valor}
+    if item.get('data'):
+        normalizado['data'] = normalizar_data_lote(str(item['data']))
+    for campo in campos_texto:
+        if item.get(campo) is not None:
+            normalizado[campo] = str(item[campo]).strip()
+    return normalizado
+
+def processar_lote(inserir, campos_texto=(), preparar=None):
+    """Valida os itens da requisição, insere os válidos de uma vez e devolve o resultado de cada um.
+
+    Aceita uma lista JSON ou {"itens": [...]}. Itens inválidos não impedem a
+    gravação dos demais; a lista `resultados` segue a ordem enviada.
+    """
+    corpo = request.get_json(silent=True)
+    itens = corpo.get('itens') if isinstance(corpo, dict) else corpo
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'error': 'Envie uma lista de itens'}), 400
+    if len(itens) > LIMITE_LOTE:
+        return jsonify({'error': f'Máximo de {LIMITE_LOTE} itens por requisição'}), 413
+
+    resultados, validos = [], []
+    for indice, item in enumerate(itens):
+        try:
+            validos.append(validar_item_lote(item, campos_texto))
+            resultados.append({'indice': indice, 'ok': True})
+        except ValueError as e:
+            resultados.append({'indice': indice, 'ok': False, 'error': str(e)})
+
+    if not validos:
+        return jsonify({'ok': False, 'inseridos': 0, 'erros': len(itens), 'resultados': resultados}), 400
+
+    if preparar:
+        preparar(validos)
+    inserir(validos)
+    print(f"✅ Lote gravado: {len(validos)} item(ns), {len(itens) - len(validos)} com erro")
+    return jsonify({
+        'ok': len(validos) == len(itens),
+        'inseridos': len(validos),
+        'erros': len(itens) - len(validos),
+        'resultados': resultados
+    })
+
+def categorizar_itens(itens):
+    """Preenche a categoria dos gastos que vieram sem ela, em uma única chamada ao modelo"""
+    sem_categoria = [item for item in itens if not item.get('categoria')]
+    for item, categoria in zip(sem_categoria, sugerir_categorias([item['descricao'] for item in sem_categoria])):
+        item['categoria'] = categoria
+
+@app.route('/add_entradas', methods=['POST'])
+def add_entradas():
+    try:
+        return processar_lote(adicionar_entradas)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/add_gastos', methods=['POST'])
+def add_gastos():
+    try:
+        return processar_lote(adicionar_gastos, campos_texto=('categoria',), preparar=categorizar_itens)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/add_dividas', methods=['POST'])
+def add_dividas():
+    try:
+        return processar_lote(adicionar_dividas, campos_texto=('vencimento',))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/fixas', methods=['GET', 'POST'])
+@resposta_em_cache
 def fixas():
     try:
         if request.method == 'POST':
@@ -342,35 +629,66 @@ def fixas():
             nome = data['nome']
             valor = float(data['valor'])
 
-            conn = get_db_connection()
-            conn.execute('INSERT OR REPLACE INTO fixas (nome, valor) VALUES (?, ?)',
-                       (nome, valor))
-            conn.commit()
-            conn.close()
+            with transaction() as tx:
+                tx.execute('''INSERT INTO fixas (nome, valor) VALUES (?, ?)
+                              ON CONFLICT (nome) DO UPDATE SET valor = excluded.valor''',
+                           (nome, valor))
+                definir_fixa(tx, nome, valor)
 
             return jsonify({'ok': True})
         else:
-            conn = get_db_connection()
-            fixas_data = conn.execute('SELECT nome, valor FROM fixas').fetchall()
-            conn.close()
-            
-            fixas_dict = {row[0]: row[1] for row in fixas_data}
+            fixas_data = execute_query('SELECT nome, valor FROM fixas')
+
+            fixas_dict = {row['nome']: row['valor'] for row in fixas_data}
             return jsonify(fixas_dict)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/regras_categoria', methods=['GET', 'POST'])
+def regras_categoria():
+    """Lista ou cria/altera palavras-chave da categorização automática"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json()
+            palavra, categoria = salvar_regra(data['palavra'], data['categoria'])
+            return jsonify({'ok': True, 'palavra': palavra, 'categoria': categoria})
+        return jsonify(listar_regras())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/regras_categoria/<path:palavra>', methods=['DELETE'])
+def deletar_regra_categoria(palavra):
+    try:
+        if not remover_regra(palavra):
+            return jsonify({'error': 'Regra não encontrada'}), 404
+        return jsonify({'ok': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/categorizar', methods=['POST'])
+def categorizar_descricoes():
+    """Categoriza várias descrições de uma vez: {"descricoes": [...]} -> {"categorias": [...]}"""
+    try:
+        descricoes = request.get_json().get('descricoes', [])
+        if not isinstance(descricoes, list):
+            return jsonify({'error': 'descricoes deve ser uma lista'}), 400
+        return jsonify({'categorias': categorizar_lote([str(d) for d in descricoes])})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/consultar')
+@resposta_em_cache
 def consultar():
     try:
-        conn = get_db_connection()
-
-        entradas = conn.execute('SELECT COALESCE(SUM(valor), 0) FROM entradas').fetchone()[0] or 0
-        gastos = conn.execute('SELECT COALESCE(SUM(valor), 0) FROM gastos').fetchone()[0] or 0
-        dividas = conn.execute('SELECT COALESCE(SUM(valor), 0) FROM dividas').fetchone()[0] or 0
-        fixas = conn.execute('SELECT COALESCE(SUM(valor), 0) FROM fixas').fetchone()[0] or 0
+        periodo = intervalo_datas(request.args.get('data_inicio'), request.args.get('data_fim'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        total_gastos = gastos + fixas
-        saldo = entradas - total_gastos
+    try:
+        resumo = calcular_resumo(periodo)
+        saldo = resumo['saldo']
 
         dicas = []
         if saldo < 0:
@@ -380,80 +698,207 @@ def consultar():
         else:
             dicas.append('✅ Saldo positivo!')
 
-        conn.close()
-
         return jsonify({
-            'entradas': float(entradas),
-            'gastos': float(total_gastos),
-            'fixas': float(fixas),
-            'dividas': float(dividas),
-            'saldo': float(saldo),
+            'entradas': resumo['entradas'],
+            'gastos': resumo['total_gastos'],
+            'fixas': resumo['fixas'],
+            'dividas': resumo['dividas'],
+            'saldo': saldo,
             'dicas': dicas
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/previsao')
+def previsao():
+    """Saldo projetado dia a dia: /previsao?meses=3&saldo_inicial=1500"""
+    try:
+        meses = request.args.get('meses', 3, type=int)
+        saldo_inicial = request.args.get('saldo_inicial', type=float)
+        return jsonify(obter_previsao(meses, saldo_inicial))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/relatorio')
+def relatorio():
+    """Séries mensais, categorias, médias móveis e variação mês a mês (padrão: últimos 12 meses)"""
+    try:
+        periodo = intervalo_datas(request.args.get('data_inicio'), request.args.get('data_fim'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        janela = min(max(request.args.get('janela', JANELA_PADRAO, type=int), 1), 24)
+        return jsonify(gerar_relatorio(periodo, janela))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+TABELAS_LISTAGEM = ('entradas', 'gastos', 'dividas')
+LIMITE_MAXIMO_PAGINA = 500
+
+def consulta_listagem(tabela, periodo, antes_de=None, limite=None):
+    """SELECT de uma tabela, do id mais recente para o mais antigo (paginação por chave)"""
+    where, params = filtro_datas(periodo)
+    if antes_de is not None:
+        where += ' AND id < ?'
+        params += (antes_de,)
+    query = f'SELECT * FROM {tabela} WHERE {where} ORDER BY id DESC'
+    if limite:
+        query += f' LIMIT {int(limite)}'
+    return query, params
+
+def stream_listagem(consultas, tamanho_lote=200):
+    """Gera o JSON do /list_all aos poucos, lendo cada tabela com cursor no servidor"""
+    yield '{'
+    for i, (tabela, (query, params)) in enumerate(consultas.items()):
+        yield f'{", " if i else ""}"{tabela}": ['
+        lote, primeiro = [], True
+        for row in stream_query(query, params, tamanho_lote):
+            lote.append(json.dumps(row_to_dict(row), ensure_ascii=False))
+            if len(lote) >= tamanho_lote:
+                yield ('' if primeiro else ', ') + ', '.join(lote)
+                lote, primeiro = [], False
+        if lote:
+            yield ('' if primeiro else ', ') + ', '.join(lote)
+        yield ']'
+    yield '}'
+
 @app.route('/list_all')
+@resposta_em_cache
 def list_all():
+    """Lista entradas, gastos e dívidas.
+
+    Parâmetros opcionais:
+      data_inicio / data_fim   filtro por período
+      limite                   ativa a paginação: no máximo `limite` itens por tabela
+      cursor_<tabela>          id do último item da página anterior daquela tabela
+      tabelas                  tabelas a listar, separadas por vírgula
+      stream=1                 envia o JSON incrementalmente, sem montar a resposta na memória
+    """
+    try:
+        periodo = intervalo_datas(request.args.get('data_inicio'), request.args.get('data_fim'))
+        limite = request.args.get('limite', type=int)
+        if limite is not None and not 1 <= limite <= LIMITE_MAXIMO_PAGINA:
+            raise ValueError(f'limite deve estar entre 1 e {LIMITE_MAXIMO_PAGINA}')
+        tabelas = request.args.get('tabelas')
+        tabelas = [t for t in TABELAS_LISTAGEM if t in tabelas.split(',')] if tabelas else TABELAS_LISTAGEM
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
-        conn = get_db_connection()
+        consultas = {
+            tabela: consulta_listagem(tabela, periodo,
+                                      request.args.get(f'cursor_{tabela}', type=int), limite)
+            for tabela in tabelas
+        }
 
-        entradas = [dict(row) for row in conn.execute('SELECT * FROM entradas ORDER BY id DESC').fetchall()]
-        gastos = [dict(row) for row in conn.execute('SELECT * FROM gastos ORDER BY id DESC').fetchall()]
-        dividas = [dict(row) for row in conn.execute('SELECT * FROM dividas ORDER BY id DESC').fetchall()]
+        if request.args.get('stream') == '1':
+            return Response(stream_listagem(consultas), mimetype='application/json')
 
-        conn.close()
+        resultado = {}
+        with transaction() as tx:
+            for tabela, (query, params) in consultas.items():
+                resultado[tabela] = [row_to_dict(row) for row in tx.execute(query, params)]
 
-        return jsonify({
-            'entradas': entradas,
-            'gastos': gastos,
-            'dividas': dividas
-        })
+        if limite:
+            # Cursor da próxima página de cada tabela (None quando não há mais itens)
+            resultado['proximo_cursor'] = {
+                tabela: itens[-1]['id'] if len(itens) == limite else None
+                for tabela, itens in resultado.items()
+            }
+
+        return jsonify(resultado)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def resposta_lancamento_incerto(comando):
+    """Resposta para perguntas e valores ambíguos: nada é gravado sem um valor claro"""
+    if comando.pergunta:
+        return ('🔎 Isso parece uma pergunta, então nada foi registrado. '
+                'Para ver seus números, peça um "relatório" ou "como andam minhas contas?".')
+    exemplo = 'gastei R$ 50 no mercado' if comando.intencao == 'gasto' else 'recebi R$ 3500 de salário'
+    valores = ' ou '.join(f'R$ {valor:.2f}' for valor in comando.valores_possiveis)
+    return (f'🤔 Não ficou claro o valor ({valores}), então nada foi registrado. '
+            f'Envie de novo com "R$" antes do valor, ex.: "{exemplo}".')
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
         data = request.get_json()
-        msg = data.get('msg','').strip().lower()
+        msg = data.get('msg','').strip()
 
         if not msg:
             return jsonify({'error': 'Mensagem vazia'}), 400
 
-        if any(palavra in msg for palavra in ['delete', 'deletar', 'remover', 'apagar', 'excluir']):
-            resposta = processar_delecao_simples(msg)
+        comando = interpretar(msg)
+        intencao = comando.intencao if comando else None
+
+        if intencao == 'deletar':
+            resposta = processar_delecao_simples(comando.descricao, comando.confirmado)
             return jsonify({'resposta': resposta})
 
-        elif any(palavra in msg for palavra in ['como andam', 'analisar', 'dicas', 'sugestões', 'estou bem', 'relatório', 'resumo']):
+        elif intencao == 'relatorio':
+            return jsonify({'resposta': texto_relatorio(gerar_relatorio())})
+
+        elif intencao == 'analisar':
             resposta = gerar_analise_simples()
             return jsonify({'resposta': resposta})
 
-        elif any(palavra in msg for palavra in ['gastei', 'gasto', 'comprei', 'paguei']):
-            return jsonify({'resposta': '💡 Para adicionar gastos, use o formulário de "Gastos" acima.'})
-
-        elif any(palavra in msg for palavra in ['entrada', 'salário', 'receita', 'ganhei']):
-            return jsonify({'resposta': '💡 Para adicionar entradas, use o formulário de "Entradas" acima.'})
+        elif intencao in ('gasto', 'entrada') and (comando.pergunta or comando.valores_possiveis):
+            return jsonify({'resposta': resposta_lancamento_incerto(comando)})
+
+        elif intencao in ('gasto', 'entrada') and comando.valor is not None and comando.valor <= 0:
+            return jsonify({'resposta': f'❌ O valor precisa ser maior que zero (recebi R$ {comando.valor:.2f}). '
+                                        'Nada foi registrado.'})
+
+        elif intencao == 'gasto':
+            if comando.valor is None or not comando.descricao:
+                return jsonify({'resposta': '💡 Diga o valor e onde gastou, ex.: "gastei 50 no mercado", '
+                                            'ou use o formulário de "Gastos" acima.'})
+            categoria = comando.categoria or sugerir_categoria(comando.descricao)
+            if not adicionar_gasto(comando.descricao, categoria, comando.valor, comando.data):
+                return jsonify({'error': 'Erro ao adicionar gasto'}), 500
+            return jsonify({'resposta': f'✅ Gasto adicionado: {comando.descricao} - R$ {comando.valor:.2f} ({categoria})'})
+
+        elif intencao == 'entrada':
+            if comando.valor is None or not comando.descricao:
+                return jsonify({'resposta': '💡 Diga o valor recebido, ex.: "recebi salário 3500", '
+                                            'ou use o formulário de "Entradas" acima.'})
+            if not adicionar_entrada(comando.descricao, comando.valor, comando.data):
+                return jsonify({'error': 'Erro ao adicionar entrada'}), 500
+            return jsonify({'resposta': f'✅ Entrada adicionada: {comando.descricao} - R$ {comando.valor:.2f}'})
 
         else:
-            return jsonify({'resposta': '🤖 Comando não reconhecido. Tente: "delete [item]" ou "como andam minhas contas?"'})
+            return jsonify({'resposta': '🤖 Comando não reconhecido. Tente: "gastei 50 no mercado", '
+                                        '"delete [item]" ou "como andam minhas contas?"'})
 
     except Exception as e:
         print(f"❌ Erro em chat: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/buscar')
+def buscar_route():
+    """Busca textual nas descrições: /buscar?q=mercado&tabelas=gastos,dividas&limite=20"""
+    try:
+        termo = request.args.get('q', '').strip()
+        if not termo:
+            return jsonify({'error': 'Informe o termo em q'}), 400
+        tabelas = request.args.get('tabelas')
+        tabelas = [t.strip() for t in tabelas.split(',')] if tabelas else TABELAS_BUSCA
+        limite = min(max(request.args.get('limite', 20, type=int), 1), 100)
+
+        itens = [row_to_dict(item) for item in buscar(termo, tabelas, limite)]
+        return jsonify({'termo': termo, 'total': len(itens), 'itens': itens})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/grafico_dados')
+@resposta_em_cache
 def grafico_dados():
     try:
-        conn = get_db_connection()
-
-        gastos_por_categoria = dict(conn.execute('''
-            SELECT categoria, COALESCE(SUM(valor), 0)
-            FROM gastos
-            GROUP BY categoria
-        ''').fetchall())
-
-        total_fixas = conn.execute('SELECT COALESCE(SUM(valor), 0) FROM fixas').fetchone()[0] or 0
+        resumo = calcular_resumo()
+        gastos_por_categoria = resumo['gastos_por_categoria']
+        total_fixas = resumo['fixas']
 
         if total_fixas > 0:
             gastos_por_categoria['Despesas Fixas'] = total_fixas
@@ -461,8 +906,6 @@ def grafico_dados():
         if not gastos_por_categoria:
             gastos_por_categoria = {'Nenhum gasto': 0}
 
-        conn.close()
-
         return jsonify({
             'labels': list(gastos_por_categoria.keys()),
             'valores': [float(valor) for valor in gastos_por_categoria.values()]
@@ -475,20 +918,125 @@ def grafico_dados():
             'valores': [1]
         }), 500
 
+def criar_cliente_itau():
+    """Cliente do Itaú; todas as instâncias do worker usam a mesma sessão HTTP (keep-alive + mTLS)"""
+    # Configurações - você vai conseguir estas no developer portal
+    return ItauOpenBanking(
+        client_id=os.environ.get('ITAU_CLIENT_ID', 'seu_client_id_aqui'),
+        client_secret=os.environ.get('ITAU_CLIENT_SECRET', 'seu_client_secret_aqui'),
+        certificate_path="certificates/cert.pem",  # Você vai precisar disso depois
+        private_key_path="certificates/key.pem"    # Para produção
+    )
+
+# Tokens de acesso em memória, renovados antes de expirar
+cache_tokens = TokenCache({'itau': criar_cliente_itau})
+
+@app.errorhandler(413)
+def arquivo_muito_grande(e):
+    return jsonify({'error': f'Arquivo muito grande! Máximo: {TAMANHO_MAXIMO_UPLOAD // (1024 * 1024)}MB'}), 413
+
+@app.route('/upload_comprovante', methods=['POST'])
+def upload_comprovante():
+    """Recebe o comprovante como multipart/form-data e grava o arquivo em disco aos poucos"""
+    try:
+        arquivo = request.files.get('arquivo')
+        descricao = request.form.get('descricao', '').strip()
+        mes_ano = request.form.get('mes_ano', '').strip()
+        if not arquivo or not arquivo.filename or not descricao or not mes_ano:
+            return jsonify({'error': 'Preencha todos os campos e selecione um arquivo'}), 400
+
+        comprovante_id = salvar_comprovante(request.form.get('tipo'), descricao, mes_ano,
+                                            arquivo.filename, arquivo.stream)
+        return jsonify({'ok': True, 'id': comprovante_id})
+    except ArquivoMuitoGrande as e:
+        return jsonify({'error': str(e)}), 413
+    except RequestEntityTooLarge as e:
+        return arquivo_muito_grande(e)
+    except Exception as e:
+        print(f"❌ Erro ao salvar comprovante: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/listar_comprovantes/<path:mes_ano>')
+def listar_comprovantes_route(mes_ano):
+    try:
+        return jsonify({'comprovantes': listar_comprovantes(mes_ano)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload_contracheque', methods=['POST'])
+def upload_contracheque():
+    """Recebe o contracheque (PDF) como multipart/form-data e grava o arquivo em disco aos poucos"""
+    try:
+        arquivo = request.files.get('arquivo')
+        mes = request.form.get('mes', '').strip()
+        if not arquivo or not arquivo.filename or not mes:
+            return jsonify({'error': 'Preencha o mês e selecione um arquivo PDF'}), 400
+
+        contracheque_id = salvar_contracheque(mes, arquivo.filename, arquivo.stream)
+        criar_entrada = request.form.get('criar_entrada') in ('1', 'true', 'on')
+        resposta = {'ok': True, 'id': contracheque_id}
+
+        # Mesmo PDF já analisado antes: devolve a análise na hora
+        arquivo_hash = execute_query('SELECT arquivo_hash FROM contracheques WHERE id = ?',
+                                     (contracheque_id,))[0]['arquivo_hash']
+        analise = resultado_em_cache(arquivo_hash, 'contracheque')
+        if analise is not None and not criar_entrada:
+            resposta['analise'] = analise
+        else:
+            tarefa_id = enfileirar('extrair_contracheque', contracheque_id=contracheque_id,
+                                   criar_entrada=criar_entrada)
+            resposta.update({'tarefa_id': tarefa_id, 'status_url': f'/tarefas/{tarefa_id}'})
+        return jsonify(resposta)
+    except ArquivoMuitoGrande as e:
+        return jsonify({'error': str(e)}), 413
+    except RequestEntityTooLarge as e:
+        return arquivo_muito_grande(e)
+    except Exception as e:
+        print(f"❌ Erro ao salvar contracheque: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/listar_contracheques/<path:mes>')
+def listar_contracheques_route(mes):
+    try:
+        return jsonify({'contracheques': listar_contracheques(mes)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/deletar_contracheque/<int:contracheque_id>', methods=['DELETE'])
+def deletar_contracheque(contracheque_id):
+    try:
+        if not excluir_contracheque(contracheque_id):
+            return jsonify({'error': 'Contracheque não encontrado'}), 404
+        return jsonify({'ok': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/download_comprovante/<int:comprovante_id>')
+def download_comprovante(comprovante_id):
+    try:
+        return enviar_arquivo('comprovantes', comprovante_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/download_contracheque/<int:contracheque_id>')
+def download_contracheque(contracheque_id):
+    try:
+        return enviar_arquivo('contracheques', contracheque_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/visualizar_contracheque/<int:contracheque_id>')
+def visualizar_contracheque(contracheque_id):
+    try:
+        return enviar_arquivo('contracheques', contracheque_id, como_anexo=False)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/conectar_itau')
 def conectar_itau():
     """Inicia processo de conexão com Itaú"""
     try:
-        # Configurações - você vai conseguir estas no developer portal
-        client_id = os.environ.get('ITAU_CLIENT_ID', 'seu_client_id_aqui')
-        client_secret = os.environ.get('ITAU_CLIENT_SECRET', 'seu_client_secret_aqui')
-        
-        itau_api = ItauOpenBanking(
-            client_id=client_id,
-            client_secret=client_secret,
-            certificate_path="certificates/cert.pem",  # Você vai precisar disso depois
-            private_key_path="certificates/key.pem"    # Para produção
-        )
+        itau_api = criar_cliente_itau()
         
         auth_url = itau_api.get_auth_url()
         # Salva a instância na session (em produção use Redis ou database)
@@ -511,27 +1059,12 @@ def callback():
         
         # Recupera a instância do Itaú (em produção, use session/database)
         # itau_api = session.get('itau_api')
-        # Por enquanto, vamos criar uma nova instância:
-        
-        client_id = os.environ.get('ITAU_CLIENT_ID', 'seu_client_id_aqui')
-        client_secret = os.environ.get('ITAU_CLIENT_SECRET', 'seu_client_secret_aqui')
-        
-        itau_api = ItauOpenBanking(
-            client_id=client_id,
-            client_secret=client_secret,
-            certificate_path="certificates/cert.pem",
-            private_key_path="certificates/key.pem"
-        )
+        # Por enquanto, vamos criar uma nova instância (a sessão HTTP é compartilhada):
+        itau_api = criar_cliente_itau()
         
         if itau_api.exchange_code_for_token(authorization_code):
             # Salvar o token no banco de dados para este usuário
-            conn = get_db_connection()
-            conn.execute('''INSERT OR REPLACE INTO bancos_tokens 
-                         (banco, access_token, expires_at) 
-                         VALUES (?, ?, ?)''',
-                      ('itau', itau_api.access_token, itau_api.token_expires))
-            conn.commit()
-            conn.close()
+            cache_tokens.salvar('itau', itau_api.access_token, itau_api.refresh_token, itau_api.token_expires)
             
             return '''
             <h2>✅ Conectado com Itaú com sucesso!</h2>
@@ -547,124 +1080,228 @@ def callback():
         print(f"❌ Erro no callback: {e}")
         return f"Erro: {str(e)}"
 
+@tarefa('importar_itau')
+def importar_itau(progresso):
+    """Importa transações do Itaú (executada pelo worker de tarefas)"""
+    # Busca token (em memória; renovado automaticamente perto de expirar)
+    token_data = cache_tokens.obter('itau')
+
+    if not token_data:
+        raise RuntimeError('Token expirado ou não encontrado. Reconecte com Itaú.')
+
+    # Cria instância e busca transações
+    itau_api = criar_cliente_itau()
+
+    itau_api.access_token = token_data['access_token']
+    itau_api.token_expires = token_data['expires_at']
+
+    # Busca contas
+    accounts = itau_api.get_accounts()
+    if not accounts:
+        raise RuntimeError('Não foi possível buscar contas')
+
+    transacoes_importadas = []
+    inicio = time.perf_counter()
+
+    duplicadas = 0
+
+    # Para cada conta, busca só o que mudou desde a última sincronização.
+    # A própria data da marca d'água é buscada de novo: a chave natural descarta repetidas
+    account_ids = [account.get('accountId')
+                   for account in accounts.get('data', {}).get('brand', {}).get('accounts', [])]
+    from_dates = {}
+    for account_id in account_ids:
+        estado = obter_sync_estado('itau', account_id)
+        if estado:
+            from_dates[account_id] = estado['ultima_data']
+
+    marcas = {}
+    contas_com_erro = []
+    contas_concluidas = 0
+    progresso.atualizar(0, total=len(account_ids), mensagem='Buscando transações', forcar=True)
+
+    # As contas são buscadas em paralelo e cada página é gravada assim que chega
+    for account_id, pagina in itau_api.iter_transactions_concurrent(account_ids, from_dates=from_dates):
+        if isinstance(pagina, Exception):
+            contas_com_erro.append(account_id)
+            contas_concluidas += 1
+        elif pagina is None:
+            # Conta concluída: só agora a marca d'água pode avançar
+            if account_id in marcas:
+                atualizar_sync_estado('itau', account_id, *marcas[account_id])
+            contas_concluidas += 1
+        else:
+            resumos, estatisticas = importar_lote(pagina, banco='itau', conta=account_id)
+            transacoes_importadas.extend(resumos)
+            duplicadas += estatisticas['duplicadas']
+            marca = (estatisticas['ultima_data'], estatisticas['ultima_transacao'])
+            if marca[0] and marca[0] >= marcas.get(account_id, marca)[0]:
+                marcas[account_id] = marca
+
+        progresso.atualizar(contas_concluidas, mensagem=f'{len(transacoes_importadas)} transações importadas')
+
+    segundos = time.perf_counter() - inicio
+    progresso.atualizar(contas_concluidas, mensagem=f'{len(transacoes_importadas)} transações importadas',
+                        forcar=True)
+
+    return {
+        'ok': True,
+        'message': f'✅ {len(transacoes_importadas)} transações importadas',
+        'transacoes': transacoes_importadas,
+        'contas_com_erro': contas_com_erro,
+        'estatisticas': {
+            'linhas': len(transacoes_importadas),
+            'duplicadas': duplicadas,
+            'segundos': round(segundos, 3),
+            'linhas_por_segundo': round(len(transacoes_importadas) / segundos, 1) if segundos > 0 else 0.0
+        }
+    }
+
 @app.route('/importar_transacoes_itau')
 def importar_transacoes_itau():
-    """Importa transações do Itaú"""
-    try:
-        # Busca token do banco
-        conn = get_db_connection()
-        token_data = conn.execute('''SELECT access_token, expires_at FROM bancos_tokens 
-                                  WHERE banco = ? ORDER BY id DESC LIMIT 1''', 
-                               ('itau',)).fetchone()
-        conn.close()
-        
-        if not token_data or datetime.now() >= datetime.fromisoformat(token_data['expires_at']):
+    """Enfileira a importação de transações do Itaú e retorna na hora"""
+    try:
+        if not cache_tokens.obter('itau'):
             return jsonify({'error': 'Token expirado ou não encontrado. Reconecte com Itaú.'}), 401
-        
-        # Cria instância e busca transações
-        client_id = os.environ.get('ITAU_CLIENT_ID')
-        client_secret = os.environ.get('ITAU_CLIENT_SECRET')
-        
-        itau_api = ItauOpenBanking(
-            client_id=client_id,
-            client_secret=client_secret,
-            certificate_path="certificates/cert.pem",
-            private_key_path="certificates/key.pem"
-        )
-        
-        itau_api.access_token = token_data['access_token']
-        
-        # Busca contas
-        accounts = itau_api.get_accounts()
-        if not accounts:
-            return jsonify({'error': 'Não foi possível buscar contas'}), 500
-        
-        transacoes_importadas = []
-        
-        # Para cada conta, busca transações
-        for account in accounts.get('data', {}).get('brand', {}).get('accounts', []):
-            account_id = account.get('accountId')
-            transactions = itau_api.get_transactions(account_id)
-            
-            if transactions:
-                for transacao in transactions.get('data', {}).get('transactions', []):
-                    # Processa e salva transação
-                    transacao_processada = processar_transacao_itau(transacao)
-                    if transacao_processada:
-                        transacoes_importadas.append(transacao_processada)
-        
+
+        # Não enfileira outra importação enquanto uma ainda está na fila ou rodando
+        tarefa_id = em_andamento('importar_itau') or enfileirar('importar_itau')
+
         return jsonify({
             'ok': True,
-            'message': f'✅ {len(transacoes_importadas)} transações importadas',
-            'transacoes': transacoes_importadas
-        })
-        
+            'message': '⏳ Importação em andamento',
+            'tarefa_id': tarefa_id,
+            'status_url': f'/tarefas/{tarefa_id}'
+        }), 202
+
     except Exception as e:
         print(f"❌ Erro importar transações: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/tarefas/<int:tarefa_id>')
+def status_tarefa(tarefa_id):
+    """Status, progresso e resultado de uma tarefa em segundo plano"""
+    try:
+        dados = obter_tarefa(tarefa_id)
+        if dados is None:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+        return jsonify(dados)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@tarefa('importar_extrato_pdf')
+def importar_extrato_pdf_tarefa(progresso, arquivo_hash):
+    """Lê o extrato em PDF em paralelo e grava cada lote de páginas assim que fica pronto"""
+    transacoes_importadas = []
+    duplicadas = 0
+    inicio = time.perf_counter()
+    total_paginas = 0
+
+    for paginas_lidas, total_paginas, transacoes in iterar_extrato(caminho(arquivo_hash)):
+        # Mesmo caminho de gravação (e categorização) das transações da API
+        resumos, estatisticas = importar_lote(transacoes, banco='itau', conta='extrato-pdf')
+        transacoes_importadas.extend(resumos)
+        duplicadas += estatisticas['duplicadas']
+        progresso.atualizar(paginas_lidas, total=total_paginas,
+                            mensagem=f'{len(transacoes_importadas)} transações importadas')
+
+    execute_query('''UPDATE extratos_pdf SET paginas = ?, transacoes = ?, importado_em = CURRENT_TIMESTAMP
+                     WHERE arquivo_hash = ?''', (total_paginas, len(transacoes_importadas) + duplicadas, arquivo_hash))
+    progresso.atualizar(total_paginas, total=total_paginas,
+                        mensagem=f'{len(transacoes_importadas)} transações importadas', forcar=True)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'ok': True,
+        'message': f'✅ {len(transacoes_importadas)} transações importadas do extrato',
+        'transacoes': transacoes_importadas,
+        'estatisticas': {
+            'paginas': total_paginas,
+            'linhas': len(transacoes_importadas),
+            'duplicadas': duplicadas,
+            'segundos': round(segundos, 3)
+        }
+    }
+
+@app.route('/importar_extrato_pdf', methods=['POST'])
+def importar_extrato_pdf():
+    """Recebe o extrato do Itaú em PDF (multipart) e enfileira a importação"""
+    try:
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            return jsonify({'error': 'Selecione o extrato em PDF'}), 400
+
+        recebido = receber_stream(arquivo.stream, TAMANHO_MAXIMO_UPLOAD)
+        with transaction() as tx:
+            arquivo_hash, arquivo_tamanho = guardar_recebido(tx, recebido)
+            tx.execute('''INSERT INTO extratos_pdf (arquivo_hash, arquivo_nome, arquivo_tamanho) VALUES (?, ?, ?)
+                          ON CONFLICT (arquivo_hash) DO NOTHING''',
+                       (arquivo_hash, arquivo.filename, arquivo_tamanho))
+
+        tarefa_id = enfileirar('importar_extrato_pdf', arquivo_hash=arquivo_hash)
+        return jsonify({
+            'ok': True,
+            'message': '⏳ Importação do extrato em andamento',
+            'tarefa_id': tarefa_id,
+            'status_url': f'/tarefas/{tarefa_id}'
+        }), 202
+    except ArquivoMuitoGrande as e:
+        return jsonify({'error': str(e)}), 413
+    except RequestEntityTooLarge as e:
+        return arquivo_muito_grande(e)
+    except Exception as e:
+        print(f"❌ Erro importar extrato: {e}")
+        return jsonify({'error': str(e)}), 500
+
 def processar_transacao_itau(transacao):
     """Processa e categoriza transação do Itaú"""
     try:
-        descricao = transacao.get('transactionName', 'Transação Itaú')
-        valor = transacao.get('amount', 0)
-        data = transacao.get('bookingDate', '')
-        tipo = transacao.get('creditDebitType', 'DEBIT')  # DEBIT ou CREDIT
-        
-        # Define se é entrada ou gasto
-        if tipo == 'CREDIT':
-            tabela = 'entradas'
-            descricao = f"💰 {descricao}"
-        else:
-            tabela = 'gastos'
-            descricao = f"💸 {descricao}"
-        
-        # Categorização automática
-        categoria = categorizar_transacao_automacao(descricao, valor)
-        
-        # Salva no banco
-        conn = get_db_connection()
-        if tabela == 'entradas':
-            conn.execute('INSERT INTO entradas (descricao, valor, data) VALUES (?, ?, ?)',
-                       (descricao, valor, data))
-        else:
-            conn.execute('INSERT INTO gastos (descricao, categoria, valor, data) VALUES (?, ?, ?, ?)',
-                       (descricao, categoria, abs(valor), data))
-        
-        conn.commit()
-        conn.close()
-        
-        return {
-            'descricao': descricao,
-            'valor': valor,
-            'data': data,
-            'tipo': tipo,
-            'categoria': categoria
-        }
-        
+        resumos, _ = importar_lote([transacao])
+        return resumos[0] if resumos else None
     except Exception as e:
         print(f"❌ Erro processar transação: {e}")
         return None
 
-def categorizar_transacao_automacao(descricao, valor):
-    """Categoriza transação automaticamente baseada na descrição"""
-    desc_lower = descricao.lower()
-    
-    categorias = {
-        'alimentacao': ['mercado', 'supermercado', 'padaria', 'restaurante', 'lanchonete', 'ifood'],
-        'transporte': ['uber', '99', 'taxi', 'posto', 'combustivel', 'estacionamento'],
-        'moradia': ['aluguel', 'condominio', 'luz', 'agua', 'energia', 'internet'],
-        'saude': ['farmacia', 'hospital', 'medico', 'plano de saude'],
-        'educacao': ['escola', 'faculdade', 'curso', 'livraria'],
-        'entretenimento': ['cinema', 'netflix', 'spotify', 'parque'],
-        'outros': []
-    }
-    
-    for categoria, palavras in categorias.items():
-        if any(palavra in desc_lower for palavra in palavras):
-            return categoria
-    
-    return 'outros'
+@app.cli.command('reconciliar-saldos')
+def reconciliar_saldos_command():
+    """Reconstrói a tabela saldos a partir de entradas, gastos, dívidas e fixas"""
+    linhas = reconciliar_saldos()
+    print(f"✅ Saldos reconciliados: {linhas} agregado(s)")
+
+@app.cli.command('migrar-arquivos')
+def migrar_arquivos_command():
+    """Move os PDFs guardados em arquivo_dados para o armazenamento em disco"""
+    migrados = migrar_blobs()
+    if any(migrados.values()) and not USE_POSTGRES:
+        print("💡 Rode VACUUM no financas.db para devolver o espaço ao disco")
+
+@app.cli.command('treinar-categorias')
+def treinar_categorias_command():
+    """Treina o modelo de categorização com os gastos já categorizados"""
+    try:
+        treinar_modelo()
+    except ValueError as e:
+        print(f"❌ {e}")
+
+@app.cli.command('worker')
+def worker_command():
+    """Executa as tarefas em segundo plano (importações) até ser interrompido"""
+    if not USE_POSTGRES:
+        print("⚠️ Sem DATABASE_URL: o worker usa o SQLite local e só vê tarefas "
+              "enfileiradas por processos no mesmo disco")
+    executar_worker()
+
+@app.route('/db_stats')
+def db_stats():
+    """Estatísticas do pool de conexões deste worker"""
+    try:
+        return jsonify(pool_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Sem processo de worker separado, as tarefas rodam numa thread do processo web
+if os.environ.get('TAREFAS_WORKER_EMBUTIDO') == '1':
+    iniciar_worker_embutido()
 
 # =============================================
 # CONFIGURAÇÃO PARA RENDER
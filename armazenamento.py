@@ -0,0 +1,187 @@
+# armazenamento.py
+"""Arquivos (comprovantes, contracheques) gravados em disco pelo SHA-256 do conteúdo.
+
+As tabelas guardam só arquivo_hash e arquivo_tamanho. Arquivos iguais são
+gravados uma única vez, e um arquivo só é apagado quando nenhuma linha
+aponta mais para ele.
+"""
+import base64
+import hashlib
+import io
+import os
+import tempfile
+
+from database import transaction, execute_query, add_column
+
+DIRETORIO = os.environ.get('ARQUIVOS_DIR', os.path.join(os.path.dirname(__file__), 'arquivos'))
+
+TAMANHO_BLOCO = 1024 * 1024
+
+# Tamanho máximo de um arquivo enviado (UPLOAD_MAX_MB, padrão 10MB como no frontend)
+TAMANHO_MAXIMO_UPLOAD = int(float(os.environ.get('UPLOAD_MAX_MB', 10)) * 1024 * 1024)
+
+# Tabelas que referenciam arquivos armazenados (coluna arquivo_hash)
+TABELAS_ARQUIVOS = ('comprovantes', 'contracheques', 'extratos_pdf')
+
+# Tabelas antigas que guardavam o arquivo inteiro em arquivo_dados
+TABELAS_BLOB = ('comprovantes', 'contracheques')
+
+
+class ArquivoMuitoGrande(ValueError):
+    pass
+
+
+def criar_colunas_arquivos(tx):
+    """Colunas de hash/tamanho que substituem o arquivo_dados guardado na linha"""
+    for tabela in TABELAS_BLOB:
+        add_column(tx, tabela, 'arquivo_hash', 'TEXT')
+        add_column(tx, tabela, 'arquivo_tamanho', 'INTEGER')
+        tx.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_arquivo_hash ON {tabela}(arquivo_hash)')
+    tx.execute('''CREATE TABLE IF NOT EXISTS travas_arquivos(
+        arquivo_hash TEXT PRIMARY KEY,
+        travado_em TEXT
+    )''')
+
+
+def caminho(arquivo_hash):
+    """Caminho do arquivo no disco, em subpastas para não encher um único diretório"""
+    return os.path.join(DIRETORIO, arquivo_hash[:2], arquivo_hash[2:4], arquivo_hash)
+
+
+def existe(arquivo_hash):
+    return bool(arquivo_hash) and os.path.exists(caminho(arquivo_hash))
+
+
+def receber_stream(origem, tamanho_maximo=None):
+    """Grava o conteúdo de um arquivo aberto num temporário e retorna (temporario, hash, tamanho).
+
+    O conteúdo é lido em blocos enquanto o hash é calculado, então o arquivo
+    nunca fica inteiro na memória. Levanta ArquivoMuitoGrande se passar de
+    `tamanho_maximo` bytes.
+    """
+    os.makedirs(DIRETORIO, exist_ok=True)
+    sha256 = hashlib.sha256()
+    tamanho = 0
+    descritor, temporario = tempfile.mkstemp(dir=DIRETORIO, prefix='.upload-')
+    try:
+        with os.fdopen(descritor, 'wb') as destino:
+            while True:
+                bloco = origem.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                tamanho += len(bloco)
+                if tamanho_maximo is not None and tamanho > tamanho_maximo:
+                    raise ArquivoMuitoGrande(f'Arquivo maior que o limite de {tamanho_maximo // (1024 * 1024)}MB')
+                sha256.update(bloco)
+                destino.write(bloco)
+        return temporario, sha256.hexdigest(), tamanho
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def travar_arquivo(tx, arquivo_hash):
+    """Trava o hash até o fim de `tx`, para gravação e remoção do mesmo arquivo não se cruzarem.
+
+    O upsert sempre escreve: no PostgreSQL trava a linha, no SQLite pega o
+    lock de escrita do banco.
+    """
+    tx.execute('''INSERT INTO travas_arquivos (arquivo_hash, travado_em) VALUES (?, CURRENT_TIMESTAMP)
+                  ON CONFLICT (arquivo_hash) DO UPDATE SET travado_em = excluded.travado_em''', (arquivo_hash,))
+
+
+def guardar_recebido(tx, recebido):
+    """Move o temporário de receber_stream() para o lugar definitivo e retorna (hash, tamanho).
+
+    A linha que aponta para o arquivo deve ser inserida na mesma `tx`: com o
+    hash travado, remover_se_orfao() não apaga o arquivo antes do INSERT.
+    """
+    temporario, arquivo_hash, tamanho = recebido
+    try:
+        travar_arquivo(tx, arquivo_hash)
+        final = caminho(arquivo_hash)
+        if os.path.exists(final):
+            os.remove(temporario)  # mesmo conteúdo já armazenado
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(temporario, final)
+        return arquivo_hash, tamanho
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def salvar_stream(origem, tamanho_maximo=None):
+    """Grava o conteúdo de um arquivo aberto e retorna (hash, tamanho).
+
+    Dentro de uma transação já aberta, o hash fica travado nela (ver guardar_recebido).
+    """
+    recebido = receber_stream(origem, tamanho_maximo)
+    with transaction() as tx:
+        return guardar_recebido(tx, recebido)
+
+
+def salvar_bytes(dados):
+    """Grava bytes já em memória e retorna (hash, tamanho)"""
+    return salvar_stream(io.BytesIO(dados))
+
+
+def decodificar_blob(dados):
+    """Conteúdo de um arquivo_dados antigo: bytes, memoryview (BYTEA) ou data URL em base64"""
+    if isinstance(dados, memoryview):
+        return dados.tobytes()
+    if isinstance(dados, str):
+        if dados.startswith('data:') and ',' in dados:
+            dados = dados.split(',', 1)[1]
+        return base64.b64decode(dados)
+    return bytes(dados)
+
+
+def remover_se_orfao(arquivo_hash):
+    """Apaga o arquivo do disco se nenhuma tabela o referencia mais.
+
+    A checagem e a remoção acontecem com o hash travado, então um upload do
+    mesmo conteúdo espera e grava o arquivo de novo em vez de perdê-lo.
+    """
+    if not arquivo_hash:
+        return False
+    with transaction() as tx:
+        travar_arquivo(tx, arquivo_hash)
+        for tabela in TABELAS_ARQUIVOS:
+            if tx.execute(f'SELECT 1 AS existe FROM {tabela} WHERE arquivo_hash = ? LIMIT 1', (arquivo_hash,)):
+                return False
+        tx.execute('DELETE FROM travas_arquivos WHERE arquivo_hash = ?', (arquivo_hash,))
+        if existe(arquivo_hash):
+            os.remove(caminho(arquivo_hash))
+            return True
+    return False
+
+
+def migrar_blobs():
+    """Move os arquivo_dados ainda guardados no banco para o disco, uma linha por vez.
+
+    Retorna quantos arquivos foram migrados por tabela.
+    """
+    migrados = {}
+    for tabela in TABELAS_BLOB:
+        ids = [row['id'] for row in execute_query(
+            f'''SELECT id FROM {tabela}
+                WHERE arquivo_dados IS NOT NULL AND arquivo_hash IS NULL ORDER BY id''')]
+        migrados[tabela] = 0
+        for linha_id in ids:
+            with transaction() as tx:
+                linhas = tx.execute(f'SELECT arquivo_dados FROM {tabela} WHERE id = ?', (linha_id,))
+                if not linhas or linhas[0]['arquivo_dados'] is None:
+                    continue
+                try:
+                    arquivo_hash, tamanho = salvar_bytes(decodificar_blob(linhas[0]['arquivo_dados']))
+                except (ValueError, TypeError) as e:
+                    print(f"❌ {tabela} {linha_id}: conteúdo ilegível ({e})")
+                    continue
+                tx.execute(f'''UPDATE {tabela} SET arquivo_hash = ?, arquivo_tamanho = ?, arquivo_dados = NULL
+                               WHERE id = ?''', (arquivo_hash, tamanho, linha_id))
+            migrados[tabela] += 1
+        print(f"✅ {migrados[tabela]} arquivo(s) de {tabela} movidos para {DIRETORIO}")
+    return migrados
@@ -3,23 +3,110 @@ import requests
 import json
 import base64
 import hashlib
+import os
+import queue
+import ssl
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+import certifi
 import jwt
 from cryptography.hazmat.primitives import serialization
 import secrets
 
+# Respostas que valem nova tentativa (limite de requisições e erros do servidor)
+STATUS_RETRY = {429, 500, 502, 503, 504}
+
+# Tamanho do pool de conexões HTTP da sessão compartilhada (por worker)
+POOL_CONNECTIONS = int(os.environ.get('ITAU_POOL_CONNECTIONS', 4))
+POOL_MAXSIZE = int(os.environ.get('ITAU_POOL_MAXSIZE', 10))
+
+# Transações pedidas por página na listagem paginada
+PAGE_SIZE = int(os.environ.get('ITAU_PAGE_SIZE', 100))
+
+class MTLSAdapter(HTTPAdapter):
+    """Adapter que usa um SSLContext já carregado com o certificado do cliente"""
+
+    def __init__(self, ssl_context, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super().proxy_manager_for(*args, **kwargs)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(certificate_path, private_key_path):
+    """Sessão HTTP compartilhada pelas instâncias do worker.
+
+    Mantém as conexões abertas (keep-alive) e carrega o certificado/chave do
+    mTLS uma única vez. Uma sessão por processo: não é reaproveitada após o fork.
+    """
+    chave = (os.getpid(), certificate_path, private_key_path)
+    with _sessions_lock:
+        session = _sessions.get(chave)
+        if session is None:
+            session = requests.Session()
+            if (certificate_path and private_key_path
+                    and os.path.exists(certificate_path) and os.path.exists(private_key_path)):
+                ssl_context = ssl.create_default_context(cafile=certifi.where())
+                ssl_context.load_cert_chain(certificate_path, private_key_path)
+                adapter = MTLSAdapter(ssl_context, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                print("🔐 Certificado mTLS carregado")
+            else:
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[chave] = session
+        return session
+
 class ItauOpenBanking:
-    def __init__(self, client_id, client_secret, certificate_path, private_key_path):
+    def __init__(self, client_id, client_secret, certificate_path, private_key_path,
+                 base_url=None, auth_url=None, timeout=None, max_retries=None, max_workers=None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.certificate_path = certificate_path
         self.private_key_path = private_key_path
-        self.base_url = "https://api.itau.com.br"
-        self.auth_url = "https://sts.itau.com.br"
+        # As URLs podem apontar para um servidor local que imita a API (stub_itau.py)
+        self.base_url = base_url or os.environ.get('ITAU_BASE_URL', "https://api.itau.com.br")
+        self.auth_url = auth_url or os.environ.get('ITAU_AUTH_URL', "https://sts.itau.com.br")
+        self.timeout = timeout or float(os.environ.get('ITAU_TIMEOUT', 15))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get('ITAU_MAX_RETRIES', 3))
+        self.max_workers = max_workers or int(os.environ.get('ITAU_MAX_WORKERS', 4))
+        self.session = get_session(certificate_path, private_key_path)
         self.access_token = None
+        self.refresh_token = None
         self.token_expires = None
-        
+
+    def _request(self, method, url, **kwargs):
+        """Faz a requisição com timeout e novas tentativas (backoff exponencial) em 429/5xx"""
+        kwargs.setdefault('timeout', self.timeout)
+        tentativa = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in STATUS_RETRY or tentativa >= self.max_retries:
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                espera = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** tentativa
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if tentativa >= self.max_retries:
+                    raise
+                espera = 2 ** tentativa
+                print(f"⚠️ Falha de rede ({e}), tentando novamente")
+
+            tentativa += 1
+            print(f"⏳ Nova tentativa {tentativa}/{self.max_retries} em {espera:.1f}s: {url}")
+            time.sleep(min(espera, 30))
+
     def generate_code_verifier(self):
         """Gera o code_verifier para PKCE"""
         token = secrets.token_urlsafe(32)
@@ -64,17 +151,41 @@ class ItauOpenBanking:
             'code_verifier': self.code_verifier
         }
         
-        response = requests.post(token_url, data=data)
+        response = self._request('POST', token_url, data=data)
         
         if response.status_code == 200:
-            token_data = response.json()
-            self.access_token = token_data['access_token']
-            self.token_expires = datetime.now() + timedelta(seconds=token_data['expires_in'])
+            self._set_token(response.json())
             return True
         else:
             print(f"❌ Erro na autenticação: {response.text}")
             return False
-    
+
+    def refresh_access_token(self, refresh_token):
+        """Renova o access token com o grant refresh_token"""
+        token_url = f"{self.auth_url}/token"
+
+        data = {
+            'grant_type': 'refresh_token',
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'refresh_token': refresh_token
+        }
+
+        response = self._request('POST', token_url, data=data)
+
+        if response.status_code == 200:
+            self._set_token(response.json(), refresh_token)
+            return True
+        else:
+            print(f"❌ Erro ao renovar token: {response.text}")
+            return False
+
+    def _set_token(self, token_data, refresh_token=None):
+        self.access_token = token_data['access_token']
+        # Alguns servidores não devolvem um novo refresh_token na renovação
+        self.refresh_token = token_data.get('refresh_token', refresh_token)
+        self.token_expires = datetime.now() + timedelta(seconds=token_data['expires_in'])
+
     def get_accounts(self):
         """Busca contas do usuário"""
         if not self.access_token or datetime.now() >= self.token_expires:
@@ -87,7 +198,7 @@ class ItauOpenBanking:
         }
         
         accounts_url = f"{self.base_url}/open-banking/accounts/v1/accounts"
-        response = requests.get(accounts_url, headers=headers)
+        response = self._request('GET', accounts_url, headers=headers)
         
         if response.status_code == 200:
             return response.json()
@@ -95,28 +206,108 @@ class ItauOpenBanking:
             print(f"❌ Erro ao buscar contas: {response.text}")
             return None
     
-    def get_transactions(self, account_id, from_date=None, to_date=None):
-        """Busca transações de uma conta"""
+    def iter_transaction_pages(self, account_id, from_date=None, to_date=None, page_size=None):
+        """Gera as páginas de transações de uma conta, uma lista por página.
+
+        Segue `links.next` (ou `meta.totalPages`) da paginação do Open Banking
+        Brasil, de modo que só uma página fica na memória por vez. Levanta
+        requests.HTTPError se alguma página falhar.
+        """
         if not from_date:
             from_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
         if not to_date:
             to_date = datetime.now().strftime('%Y-%m-%d')
-        
+
         headers = {
             'Authorization': f'Bearer {self.access_token}',
             'Content-Type': 'application/json'
         }
-        
-        transactions_url = f"{self.base_url}/open-banking/accounts/v1/accounts/{account_id}/transactions"
+
+        url = f"{self.base_url}/open-banking/accounts/v1/accounts/{account_id}/transactions"
+        pagina = 1
         params = {
             'fromBookingDate': from_date,
-            'toBookingDate': to_date
+            'toBookingDate': to_date,
+            'page': pagina,
+            'page-size': page_size or PAGE_SIZE
         }
-        
-        response = requests.get(transactions_url, headers=headers, params=params)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"❌ Erro ao buscar transações: {response.text}")
+
+        while url:
+            response = self._request('GET', url, headers=headers, params=params)
+            if response.status_code != 200:
+                print(f"❌ Erro ao buscar transações: {response.text}")
+                response.raise_for_status()
+                raise requests.HTTPError(f"Resposta inesperada: {response.status_code}", response=response)
+
+            corpo = response.json()
+            dados = corpo.get('data', {})
+            # O padrão devolve a lista em `data`; a versão atual do app espera `data.transactions`
+            yield dados.get('transactions', []) if isinstance(dados, dict) else dados
+
+            proxima = (corpo.get('links') or {}).get('next')
+            total_paginas = (corpo.get('meta') or {}).get('totalPages')
+            pagina += 1
+            if proxima:
+                url, params = proxima, None  # o link já traz a query completa
+            elif params is not None and total_paginas and pagina <= total_paginas:
+                params['page'] = pagina
+            else:
+                url = None
+
+    def get_transactions(self, account_id, from_date=None, to_date=None):
+        """Busca transações de uma conta (todas as páginas de uma vez)"""
+        try:
+            transacoes = []
+            for pagina in self.iter_transaction_pages(account_id, from_date, to_date):
+                transacoes.extend(pagina)
+            return {'data': {'transactions': transacoes}}
+        except requests.RequestException:
             return None
+
+    def iter_transactions_concurrent(self, account_ids, from_dates=None, to_date=None, max_workers=None):
+        """Busca várias contas em paralelo e gera (account_id, página) conforme as páginas chegam.
+
+        `from_dates` mapeia account_id -> data inicial (as contas ausentes usam o
+        padrão de iter_transaction_pages). No máximo `max_workers` contas são
+        buscadas ao mesmo tempo, e a fila limitada faz as buscas esperarem quem
+        consome as páginas. Ao fim de cada conta é gerado (account_id, None), ou
+        (account_id, exceção) se a busca falhou.
+        """
+        from_dates = from_dates or {}
+        workers = max(1, min(max_workers or self.max_workers, len(account_ids) or 1))
+        fila = queue.Queue(maxsize=workers * 2)
+        parar = threading.Event()
+
+        def enviar(item):
+            while not parar.is_set():
+                try:
+                    fila.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def buscar(account_id):
+            try:
+                for pagina in self.iter_transaction_pages(account_id, from_dates.get(account_id), to_date):
+                    if not enviar((account_id, pagina)):
+                        return
+                enviar((account_id, None))
+            except Exception as e:
+                print(f"❌ Erro ao buscar transações da conta {account_id}: {e}")
+                enviar((account_id, e))
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for account_id in account_ids:
+                executor.submit(buscar, account_id)
+
+            restantes = len(account_ids)
+            while restantes:
+                account_id, pagina = fila.get()
+                if pagina is None or isinstance(pagina, Exception):
+                    restantes -= 1
+                yield account_id, pagina
+        finally:
+            parar.set()
+            executor.shutdown(wait=True)
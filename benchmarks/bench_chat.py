@@ -0,0 +1,65 @@
+# benchmarks/bench_chat.py
+"""Custo por mensagem do roteamento do /chat: cadeia de any() x intencoes_chat.
+
+Uso:
+    python benchmarks/bench_chat.py
+    python benchmarks/bench_chat.py --repeticoes 200000
+
+A cadeia antiga só decide a intenção; interpretar() decide a intenção e ainda
+extrai valor, data, categoria e descrição.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intencoes_chat import interpretar  # noqa: E402
+
+MENSAGENS = [
+    'gastei 50 no mercado',
+    'paguei R$ 1.234,56 de aluguel ontem',
+    'comprei pão de queijo 12,50 em 15/03',
+    'recebi salário 3500',
+    'confirmar delete uber',
+    'como andam minhas contas?',
+    'me mostra um resumo do mês',
+    'comprei 2 pizzas por 80',
+    'quanto gastei com uber nos últimos 3 meses?',
+    'bom dia, tudo bem com você hoje?',
+]
+
+
+def rotear_cadeia(msg):
+    """Roteamento anterior do /chat, reconstruindo as listas a cada mensagem"""
+    msg = msg.strip().lower()
+    if any(palavra in msg for palavra in ['delete', 'deletar', 'remover', 'apagar', 'excluir']):
+        return 'deletar'
+    elif any(palavra in msg for palavra in ['como andam', 'analisar', 'dicas', 'sugestões', 'estou bem', 'relatório', 'resumo']):
+        return 'analisar'
+    elif any(palavra in msg for palavra in ['gastei', 'gasto', 'comprei', 'paguei']):
+        return 'gasto'
+    elif any(palavra in msg for palavra in ['entrada', 'salário', 'receita', 'ganhei']):
+        return 'entrada'
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=50000)
+    args = parser.parse_args()
+
+    rodadas = max(args.repeticoes // len(MENSAGENS), 1)
+    for nome, funcao in (('cadeia de any()', rotear_cadeia), ('interpretar()', interpretar)):
+        segundos = min(timeit.repeat(lambda: [funcao(m) for m in MENSAGENS], number=rodadas, repeat=3))
+        microssegundos = segundos / (rodadas * len(MENSAGENS)) * 1e6
+        print(f"{nome:<18} {microssegundos:6.2f}µs por mensagem")
+
+    print()
+    for mensagem in MENSAGENS:
+        print(f"{mensagem!r:<42} -> {interpretar(mensagem)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_pdf.py
+"""Memória e tempo de leitura de PDFs grandes: pdf.pages ingênuo x LeitorPDF.
+
+Uso:
+    python benchmarks/bench_pdf.py              # 300 páginas
+    python benchmarks/bench_pdf.py --paginas 800 --linhas 60
+
+Gera um extrato sintético e lê o texto de todas as páginas de três formas,
+cada uma num processo novo, para que o pico de RSS seja só daquela leitura.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NOMES = ['SUPERMERCADO EXTRA', 'UBER TRIP', 'NETFLIX.COM', 'FARMACIA PAGUE MENOS',
+         'PIX RECEBIDO MARIA', 'PADARIA CENTRAL', 'POSTO SHELL', 'RESTAURANTE SABOR']
+
+
+def gerar_pdf_sintetico(paginas, linhas_por_pagina):
+    """PDF mínimo (Helvetica, uma stream de texto por página) com linhas de extrato"""
+    gerador = random.Random(42)
+    objetos = [b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    id_paginas = 1 + 2 * paginas + 1
+    filhos = []
+    for _ in range(paginas):
+        linhas = []
+        for _ in range(linhas_por_pagina):
+            valor = f'{gerador.uniform(5, 900):.2f}'.replace('.', ',')
+            linhas.append(f'{gerador.randint(1, 28):02d}/03 {gerador.choice(NOMES)} -{valor}')
+        conteudo = b'BT /F1 9 Tf 40 800 Td 12 TL ' + b''.join(
+            b'(' + linha.encode('latin-1') + b') Tj T* ' for linha in linhas) + b'ET'
+        objetos.append(b'<< /Length %d >>\nstream\n' % len(conteudo) + conteudo + b'\nendstream')
+        objetos.append(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] /Contents %d 0 R '
+                       b'/Resources << /Font << /F1 1 0 R >> >> >>' % (id_paginas, len(objetos)))
+        filhos.append(len(objetos))
+    objetos.append(b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % f for f in filhos) +
+                   b'] /Count %d >>' % paginas)
+    objetos.append(b'<< /Type /Catalog /Pages %d 0 R >>' % id_paginas)
+
+    saida = bytearray(b'%PDF-1.4\n')
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(len(saida))
+        saida += b'%d 0 obj\n' % numero + objeto + b'\nendobj\n'
+    xref = len(saida)
+    saida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+    saida += b''.join(b'%010d 00000 n \n' % posicao for posicao in posicoes)
+    saida += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objetos) + 1, len(objetos), xref)
+    return bytes(saida)
+
+
+def ler_ingenuo(caminho):
+    import pdfplumber
+    with pdfplumber.open(caminho) as pdf:
+        return sum(len(pagina.extract_text() or '') for pagina in pdf.pages)
+
+
+def ler_com_flush(caminho):
+    import pdfplumber
+    caracteres = 0
+    with pdfplumber.open(caminho) as pdf:
+        for pagina in pdf.pages:
+            caracteres += len(pagina.extract_text() or '')
+            pagina.flush_cache()
+    return caracteres
+
+
+def ler_com_leitor(caminho):
+    from extrator_pdf import LeitorPDF
+    with LeitorPDF(caminho) as leitor:
+        return sum(len(pagina.extract_text() or '') for _, pagina in leitor.paginas())
+
+
+def _medir(funcao, caminho, fila):
+    inicio = time.perf_counter()
+    caracteres = funcao(caminho)
+    segundos = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    pico_mb = pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    fila.put((caracteres, segundos, pico_mb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paginas', type=int, default=300)
+    parser.add_argument('--linhas', type=int, default=50)
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'extrato.pdf')
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(gerar_pdf_sintetico(args.paginas, args.linhas))
+        print(f"📄 PDF sintético: {args.paginas} páginas, {args.linhas} linhas/página, "
+              f"{os.path.getsize(caminho) / 1024:.0f}KB")
+
+        for nome, funcao in (('pdf.pages', ler_ingenuo), ('pdf.pages + flush_cache', ler_com_flush),
+                             ('LeitorPDF', ler_com_leitor)):
+            fila = contexto.Queue()
+            processo = contexto.Process(target=_medir, args=(funcao, caminho, fila))
+            processo.start()
+            caracteres, segundos, pico_mb = fila.get()
+            processo.join()
+            print(f"{nome:<24} {segundos:7.2f}s  pico RSS {pico_mb:7.1f}MB  ({caracteres} caracteres)")
+
+
+if __name__ == '__main__':
+    main()
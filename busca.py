@@ -0,0 +1,122 @@
+# busca.py
+"""Busca textual nas descrições de entradas, gastos e dívidas.
+
+SQLite: tabela FTS5 (tokenizer unicode61 sem acentos) mantida por triggers.
+PostgreSQL: índices GIN sobre to_tsvector('simple', unaccent(descricao)).
+Em ambos, cada palavra buscada casa por prefixo ('merc' acha 'Mercado') e
+todas precisam aparecer na descrição.
+"""
+import re
+
+from database import USE_POSTGRES, execute_query
+
+TABELAS_BUSCA = ('entradas', 'gastos', 'dividas')
+
+# No índice FTS do SQLite, rowid = id * 4 + código da tabela (remoção direta pelo rowid)
+CODIGOS = {'entradas': 1, 'gastos': 2, 'dividas': 3}
+
+PALAVRA = re.compile(r'\w+', re.UNICODE)
+
+# Expressão indexada no PostgreSQL (precisa ser idêntica na consulta para usar o índice)
+VETOR_PG = "to_tsvector('simple', busca_unaccent(COALESCE(descricao, '')))"
+
+
+def criar_indice_busca(tx):
+    if USE_POSTGRES:
+        _criar_indice_postgres(tx)
+    else:
+        _criar_indice_sqlite(tx)
+
+
+def _criar_indice_sqlite(tx):
+    existe = tx.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'busca_fts'")
+    tx.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts
+                  USING fts5(descricao, tokenize = 'unicode61 remove_diacritics 2')''')
+
+    for tabela, codigo in CODIGOS.items():
+        tx.execute(f'''CREATE TRIGGER IF NOT EXISTS {tabela}_busca_ai AFTER INSERT ON {tabela} BEGIN
+                           INSERT INTO busca_fts (rowid, descricao) VALUES (new.id * 4 + {codigo}, new.descricao);
+                       END''')
+        tx.execute(f'''CREATE TRIGGER IF NOT EXISTS {tabela}_busca_ad AFTER DELETE ON {tabela} BEGIN
+                           DELETE FROM busca_fts WHERE rowid = old.id * 4 + {codigo};
+                       END''')
+        tx.execute(f'''CREATE TRIGGER IF NOT EXISTS {tabela}_busca_au AFTER UPDATE OF descricao ON {tabela} BEGIN
+                           DELETE FROM busca_fts WHERE rowid = old.id * 4 + {codigo};
+                           INSERT INTO busca_fts (rowid, descricao) VALUES (new.id * 4 + {codigo}, new.descricao);
+                       END''')
+
+    if not existe:
+        for tabela, codigo in CODIGOS.items():
+            tx.execute(f'''INSERT INTO busca_fts (rowid, descricao)
+                           SELECT id * 4 + {codigo}, descricao FROM {tabela}''')
+        print("✅ Índice de busca (FTS5) criado")
+
+
+def _criar_indice_postgres(tx):
+    possui_unaccent = tx.execute("SELECT 1 AS existe FROM pg_available_extensions WHERE name = 'unaccent'")
+    if possui_unaccent:
+        tx.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        corpo = "SELECT public.unaccent('public.unaccent', lower($1))"
+    else:
+        print("⚠️ Extensão unaccent indisponível: busca sensível a acentos")
+        corpo = 'SELECT lower($1)'
+    # unaccent() não é IMMUTABLE, então não pode ir direto na expressão do índice
+    tx.execute(f'''CREATE OR REPLACE FUNCTION busca_unaccent(text) RETURNS text
+                   AS $f$ {corpo} $f$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT''')
+    for tabela in TABELAS_BUSCA:
+        tx.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_busca ON {tabela} USING GIN ({VETOR_PG})')
+
+
+def palavras_busca(termo):
+    return PALAVRA.findall((termo or '').lower())
+
+
+def buscar(termo, tabelas=TABELAS_BUSCA, limite=20):
+    """Itens cuja descrição contém todas as palavras do termo, os mais relevantes primeiro"""
+    palavras = palavras_busca(termo)
+    tabelas = [tabela for tabela in tabelas if tabela in TABELAS_BUSCA]
+    if not palavras or not tabelas:
+        return []
+    if USE_POSTGRES:
+        return _buscar_postgres(palavras, tabelas, limite)
+    return _buscar_sqlite(palavras, tabelas, limite)
+
+
+def _colunas(tabela):
+    categoria = 'categoria' if tabela == 'gastos' else 'NULL'
+    return f"'{tabela}' AS tabela, id, descricao, valor, data, {categoria} AS categoria"
+
+
+def _buscar_sqlite(palavras, tabelas, limite):
+    consulta = ' '.join('"{}"*'.format(palavra.replace('"', '')) for palavra in palavras)
+    codigos = ', '.join(str(CODIGOS[tabela]) for tabela in tabelas)
+    encontrados = execute_query(f'''SELECT rowid AS chave, bm25(busca_fts) AS rank FROM busca_fts
+                                    WHERE busca_fts MATCH ? AND rowid % 4 IN ({codigos})
+                                    ORDER BY rank LIMIT ?''', (consulta, limite))
+    if not encontrados:
+        return []
+
+    ordem = {row['chave']: posicao for posicao, row in enumerate(encontrados)}
+    ids_por_tabela = {}
+    for chave in ordem:
+        ids_por_tabela.setdefault(chave % 4, []).append(chave // 4)
+
+    itens = []
+    for tabela, codigo in CODIGOS.items():
+        ids = ids_por_tabela.get(codigo)
+        if ids:
+            marcadores = ', '.join('?' * len(ids))
+            itens.extend(dict(row) for row in execute_query(
+                f'SELECT {_colunas(tabela)} FROM {tabela} WHERE id IN ({marcadores})', tuple(ids)))
+    itens.sort(key=lambda item: ordem[item['id'] * 4 + CODIGOS[item['tabela']]])
+    return itens
+
+
+def _buscar_postgres(palavras, tabelas, limite):
+    consulta = ' & '.join(f'{palavra}:*' for palavra in palavras)
+    partes = [f'''SELECT {_colunas(tabela)}, ts_rank({VETOR_PG}, q.consulta) AS rank
+                  FROM {tabela}, (SELECT to_tsquery('simple', busca_unaccent(?)) AS consulta) q
+                  WHERE {VETOR_PG} @@ q.consulta''' for tabela in tabelas]
+    linhas = execute_query(' UNION ALL '.join(partes) + ' ORDER BY rank DESC LIMIT ?',
+                           (consulta,) * len(tabelas) + (limite,))
+    return [{chave: valor for chave, valor in dict(row).items() if chave != 'rank'} for row in linhas]
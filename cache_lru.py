@@ -0,0 +1,37 @@
+# cache_lru.py
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Dicionário limitado a `tamanho` itens, descartando o usado há mais tempo.
+
+    Com `versao`, o item só vale enquanto a versão guardada for a mesma pedida
+    (ex.: as versões das tabelas de versoes.py no momento do cálculo).
+    Seguro para uso por várias threads.
+    """
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, versao=None):
+        """(True, valor) se a chave está no cache com essa versão; senão (False, None)"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[0] != versao:
+                return False, None
+            self._itens.move_to_end(chave)
+            return True, item[1]
+
+    def guardar(self, chave, valor, versao=None):
+        with self._lock:
+            self._itens[chave] = (versao, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
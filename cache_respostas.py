@@ -0,0 +1,79 @@
+# cache_respostas.py
+"""Cache das respostas GET do dashboard, carimbado com a versão dos dados.
+
+A versão global é a tupla de versões de versao_dados (ver versoes.py), que
+toda escrita incrementa na própria transação. Com ela:
+  - o ETag de uma resposta é (rota, parâmetros, versão); se o navegador manda
+    If-None-Match com o ETag atual, a resposta é 304 sem consultar as tabelas
+    de dados nem serializar JSON;
+  - o corpo já serializado fica num LRU por processo e é reaproveitado
+    enquanto a versão não mudar.
+"""
+import functools
+import hashlib
+import os
+
+from flask import request, Response
+
+from cache_lru import CacheLRU
+from versoes import versoes
+
+# Tabelas cujas escritas invalidam as respostas em cache
+TABELAS_DADOS = ('entradas', 'gastos', 'dividas', 'fixas')
+
+# Quantas respostas ficam guardadas e o tamanho máximo de cada uma
+TAMANHO_CACHE = int(os.environ.get('RESPOSTAS_CACHE_TAMANHO', 128))
+TAMANHO_MAXIMO_RESPOSTA = int(float(os.environ.get('RESPOSTAS_CACHE_MAX_KB', 512)) * 1024)
+
+
+# (rota, parâmetros) -> (ETag, corpo, mimetype), válido para uma versão dos dados
+cache_respostas = CacheLRU(TAMANHO_CACHE)
+
+
+def versao_dados():
+    return versoes(TABELAS_DADOS)
+
+
+def _etag(chave, versao):
+    conteudo = repr((chave, versao)).encode('utf-8')
+    return hashlib.sha1(conteudo).hexdigest()[:20]
+
+
+def _finalizar(resposta, etag):
+    resposta.set_etag(etag)
+    # O navegador pode guardar, mas revalida sempre (If-None-Match -> 304)
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
+
+def resposta_em_cache(view):
+    """Decorator para rotas GET que só dependem das tabelas de TABELAS_DADOS"""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+
+        chave = (request.path, tuple(sorted(request.args.items(multi=True))))
+        versao = versao_dados()
+        etag = _etag(chave, versao)
+
+        if request.if_none_match.contains(etag):
+            return _finalizar(Response(status=304), etag)
+
+        encontrado, item = cache_respostas.obter(chave, versao)
+        if encontrado:
+            etag, corpo, mimetype = item
+            return _finalizar(Response(corpo, mimetype=mimetype), etag)
+
+        resposta = view(*args, **kwargs)
+        if not isinstance(resposta, Response) or resposta.status_code != 200:
+            return resposta  # erros (tuplas com status) não vão para o cache
+
+        if not resposta.is_streamed:
+            corpo = resposta.get_data()
+            if len(corpo) <= TAMANHO_MAXIMO_RESPOSTA:
+                cache_respostas.guardar(chave, (etag, corpo, resposta.mimetype), versao)
+        return _finalizar(resposta, etag)
+
+    return wrapper
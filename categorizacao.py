@@ -0,0 +1,137 @@
+# categorizacao.py
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from database import transaction, execute_query
+
+# Regras iniciais (gravadas em regras_categoria na primeira inicialização)
+REGRAS_PADRAO = {
+    'alimentacao': ['mercado', 'supermercado', 'padaria', 'restaurante', 'lanchonete', 'ifood'],
+    'transporte': ['uber', '99', 'taxi', 'posto', 'combustivel', 'estacionamento'],
+    'moradia': ['aluguel', 'condominio', 'luz', 'agua', 'energia', 'internet'],
+    'saude': ['farmacia', 'hospital', 'medico', 'plano de saude'],
+    'educacao': ['escola', 'faculdade', 'curso', 'livraria'],
+    'entretenimento': ['cinema', 'netflix', 'spotify', 'parque'],
+}
+
+CATEGORIA_PADRAO = 'outros'
+
+# Por quanto tempo cada processo reaproveita as regras compiladas antes de
+# recarregá-las do banco (alterações feitas por outros workers)
+REGRAS_TTL = float(os.environ.get('CATEGORIAS_REGRAS_TTL', 60))
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples: 'Farmácia  São João' -> 'farmacia sao joao'"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+def criar_tabela_regras(tx):
+    """Palavras-chave de categorização editáveis pelo usuário"""
+    tx.execute('''CREATE TABLE IF NOT EXISTS regras_categoria(
+        palavra TEXT PRIMARY KEY,
+        categoria TEXT NOT NULL,
+        criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+    if tx.execute('SELECT COUNT(*) AS linhas FROM regras_categoria')[0]['linhas'] == 0:
+        tx.executemany('INSERT INTO regras_categoria (palavra, categoria) VALUES (?, ?)',
+                       [(palavra, categoria) for categoria, palavras in REGRAS_PADRAO.items()
+                        for palavra in palavras])
+        print("✅ Regras de categorização padrão criadas")
+
+
+class Categorizador:
+    """Todas as palavras-chave compiladas numa única expressão regular.
+
+    As palavras só casam inteiras (nem parte de outra palavra, nem parte de um
+    valor como '99,90') e a comparação ignora acentos e maiúsculas. Entre várias
+    palavras na descrição vale a que aparece primeiro; na mesma posição, a
+    mais longa ('plano de saude' antes de 'plano').
+    """
+
+    def __init__(self, regras):
+        # regras: {palavra: categoria}
+        self.categorias = {}
+        for palavra, categoria in regras.items():
+            chave = normalizar(palavra)
+            if chave:
+                self.categorias[chave] = categoria
+
+        if self.categorias:
+            alternativas = '|'.join(re.escape(palavra) for palavra in
+                                    sorted(self.categorias, key=len, reverse=True))
+            self.padrao = re.compile(rf'(?<![\w.,])(?:{alternativas})(?!\w|[.,]\d)')
+        else:
+            self.padrao = None
+
+    def categorizar(self, descricao):
+        if self.padrao is None:
+            return CATEGORIA_PADRAO
+        match = self.padrao.search(normalizar(descricao))
+        return self.categorias[match.group(0)] if match else CATEGORIA_PADRAO
+
+    def categorizar_lote(self, descricoes):
+        return [self.categorizar(descricao) for descricao in descricoes]
+
+
+_categorizador = None
+_carregado_em = 0.0
+_lock = threading.Lock()
+
+
+def obter_categorizador():
+    """Categorizador com as regras do banco, compilado uma vez e reaproveitado"""
+    global _categorizador, _carregado_em
+    with _lock:
+        if _categorizador is None or time.monotonic() - _carregado_em > REGRAS_TTL:
+            linhas = execute_query('SELECT palavra, categoria FROM regras_categoria')
+            _categorizador = Categorizador({row['palavra']: row['categoria'] for row in linhas})
+            _carregado_em = time.monotonic()
+        return _categorizador
+
+
+def recarregar_regras():
+    """Descarta as regras compiladas; a próxima categorização relê o banco"""
+    global _categorizador
+    with _lock:
+        _categorizador = None
+
+
+def categorizar(descricao):
+    return obter_categorizador().categorizar(descricao)
+
+
+def categorizar_lote(descricoes):
+    """Categoriza uma lista de descrições com uma única leitura das regras"""
+    return obter_categorizador().categorizar_lote(descricoes)
+
+
+def listar_regras():
+    linhas = execute_query('SELECT palavra, categoria FROM regras_categoria ORDER BY categoria, palavra')
+    return {row['palavra']: row['categoria'] for row in linhas}
+
+
+def salvar_regra(palavra, categoria):
+    """Cria ou altera a categoria associada a uma palavra-chave"""
+    palavra, categoria = normalizar(palavra), categoria.strip().lower()
+    if not palavra or not categoria:
+        raise ValueError('Palavra e categoria são obrigatórias')
+    with transaction() as tx:
+        tx.execute('''INSERT INTO regras_categoria (palavra, categoria) VALUES (?, ?)
+                      ON CONFLICT (palavra) DO UPDATE SET categoria = excluded.categoria''',
+                   (palavra, categoria))
+    recarregar_regras()
+    return palavra, categoria
+
+
+def remover_regra(palavra):
+    """Remove uma palavra-chave; retorna se ela existia"""
+    with transaction() as tx:
+        removidas = tx.execute('DELETE FROM regras_categoria WHERE palavra = ?', (normalizar(palavra),))
+    recarregar_regras()
+    return removidas > 0
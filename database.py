@@ -0,0 +1,332 @@
+# database.py
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+
+# Import para PostgreSQL com fallback para SQLite
+try:
+    import psycopg2
+    from psycopg2 import pool as pg_pool
+    from psycopg2.extras import RealDictCursor, execute_batch, execute_values
+    POSTGRES_AVAILABLE = True
+    print("✅ PostgreSQL disponível")
+except ImportError:
+    POSTGRES_AVAILABLE = False
+    print("ℹ️ Usando SQLite (PostgreSQL não disponível)")
+
+import sqlite3
+
+# =============================================
+# CONFIGURAÇÃO PARA POSTGRESQL NO RENDER
+# =============================================
+DATABASE_URL = os.environ.get('DATABASE_URL')
+USE_POSTGRES = bool(DATABASE_URL and POSTGRES_AVAILABLE)
+
+SQLITE_FILE = os.path.join(os.path.dirname(__file__), 'financas.db')
+
+# Tamanho do pool por worker do gunicorn (cada worker tem o seu próprio pool)
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', 5))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+
+
+class PostgresPool:
+    """Pool de conexões PostgreSQL que espera por uma conexão livre em vez de falhar"""
+
+    def __init__(self, dsn, minconn, maxconn, timeout):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = pg_pool.ThreadedConnectionPool(
+            minconn, maxconn, dsn,
+            sslmode='require',
+            cursor_factory=RealDictCursor
+        )
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.acquisitions = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def getconn(self):
+        inicio = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RuntimeError(f'Nenhuma conexão livre no pool após {self.timeout}s')
+        espera = time.perf_counter() - inicio
+
+        try:
+            conn = self._pool.getconn()
+            if conn.closed:
+                # Conexão derrubada pelo servidor: descarta e abre outra
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.acquisitions += 1
+            self.wait_time_total += espera
+            self.wait_time_max = max(self.wait_time_max, espera)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'postgresql',
+                'size': self.maxconn,
+                'in_use': self.in_use,
+                'acquisitions': self.acquisitions,
+                'wait_time_total': round(self.wait_time_total, 6),
+                'wait_time_avg': round(self.wait_time_total / self.acquisitions, 6) if self.acquisitions else 0.0,
+                'wait_time_max': round(self.wait_time_max, 6),
+            }
+
+
+class SQLitePool:
+    """Uma conexão SQLite reutilizável por thread, com WAL para leitores concorrentes"""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.acquisitions = 0
+
+    def getconn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=POOL_TIMEOUT)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self.connections += 1
+        with self._lock:
+            self.acquisitions += 1
+        return conn
+
+    def putconn(self, conn):
+        # A conexão fica com a thread para a próxima requisição
+        pass
+
+    def closeall(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'sqlite',
+                'size': self.connections,
+                'in_use': self.connections,
+                'acquisitions': self.acquisitions,
+                'wait_time_total': 0.0,
+                'wait_time_avg': 0.0,
+                'wait_time_max': 0.0,
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_pool():
+    """Retorna o pool do processo atual, criando-o após o fork do gunicorn"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                # Conexões herdadas do processo pai não podem ser usadas no filho
+                if USE_POSTGRES:
+                    _pool = PostgresPool(DATABASE_URL, POOL_MIN, POOL_MAX, POOL_TIMEOUT)
+                else:
+                    _pool = SQLitePool(SQLITE_FILE)
+                _pool_pid = pid
+                _local.__dict__.clear()
+    return _pool
+
+
+def pool_stats():
+    """Estatísticas do pool deste worker (tamanho, conexões em uso e tempo de espera)"""
+    stats = get_pool().stats()
+    stats['pid'] = os.getpid()
+    return stats
+
+
+def adapt_query(query):
+    """Ajusta a query para PostgreSQL se necessário"""
+    if USE_POSTGRES:
+        query = query.replace('?', '%s')
+        query = query.replace('INSERT OR REPLACE', 'INSERT')
+        query = query.replace('BLOB', 'BYTEA')
+        query = query.replace('INTEGER PRIMARY KEY AUTOINCREMENT', 'SERIAL PRIMARY KEY')
+    else:
+        query = query.replace('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+    return query
+
+
+# "VALUES (%s, %s, ...)" de um INSERT de uma linha, para montar o INSERT de várias
+VALUES_LINHA = re.compile(r'VALUES\s*(\([^)]*\))', re.IGNORECASE)
+
+
+class Transaction:
+    """Cursor de uma transação aberta, com a mesma interface nos dois bancos"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+    def execute(self, query, params=()):
+        """Executa a query e retorna as linhas (se houver) ou o número de linhas afetadas"""
+        self.cursor.execute(adapt_query(query), params)
+        if self.cursor.description is not None:
+            return self.cursor.fetchall()
+        return self.cursor.rowcount
+
+    def insert(self, query, params=()):
+        """Executa um INSERT e retorna o id da linha criada"""
+        if USE_POSTGRES:
+            self.cursor.execute(adapt_query(query) + ' RETURNING id', params)
+            return self.cursor.fetchone()['id']
+        self.cursor.execute(adapt_query(query), params)
+        return self.cursor.lastrowid
+
+    def executemany(self, query, seq_params, page_size=500):
+        """Executa a query para cada conjunto de parâmetros.
+
+        No PostgreSQL as execuções são agrupadas em páginas (uma ida ao banco
+        por página) em vez de uma ida por linha.
+        """
+        if USE_POSTGRES:
+            execute_batch(self.cursor, adapt_query(query), seq_params, page_size=page_size)
+        else:
+            self.cursor.executemany(adapt_query(query), seq_params)
+        return self.cursor.rowcount
+
+    def insert_many(self, query, seq_params, returning, page_size=500):
+        """INSERT de várias linhas; retorna a coluna `returning` só das linhas gravadas.
+
+        Linhas ignoradas por ON CONFLICT ... DO NOTHING não aparecem no
+        resultado. No PostgreSQL cada página vira um único INSERT com vários
+        VALUES; no SQLite cada linha é executada à parte.
+        """
+        query = adapt_query(query)
+        if USE_POSTGRES:
+            valores = VALUES_LINHA.search(query)
+            query = f'{query[:valores.start(1)]}%s{query[valores.end(1):]} RETURNING {returning}'
+            linhas = execute_values(self.cursor, query, seq_params, template=valores.group(1),
+                                    page_size=page_size, fetch=True)
+            return [row[returning] for row in linhas]
+        gravadas = []
+        for params in seq_params:
+            self.cursor.execute(f'{query} RETURNING {returning}', params)
+            gravadas.extend(row[returning] for row in self.cursor.fetchall())
+        return gravadas
+
+
+@contextmanager
+def transaction():
+    """Empresta uma conexão do pool e executa o bloco em uma única transação.
+
+    Chamadas aninhadas na mesma thread participam da transação externa.
+    """
+    atual = getattr(_local, 'tx', None)
+    if atual is not None:
+        yield atual
+        return
+
+    pool = get_pool()
+    conn = pool.getconn()
+    tx = Transaction(conn)
+    _local.tx = tx
+    try:
+        yield tx
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _local.tx = None
+        tx.cursor.close()
+        pool.putconn(conn)
+
+
+def execute_query(query, params=()):
+    """Executa query de forma compatível com ambos os bancos"""
+    with transaction() as tx:
+        return tx.execute(query, params)
+
+
+def stream_query(query, params=(), batch_size=500):
+    """Itera sobre as linhas de um SELECT sem carregar o resultado inteiro na memória.
+
+    No PostgreSQL usa um cursor nomeado (server-side), que traz `batch_size`
+    linhas por ida ao banco.
+    """
+    with transaction() as tx:
+        if USE_POSTGRES:
+            cursor = tx.conn.cursor(name=f'stream_{uuid.uuid4().hex}')
+            cursor.itersize = batch_size
+        else:
+            cursor = tx.conn.cursor()
+        try:
+            cursor.execute(adapt_query(query), params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+
+def column_types(tx, table):
+    """Colunas da tabela e seus tipos (em minúsculas), para migrações idempotentes"""
+    if USE_POSTGRES:
+        rows = tx.execute('''SELECT column_name AS nome, data_type AS tipo
+                             FROM information_schema.columns
+                             WHERE table_name = ?''', (table,))
+    else:
+        rows = tx.execute(f"SELECT name AS nome, type AS tipo FROM pragma_table_info('{table}')")
+    return {row['nome']: (row['tipo'] or '').lower() for row in rows}
+
+
+def add_column(tx, table, column, definition):
+    """ALTER TABLE ADD COLUMN idempotente (o SQLite não aceita IF NOT EXISTS)"""
+    if column not in column_types(tx, table):
+        tx.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        print(f"✅ Coluna {column} adicionada em {table}")
+
+
+def row_to_dict(row):
+    """Converte uma linha em dict serializável, com datas no formato YYYY-MM-DD HH:MM:SS"""
+    resultado = dict(row)
+    for chave, valor in resultado.items():
+        if isinstance(valor, datetime):
+            resultado[chave] = valor.strftime('%Y-%m-%d %H:%M:%S')
+        elif isinstance(valor, date):
+            resultado[chave] = valor.isoformat()
+    return resultado
@@ -0,0 +1,393 @@
+# extrator_pdf.py
+"""Extração de dados de PDFs (contracheques, extratos) fora do processo web.
+
+O pdfplumber é lento e usa bastante memória em documentos digitalizados,
+então a leitura roda num pool de processos. O resultado fica guardado pelo
+hash do arquivo: reenviar o mesmo PDF não extrai de novo.
+"""
+import hashlib
+import json
+import os
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from threading import Lock
+
+import pdfplumber
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1
+from pdfplumber.page import Page
+
+from database import execute_query
+from categorizacao import normalizar
+
+# Processos do pool e tempo máximo por arquivo
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))
+PDF_TIMEOUT = float(os.environ.get('PDF_TIMEOUT', 120))
+
+# Objetos do PDF já interpretados que o pdfminer pode manter antes de descartá-los
+LIMITE_CACHE_OBJETOS = int(os.environ.get('PDF_LIMITE_CACHE_OBJETOS', 2000))
+
+# Páginas mais lentas que isso aparecem no log (pdfplumber em página digitalizada)
+PAGINA_LENTA = float(os.environ.get('PDF_PAGINA_LENTA', 2.0))
+
+VALOR = re.compile(r'\d{1,3}(?:\.\d{3})*,\d{2}|\d+,\d{2}')
+
+MESES = ['janeiro', 'fevereiro', 'marco', 'abril', 'maio', 'junho', 'julho',
+         'agosto', 'setembro', 'outubro', 'novembro', 'dezembro']
+MES_POR_EXTENSO = re.compile(rf"\b({'|'.join(MESES)})\b\s*(?:de\s*|/\s*)?(\d{{4}})")
+MES_NUMERICO = re.compile(r'\b(0[1-9]|1[0-2])\s*/\s*(\d{4})\b')
+
+# Rótulos (sem acentos, minúsculos) dos totais do contracheque, do mais ao menos específico
+ROTULOS_BRUTO = ('total de vencimentos', 'total vencimentos', 'total bruto', 'salario bruto', 'total proventos')
+ROTULOS_LIQUIDO = ('liquido a receber', 'valor liquido', 'liquido a pagar', 'total liquido', 'liquido')
+ROTULOS_DESCONTOS = ('total de descontos', 'total descontos')
+
+# Páginas de extrato lidas por tarefa do pool
+PAGINAS_POR_LOTE = int(os.environ.get('PDF_PAGINAS_POR_LOTE', 10))
+
+# Linha de extrato: data, descrição, valor e (opcional) saldo. Ex.:
+# "15/03 PIX TRANSF JOAO 15/03 -150,00 1.234,56" ou "15/03/2024 SALARIO 3.000,00 C"
+LINHA_EXTRATO = re.compile(
+    r'^(\d{2})/(\d{2})(?:/(\d{2,4}))?\s+(.+?)\s+'
+    r'(-\s?)?(\d{1,3}(?:\.\d{3})*,\d{2}|\d+,\d{2})\s?(-|[DC]\b)?'
+    r'(?:\s+-?\s?(?:\d{1,3}(?:\.\d{3})*,\d{2}|\d+,\d{2})\s?-?[DC]?)?\s*$')
+ANO = re.compile(r'\b(20\d{2})\b')
+
+# Descontos reconhecidos individualmente
+DESCONTOS = ('inss', 'irrf', 'imposto de renda', 'vale transporte', 'vale refeicao', 'vale alimentacao',
+             'plano de saude', 'plano odontologico', 'assistencia medica', 'pensao', 'contribuicao sindical',
+             'adiantamento', 'faltas', 'emprestimo', 'consignado', 'coparticipacao')
+
+
+def criar_tabela_extracoes(tx):
+    """Resultados das extrações de PDF, pelo hash do arquivo, e extratos importados"""
+    tx.execute('''CREATE TABLE IF NOT EXISTS extracoes_pdf(
+        arquivo_hash TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        resultado TEXT NOT NULL,
+        paginas INTEGER,
+        segundos REAL,
+        criado_em TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (arquivo_hash, tipo)
+    )''')
+    tx.execute('''CREATE TABLE IF NOT EXISTS extratos_pdf(
+        arquivo_hash TEXT PRIMARY KEY,
+        arquivo_nome TEXT,
+        arquivo_tamanho INTEGER,
+        paginas INTEGER,
+        transacoes INTEGER,
+        importado_em TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+
+def valor_brl(texto):
+    """'1.234,56' -> 1234.56"""
+    return float(texto.replace('.', '').replace(',', '.'))
+
+
+def _ultimo_valor(linha):
+    valores = VALOR.findall(linha)
+    return valor_brl(valores[-1]) if valores else None
+
+
+def rss_mb():
+    """Memória residente atual do processo, em MB"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Sem /proc (macOS): só o pico do processo inteiro está disponível
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+class LeitorPDF:
+    """Percorre as páginas de um PDF sem manter as já lidas na memória.
+
+    `pdf.pages` do pdfplumber cria (e guarda) um Page para cada página do
+    documento; aqui as páginas são criadas uma a uma a partir do pdfminer, e o
+    cache de cada uma é descartado assim que o chamador passa para a próxima.
+    Também registra o pico de memória residente durante a leitura.
+    """
+
+    def __init__(self, caminho_arquivo):
+        self.caminho_arquivo = caminho_arquivo
+        self.pdf = None
+        self.pico_rss_mb = 0.0
+
+    def __enter__(self):
+        self.pdf = pdfplumber.open(self.caminho_arquivo)
+        self.pico_rss_mb = rss_mb()
+        return self
+
+    def __exit__(self, *excecao):
+        self.pdf.close()
+        self.pico_rss_mb = max(self.pico_rss_mb, rss_mb())
+
+    @property
+    def total_paginas(self):
+        """Lido do catálogo do PDF, sem interpretar nenhuma página"""
+        try:
+            return int(resolve1(self.pdf.doc.catalog['Pages'])['Count'])
+        except (KeyError, TypeError, ValueError):
+            return sum(1 for _ in PDFPage.create_pages(self.pdf.doc))
+
+    def paginas(self, inicio=0, fim=None):
+        """Gera (numero, pagina) das páginas [inicio, fim), contando a partir de 0"""
+        for indice, objeto in enumerate(PDFPage.create_pages(self.pdf.doc)):
+            if fim is not None and indice >= fim:
+                break
+            if indice < inicio:
+                continue
+            # initial_doctop fica 0: só o texto de cada página é usado, não a posição no documento
+            pagina = Page(self.pdf, objeto, page_number=indice + 1)
+            try:
+                yield indice + 1, pagina
+            finally:
+                self._liberar(pagina)
+
+    def _liberar(self, pagina):
+        pagina.flush_cache()
+        if hasattr(pagina, 'close'):  # pdfplumber >= 0.11
+            pagina.close()
+        # Conteúdo das páginas já lidas que o pdfminer guarda no documento
+        documento = self.pdf.doc
+        for cache in (getattr(documento, '_cached_objs', None), getattr(documento, '_parsed_objs', None)):
+            if cache is not None and len(cache) > LIMITE_CACHE_OBJETOS:
+                cache.clear()
+        self.pico_rss_mb = max(self.pico_rss_mb, rss_mb())
+
+
+def ler_paginas(caminho_arquivo):
+    """Texto de cada página, o tempo gasto em cada uma e o pico de memória (MB)"""
+    textos, tempos = [], []
+    with LeitorPDF(caminho_arquivo) as leitor:
+        for numero, pagina in leitor.paginas():
+            inicio = time.perf_counter()
+            textos.append(pagina.extract_text() or '')
+            tempos.append(round(time.perf_counter() - inicio, 4))
+            if tempos[-1] > PAGINA_LENTA:
+                print(f"🐢 {os.path.basename(caminho_arquivo)} página {numero}: {tempos[-1]}s")
+    return textos, tempos, round(leitor.pico_rss_mb, 1)
+
+
+def analisar_contracheque(linhas):
+    """Bruto, líquido, descontos e mês de referência a partir das linhas de texto"""
+    resultado = {'valor_bruto': None, 'valor_liquido': None, 'total_descontos': None,
+                 'descontos': [], 'data_detectada': None, 'erros': []}
+
+    for linha in linhas:
+        normalizada = normalizar(linha)
+        valor = _ultimo_valor(linha)
+
+        if resultado['data_detectada'] is None:
+            match = MES_POR_EXTENSO.search(normalizada)
+            if match:
+                resultado['data_detectada'] = f"{match.group(2)}-{MESES.index(match.group(1)) + 1:02d}"
+            else:
+                match = MES_NUMERICO.search(normalizada)
+                if match:
+                    resultado['data_detectada'] = f'{match.group(2)}-{match.group(1)}'
+
+        if valor is None:
+            continue
+        if resultado['valor_bruto'] is None and any(r in normalizada for r in ROTULOS_BRUTO):
+            resultado['valor_bruto'] = valor
+        elif resultado['total_descontos'] is None and any(r in normalizada for r in ROTULOS_DESCONTOS):
+            resultado['total_descontos'] = valor
+        elif resultado['valor_liquido'] is None and any(r in normalizada for r in ROTULOS_LIQUIDO):
+            resultado['valor_liquido'] = valor
+        else:
+            desconto = next((d for d in DESCONTOS if re.search(rf'\b{d}\b', normalizada)), None)
+            if desconto:
+                resultado['descontos'].append({'descricao': linha.split(VALOR.findall(linha)[0])[0].strip()
+                                               or desconto, 'valor': valor})
+
+    if resultado['total_descontos'] is None and resultado['descontos']:
+        resultado['total_descontos'] = round(sum(d['valor'] for d in resultado['descontos']), 2)
+    if resultado['valor_liquido'] is None and resultado['valor_bruto'] is not None \
+            and resultado['total_descontos'] is not None:
+        resultado['valor_liquido'] = round(resultado['valor_bruto'] - resultado['total_descontos'], 2)
+        resultado['erros'].append('Líquido calculado (bruto - descontos)')
+
+    if resultado['valor_bruto'] is None:
+        resultado['erros'].append('Valor bruto não encontrado')
+    if resultado['valor_liquido'] is None:
+        resultado['erros'].append('Valor líquido não encontrado')
+    if resultado['data_detectada'] is None:
+        resultado['erros'].append('Mês de referência não encontrado')
+    return resultado
+
+
+def extrair_contracheque(caminho_arquivo):
+    """Executada nos processos do pool: lê o PDF e analisa o contracheque"""
+    inicio = time.perf_counter()
+    textos, tempos, pico_rss_mb = ler_paginas(caminho_arquivo)
+    resultado = analisar_contracheque([linha for texto in textos for linha in texto.splitlines()])
+    vazias = [numero for numero, texto in enumerate(textos, start=1) if not texto.strip()]
+    if vazias:
+        resultado['erros'].append(f'Página(s) sem texto (digitalizada?): {vazias}')
+    resultado['paginas'] = len(textos)
+    resultado['tempos_paginas'] = tempos
+    resultado['pico_rss_mb'] = pico_rss_mb
+    resultado['segundos'] = round(time.perf_counter() - inicio, 4)
+    return resultado
+
+
+def analisar_linha_extrato(linha, ano):
+    """Transação no formato do Open Banking a partir de uma linha do extrato (ou None)"""
+    match = LINHA_EXTRATO.match(linha.strip())
+    if not match:
+        return None
+    dia, mes, ano_linha, descricao, menos, valor, sufixo = match.groups()
+    if 'saldo' in normalizar(descricao):
+        return None  # "SALDO ANTERIOR", "SALDO DO DIA"...
+    if ano_linha:
+        ano = int(ano_linha) + (2000 if len(ano_linha) == 2 else 0)
+    debito = bool(menos) or sufixo in ('-', 'D')
+    return {
+        'transactionName': descricao.strip(),
+        'amount': valor_brl(valor),
+        'creditDebitType': 'DEBIT' if debito else 'CREDIT',
+        'bookingDate': f'{ano:04d}-{int(mes):02d}-{int(dia):02d}'
+    }
+
+
+def corrigir_virada_de_ano(transacoes, ano, anterior=None):
+    """Avança o ano das linhas sem ano depois que o extrato passa de dezembro para janeiro.
+
+    `ano` é o ano lido na primeira página e `anterior` o (ano, mês) da última
+    linha já corrigida, vinda do lote anterior. Altera as transações no lugar
+    e retorna o (ano, mês) da última, para o próximo lote.
+    """
+    for transacao in transacoes:
+        ano_linha, mes, dia = (int(parte) for parte in transacao['bookingDate'].split('-'))
+        if anterior is not None:
+            if ano_linha == ano and ano_linha < anterior[0]:
+                ano_linha = anterior[0]   # linha sem ano depois de uma virada já vista
+            if anterior == (ano_linha, 12) and mes == 1:
+                ano_linha += 1
+        transacao['bookingDate'] = f'{ano_linha:04d}-{mes:02d}-{dia:02d}'
+        anterior = (ano_linha, mes)
+    return anterior
+
+
+def preparar_extrato(caminho_arquivo):
+    """Executada no pool: número de páginas e ano do extrato (lido da primeira página)"""
+    primeira = ''
+    with LeitorPDF(caminho_arquivo) as leitor:
+        total = leitor.total_paginas
+        for _, pagina in leitor.paginas(0, 1):
+            primeira = pagina.extract_text() or ''
+    anos = ANO.findall(primeira)
+    return total, int(anos[0]) if anos else time.localtime().tm_year
+
+
+def extrair_paginas_extrato(caminho_arquivo, inicio, fim, ano):
+    """Executada no pool: transações das páginas [inicio, fim) do extrato.
+
+    Cada processo abre o PDF e percorre só o seu intervalo, uma página por vez.
+    """
+    transacoes, tempos = [], []
+    with LeitorPDF(caminho_arquivo) as leitor:
+        for _, pagina in leitor.paginas(inicio, fim):
+            comeco = time.perf_counter()
+            for linha in (pagina.extract_text() or '').splitlines():
+                transacao = analisar_linha_extrato(linha, ano)
+                if transacao:
+                    transacoes.append(transacao)
+            tempos.append(round(time.perf_counter() - comeco, 4))
+    return transacoes, tempos, leitor.pico_rss_mb
+
+
+def iterar_extrato(caminho_arquivo):
+    """Lê um extrato em paralelo e entrega (paginas_lidas, total_paginas, transacoes) por lote, em ordem.
+
+    Cada transação recebe um transactionId estável (hash dos campos e da
+    ordem entre transações idênticas no extrato), para que importar o mesmo
+    extrato de novo não duplique nada.
+    """
+    pool = obter_pool()
+    total, ano = pool.submit(preparar_extrato, caminho_arquivo).result(timeout=PDF_TIMEOUT)
+    lotes = [(inicio, min(inicio + PAGINAS_POR_LOTE, total)) for inicio in range(0, total, PAGINAS_POR_LOTE)]
+
+    # Só alguns lotes em andamento por vez, para não acumular resultados na memória
+    em_andamento = []
+    proximo = 0
+    ocorrencias = {}
+    anterior = None
+    pico_rss_mb = 0.0
+    while proximo < len(lotes) or em_andamento:
+        while proximo < len(lotes) and len(em_andamento) < PDF_WORKERS * 2:
+            inicio, fim = lotes[proximo]
+            em_andamento.append((fim, pool.submit(extrair_paginas_extrato, caminho_arquivo, inicio, fim, ano)))
+            proximo += 1
+
+        fim, futuro = em_andamento.pop(0)
+        transacoes, tempos, pico_lote = futuro.result(timeout=PDF_TIMEOUT)
+        pico_rss_mb = max(pico_rss_mb, pico_lote)
+        lentas = [t for t in tempos if t > PAGINA_LENTA]
+        if lentas:
+            print(f"🐢 Extrato: {len(lentas)} página(s) lentas até a página {fim} (máx. {max(lentas)}s)")
+
+        # Os lotes chegam em ordem: a virada de ano pode cair entre dois deles
+        anterior = corrigir_virada_de_ano(transacoes, ano, anterior)
+        for transacao in transacoes:
+            campos = '|'.join(str(transacao[campo]) for campo in
+                              ('bookingDate', 'amount', 'creditDebitType', 'transactionName'))
+            ocorrencias[campos] = ocorrencias.get(campos, -1) + 1
+            transacao['transactionId'] = 'pdf-' + hashlib.sha1(
+                f'{campos}|{ocorrencias[campos]}'.encode('utf-8')).hexdigest()
+        yield fim, total, transacoes
+
+    print(f"📄 Extrato {os.path.basename(caminho_arquivo)[:12]}: {total} página(s), "
+          f"pico de {pico_rss_mb:.1f}MB por processo de leitura")
+
+
+EXTRATORES = {'contracheque': extrair_contracheque}
+
+_pool = None
+_pool_pid = None
+_pool_lock = Lock()
+
+
+def obter_pool():
+    """Pool de processos deste worker (recriado depois de um fork)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def resultado_em_cache(arquivo_hash, tipo):
+    linhas = execute_query('SELECT resultado FROM extracoes_pdf WHERE arquivo_hash = ? AND tipo = ?',
+                           (arquivo_hash, tipo))
+    return json.loads(linhas[0]['resultado']) if linhas else None
+
+
+def extrair(arquivo_hash, caminho_arquivo, tipo='contracheque'):
+    """Resultado da extração do arquivo, do cache ou calculado no pool de processos"""
+    resultado = resultado_em_cache(arquivo_hash, tipo)
+    if resultado is not None:
+        return resultado
+
+    futuro = obter_pool().submit(EXTRATORES[tipo], caminho_arquivo)
+    try:
+        resultado = futuro.result(timeout=PDF_TIMEOUT)
+    except FuturesTimeout:
+        futuro.cancel()
+        raise RuntimeError(f'Extração passou de {PDF_TIMEOUT:.0f}s')
+
+    execute_query('''INSERT INTO extracoes_pdf (arquivo_hash, tipo, resultado, paginas, segundos)
+                     VALUES (?, ?, ?, ?, ?)
+                     ON CONFLICT (arquivo_hash, tipo) DO NOTHING''',
+                  (arquivo_hash, tipo, json.dumps(resultado, ensure_ascii=False),
+                   resultado.get('paginas'), resultado.get('segundos')))
+    print(f"📄 PDF {arquivo_hash[:12]} extraído: {resultado.get('paginas')} página(s) "
+          f"em {resultado.get('segundos')}s, pico de {resultado.get('pico_rss_mb')}MB")
+    return resultado
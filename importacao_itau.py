@@ -0,0 +1,189 @@
+# importacao_itau.py
+import hashlib
+import time
+from datetime import datetime
+
+from database import transaction, execute_query, add_column
+from saldos import registrar_movimentos
+from modelo_categorias import sugerir_categorias
+
+# Tamanho máximo das listas em `IN (...)` na checagem de duplicadas
+TAMANHO_BLOCO_CHAVES = 500
+
+
+def criar_tabelas_importacao(tx):
+    """Chave natural das transações importadas e estado da sincronização por conta"""
+    for tabela in ('entradas', 'gastos'):
+        add_column(tx, tabela, 'chave_externa', 'TEXT')
+        tx.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabela}_chave_externa ON {tabela}(chave_externa)')
+
+    tx.execute('''CREATE TABLE IF NOT EXISTS sync_estado(
+        banco TEXT NOT NULL,
+        conta TEXT NOT NULL,
+        ultima_data TEXT,
+        ultima_transacao TEXT,
+        atualizado_em TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (banco, conta)
+    )''')
+
+
+def obter_sync_estado(banco, conta):
+    """Última bookingDate/transactionId importados da conta (ou None)"""
+    linhas = execute_query('''SELECT ultima_data, ultima_transacao FROM sync_estado
+                              WHERE banco = ? AND conta = ?''', (banco, conta))
+    return dict(linhas[0]) if linhas else None
+
+
+def atualizar_sync_estado(banco, conta, ultima_data, ultima_transacao):
+    """Avança a marca d'água da conta; nunca volta para uma data anterior.
+
+    Só deve ser chamada depois que todas as transações da conta foram gravadas.
+    """
+    execute_query('''INSERT INTO sync_estado (banco, conta, ultima_data, ultima_transacao, atualizado_em)
+                     VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                     ON CONFLICT (banco, conta) DO UPDATE SET
+                         ultima_data = CASE WHEN excluded.ultima_data >= COALESCE(sync_estado.ultima_data, '')
+                                            THEN excluded.ultima_data ELSE sync_estado.ultima_data END,
+                         ultima_transacao = CASE WHEN excluded.ultima_data >= COALESCE(sync_estado.ultima_data, '')
+                                                 THEN excluded.ultima_transacao ELSE sync_estado.ultima_transacao END,
+                         atualizado_em = excluded.atualizado_em''',
+                  (banco, conta, ultima_data, ultima_transacao))
+
+
+def chave_natural(banco, conta, transacao, ocorrencia=0):
+    """Identifica a transação de forma estável entre sincronizações.
+
+    Usa o transactionId do banco quando existe; senão, um hash dos campos da
+    transação mais a ordem em que ela aparece entre transações idênticas.
+    """
+    transaction_id = transacao.get('transactionId')
+    if transaction_id:
+        return f'{banco}:{conta}:{transaction_id}'
+    campos = '|'.join(str(transacao.get(campo, '')) for campo in
+                      ('bookingDate', 'amount', 'creditDebitType', 'transactionName'))
+    digest = hashlib.sha1(f'{campos}|{ocorrencia}'.encode('utf-8')).hexdigest()
+    return f'{banco}:{conta}:{digest}'
+
+
+def _chaves_existentes(tx, chaves):
+    existentes = set()
+    chaves = list(chaves)
+    for i in range(0, len(chaves), TAMANHO_BLOCO_CHAVES):
+        bloco = chaves[i:i + TAMANHO_BLOCO_CHAVES]
+        marcadores = ', '.join('?' * len(bloco))
+        for row in tx.execute(f'''SELECT chave_externa FROM entradas WHERE chave_externa IN ({marcadores})
+                                 UNION ALL
+                                 SELECT chave_externa FROM gastos WHERE chave_externa IN ({marcadores})''',
+                              tuple(bloco) * 2):
+            existentes.add(row['chave_externa'])
+    return existentes
+
+
+def preparar_transacao(transacao):
+    """Normaliza uma transação do Open Banking para entrada ou gasto"""
+    descricao = transacao.get('transactionName', 'Transação Itaú')
+    valor = float(transacao.get('amount', 0))
+    data = transacao.get('bookingDate') or datetime.now().strftime('%Y-%m-%d')
+    tipo = transacao.get('creditDebitType', 'DEBIT')  # DEBIT ou CREDIT
+
+    # Define se é entrada ou gasto
+    if tipo == 'CREDIT':
+        tabela = 'entradas'
+        descricao = f"💰 {descricao}"
+    else:
+        tabela = 'gastos'
+        descricao = f"💸 {descricao}"
+
+    return {
+        'tabela': tabela,
+        'descricao': descricao,
+        'valor': valor,
+        'data': data,
+        'tipo': tipo
+    }
+
+
+def importar_lote(transacoes, banco='itau', conta=''):
+    """Categoriza e grava uma página de transações em uma única transação do banco.
+
+    Transações já importadas (mesma chave natural) são ignoradas.
+
+    Retorna (resumos, estatisticas): o resumo de cada transação nova, no formato
+    devolvido pela rota de importação, e a contagem/velocidade do lote, com a
+    bookingDate/transactionId mais recentes vistos (para atualizar_sync_estado).
+    """
+    inicio = time.perf_counter()
+
+    preparadas = {}
+    ocorrencias = {}
+    ultima_data, ultima_transacao = None, None
+    for transacao in transacoes:
+        try:
+            item = preparar_transacao(transacao)
+            assinatura = (item['data'], item['valor'], item['tipo'], item['descricao'])
+            ocorrencias[assinatura] = ocorrencias.get(assinatura, -1) + 1
+            item['chave'] = chave_natural(banco, conta, transacao, ocorrencias[assinatura])
+            preparadas.setdefault(item['chave'], item)
+            if ultima_data is None or item['data'] >= ultima_data:
+                ultima_data, ultima_transacao = item['data'], transacao.get('transactionId')
+        except Exception as e:
+            print(f"❌ Erro processar transação: {e}")
+
+    with transaction() as tx:
+        # Só evita categorizar o que já foi importado; quem decide o que é novo é o ON CONFLICT
+        existentes = _chaves_existentes(tx, preparadas)
+        recebidas = len(preparadas)
+        preparadas = [item for chave, item in preparadas.items() if chave not in existentes]
+
+        # Categorização automática do lote inteiro (regras e, na falta delas, o modelo treinado)
+        categorias = sugerir_categorias([item['descricao'] for item in preparadas])
+        for item, categoria in zip(preparadas, categorias):
+            item['categoria'] = categoria
+
+        entradas = [item for item in preparadas if item['tabela'] == 'entradas']
+        gastos = [item for item in preparadas if item['tabela'] == 'gastos']
+
+        # Outra importação concorrente pode gravar as mesmas chaves depois da checagem acima:
+        # os agregados só recebem as linhas que este INSERT gravou de fato
+        gravadas = set()
+        if entradas:
+            gravadas.update(tx.insert_many(
+                '''INSERT INTO entradas (descricao, valor, data, chave_externa) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (chave_externa) DO NOTHING''',
+                [(item['descricao'], item['valor'], item['data'], item['chave']) for item in entradas],
+                'chave_externa'))
+            registrar_movimentos(tx, 'entradas', [(None, item['data'], item['valor'])
+                                                  for item in entradas if item['chave'] in gravadas])
+        if gastos:
+            gravadas.update(tx.insert_many(
+                '''INSERT INTO gastos (descricao, categoria, valor, data, chave_externa)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (chave_externa) DO NOTHING''',
+                [(item['descricao'], item['categoria'], abs(item['valor']), item['data'], item['chave'])
+                 for item in gastos],
+                'chave_externa'))
+            registrar_movimentos(tx, 'gastos', [(item['categoria'], item['data'], abs(item['valor']))
+                                                for item in gastos if item['chave'] in gravadas])
+        preparadas = [item for item in preparadas if item['chave'] in gravadas]
+
+    segundos = time.perf_counter() - inicio
+    estatisticas = {
+        'linhas': len(preparadas),
+        'duplicadas': recebidas - len(preparadas),
+        'segundos': round(segundos, 4),
+        'linhas_por_segundo': round(len(preparadas) / segundos, 1) if segundos > 0 else 0.0,
+        'ultima_data': ultima_data,
+        'ultima_transacao': ultima_transacao
+    }
+    print(f"✅ Lote importado: {estatisticas['linhas']} transações novas, "
+          f"{estatisticas['duplicadas']} duplicadas ({estatisticas['linhas_por_segundo']} linhas/s)")
+
+    resumos = [{
+        'descricao': item['descricao'],
+        'valor': item['valor'],
+        'data': item['data'],
+        'tipo': item['tipo'],
+        'categoria': item['categoria']
+    } for item in preparadas]
+
+    return resumos, estatisticas
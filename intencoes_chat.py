@@ -0,0 +1,219 @@
+# intencoes_chat.py
+"""Roteador de intenções do /chat, compilado uma única vez na importação.
+
+Todas as palavras-chave ficam numa só expressão regular com um grupo nomeado
+por intenção, então identificar o comando é uma única varredura da mensagem.
+Depois vêm as entidades: valor ("50", "R$ 1.234,56"), data ("ontem",
+"15/03"), categoria explícita ("categoria lazer") e a descrição que sobra.
+
+    interpretar("gastei 50 no mercado ontem")
+    -> Comando(intencao='gasto', valor=50.0, data='2026-10-17 ...', descricao='Mercado', ...)
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+# Em ordem de prioridade: se a mensagem tiver palavras de várias intenções,
+# vale a primeira da lista (um "delete" nunca vira um gasto)
+INTENCOES = (
+    ('deletar', ('delete', 'deletar', 'remover', 'apagar', 'excluir')),
+    ('relatorio', ('relatório', 'relatorio', 'resumo')),
+    ('analisar', ('como andam', 'analisar', 'dicas', 'sugestões', 'sugestoes', 'estou bem')),
+    ('gasto', ('gastei', 'gasto', 'comprei', 'paguei')),
+    ('entrada', ('entrada', 'salário', 'salario', 'receita', 'ganhei', 'recebi')),
+)
+
+# Palavras-chave que também descrevem o item e ficam na descrição ("recebi salário 3500")
+MANTER_NA_DESCRICAO = frozenset({'entrada', 'salário', 'salario', 'receita'})
+
+PRIORIDADE = {intencao: posicao for posicao, (intencao, _) in enumerate(INTENCOES)}
+
+
+def _compilar_intencoes():
+    grupos = []
+    for intencao, palavras in INTENCOES:
+        # Mais longas primeiro, para 'deletar' não parar em 'delete'
+        alternativas = '|'.join(re.escape(p) for p in sorted(palavras, key=len, reverse=True))
+        grupos.append(f'(?P<{intencao}>{alternativas})')
+    # Início de palavra obrigatório; o fim fica livre ('gasto' também casa 'gastos')
+    return re.compile(r'(?<!\w)(?:' + '|'.join(grupos) + r')\w*')
+
+
+PADRAO_INTENCOES = _compilar_intencoes()
+
+PADRAO_CONFIRMAR = re.compile(r'^\s*confirmar\b')
+
+PADRAO_DATA = re.compile(r'(?<![\w/])(?:(?P<relativa>anteontem|ontem|hoje)'
+                         r'|(?P<dia>\d{1,2})/(?P<mes>\d{1,2})(?:/(?P<ano>\d{2}|\d{4}))?)(?![\w/])')
+
+# "50", "50,90", "50.90", "1.234,56", "R$ 12", "por 80" (nunca parte de uma data).
+# O sinal de "-50" é capturado para o valor sair negativo e ser recusado no /chat
+PADRAO_VALOR = re.compile(r'(?<![\w/.,-])(?P<marcador>(?:por|de|custou|valor)\s+)?(?P<sinal>-)?(?P<moeda>r\$\s*)?'
+                          r'(?P<numero>\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[.,]\d{1,2})?)'
+                          r'(?![\w/]|[.,]\d)(?P<reais>\s*reais\b)?')
+
+PADRAO_PROXIMA_PALAVRA = re.compile(r'\s*([^\s?!.,;]+)')
+
+# Mensagens que perguntam algo ("quanto gastei...?") nunca viram lançamentos
+PALAVRAS_PERGUNTA = frozenset({'quanto', 'quantos', 'quanta', 'quantas', 'qual', 'quais', 'quando',
+                               'onde', 'como', 'porque', 'será', 'sera'})
+
+PADRAO_CATEGORIA = re.compile(r'(?<!\w)(?:na |em )?categoria\s+(?P<categoria>\w+)')
+
+# Palavras que só ligam as partes da frase e não entram na descrição
+PALAVRAS_LIGACAO = frozenset({
+    'a', 'o', 'as', 'os', 'no', 'na', 'nos', 'nas', 'em', 'de', 'do', 'da', 'dos', 'das',
+    'com', 'pelo', 'pela', 'para', 'pra', 'por', 'um', 'uma', 'eu', 'r$', 'reais', 'real', 'hoje',
+})
+
+PADRAO_PALAVRA = re.compile(r'\S+')
+
+PADRAO_ALFANUMERICO = re.compile(r'\w')
+
+
+class Comando:
+    """Intenção reconhecida numa mensagem do chat e as entidades extraídas dela"""
+
+    __slots__ = ('intencao', 'confirmado', 'pergunta', 'valor', 'valores_possiveis', 'data', 'categoria',
+                 'descricao')
+
+    def __init__(self, intencao, confirmado=False, pergunta=False, valor=None, valores_possiveis=(),
+                 data=None, categoria=None, descricao=''):
+        self.intencao = intencao
+        self.confirmado = confirmado
+        self.pergunta = pergunta            # a mensagem é uma pergunta, não um lançamento
+        self.valor = valor
+        self.valores_possiveis = valores_possiveis   # vários números sem um valor claro
+        self.data = data
+        self.categoria = categoria
+        self.descricao = descricao
+
+    def __repr__(self):
+        campos = ', '.join(f'{campo}={getattr(self, campo)!r}' for campo in self.__slots__)
+        return f'Comando({campos})'
+
+
+def converter_valor(numero):
+    """'1.234,56' -> 1234.56, '50,9' -> 50.9, '50.90' -> 50.9"""
+    if ',' in numero:
+        numero = numero.replace('.', '').replace(',', '.')
+    elif numero.count('.') == 1 and len(numero.split('.')[1]) == 3:
+        numero = numero.replace('.', '')  # milhar sem centavos: '1.500'
+    return float(numero)
+
+
+def converter_data(encontrado, agora=None):
+    """Data no formato das colunas `data` (YYYY-MM-DD HH:MM:SS, UTC); None para "hoje"."""
+    agora = agora or datetime.now(timezone.utc)
+    relativa = encontrado.group('relativa')
+    if relativa == 'hoje':
+        return None
+    if relativa:
+        dias = 2 if relativa == 'anteontem' else 1
+        return (agora - timedelta(days=dias)).strftime('%Y-%m-%d %H:%M:%S')
+
+    ano = encontrado.group('ano')
+    ano = int(ano) + 2000 if ano and len(ano) == 2 else int(ano or agora.year)
+    try:
+        data = datetime(ano, int(encontrado.group('mes')), int(encontrado.group('dia')), 12)
+    except ValueError:
+        return None
+    if not encontrado.group('ano') and data.date() > agora.date():
+        data = data.replace(year=ano - 1)  # "15/12" dito em janeiro é do ano passado
+    return data.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _apagar(texto, inicio, fim):
+    # Troca o trecho por espaços, mantendo as posições do restante da mensagem
+    return texto[:inicio] + ' ' * (fim - inicio) + texto[fim:]
+
+
+def _escolher_valor(texto):
+    """O número que é o valor do lançamento, ou (None, possíveis) quando não dá para saber.
+
+    Valem primeiro os marcados: com R$/reais, com centavos ou milhar, ou
+    depois de "por"/"de" ("comprei 2 pizzas por 80"). Sem nenhum marcado, um
+    número seguido de outra palavra que não seja de ligação pode ser
+    quantidade ("2 pizzas") e não é aceito sozinho; mais de um candidato,
+    ou só quantidades, é ambíguo e volta em `possíveis` para confirmação.
+    """
+    marcados, soltos, quantidades = [], [], []
+    for encontrado in PADRAO_VALOR.finditer(texto):
+        numero = encontrado.group('numero')
+        if (encontrado.group('moeda') or encontrado.group('reais') or encontrado.group('marcador')
+                or ',' in numero or '.' in numero):
+            marcados.append(encontrado)
+            continue
+        seguinte = PADRAO_PROXIMA_PALAVRA.match(texto, encontrado.end())
+        if seguinte is None or seguinte.group(1) in PALAVRAS_LIGACAO:
+            soltos.append(encontrado)
+        else:
+            quantidades.append(encontrado)
+
+    candidatos = marcados or soltos
+    if len(candidatos) == 1:
+        return candidatos[0], ()
+    return None, tuple(converter_valor(encontrado.group('numero')) for encontrado in candidatos or quantidades)
+
+
+def interpretar(mensagem, agora=None):
+    """Comando da mensagem, ou None se nenhuma intenção for reconhecida"""
+    texto = mensagem.strip().lower()
+
+    intencao, trechos = None, []
+    for encontrado in PADRAO_INTENCOES.finditer(texto):
+        candidata = encontrado.lastgroup
+        trechos.append((encontrado.span(), candidata, encontrado.group()))
+        if intencao is None or PRIORIDADE[candidata] < PRIORIDADE[intencao]:
+            intencao = candidata
+    if intencao is None:
+        return None
+
+    palavras_mensagem = texto.split()
+    comando = Comando(intencao, pergunta='?' in texto or palavras_mensagem[0] in PALAVRAS_PERGUNTA)
+    confirmar = PADRAO_CONFIRMAR.match(texto)
+    if confirmar:
+        comando.confirmado = True
+        trechos.append((confirmar.span(), intencao, None))
+    for (inicio, fim), grupo, palavra in trechos:
+        if intencao == 'deletar' and grupo != 'deletar':
+            continue  # "delete salário" procura "salário"
+        if not (intencao == 'entrada' and palavra in MANTER_NA_DESCRICAO):
+            texto = _apagar(texto, inicio, fim)
+
+    if intencao == 'deletar':
+        # Tudo o que sobra é o termo buscado ("delete uber 15/03" procura "uber 15/03")
+        comando.descricao = _descricao(texto)
+        return comando
+    if intencao not in ('gasto', 'entrada'):
+        return comando
+
+    data = PADRAO_DATA.search(texto)
+    if data:
+        comando.data = converter_data(data, agora)
+        texto = _apagar(texto, *data.span())
+
+    categoria = PADRAO_CATEGORIA.search(texto)
+    if categoria:
+        comando.categoria = categoria.group('categoria')
+        texto = _apagar(texto, *categoria.span())
+
+    valor, comando.valores_possiveis = _escolher_valor(texto)
+    if valor:
+        comando.valor = converter_valor(valor.group('numero'))
+        if valor.group('sinal'):
+            comando.valor = -comando.valor
+        texto = _apagar(texto, *valor.span())
+
+    descricao = _descricao(texto)
+    comando.descricao = descricao[:1].upper() + descricao[1:]
+    return comando
+
+
+def _descricao(texto):
+    """O que sobrou da mensagem, sem as palavras de ligação (nem pontuação solta) das pontas"""
+    palavras = [p.span() for p in PADRAO_PALAVRA.finditer(texto)
+                if p.group() not in PALAVRAS_LIGACAO and PADRAO_ALFANUMERICO.search(p.group())]
+    if not palavras:
+        return ''
+    # Ligações no meio da descrição ficam ("pão de queijo")
+    return ' '.join(texto[palavras[0][0]:palavras[-1][1]].split())
@@ -0,0 +1,202 @@
+# modelo_categorias.py
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from cache_lru import CacheLRU
+from database import transaction, execute_query
+from categorizacao import normalizar, categorizar_lote, CATEGORIA_PADRAO
+from versoes import incrementar_versao, versoes
+
+# Probabilidade mínima para aceitar a previsão do modelo (abaixo disso fica 'outros')
+CONFIANCA_MINIMA = float(os.environ.get('MODELO_CONFIANCA_MINIMA', 0.6))
+
+# Quantos estabelecimentos distintos ficam no cache de previsões
+TAMANHO_CACHE = int(os.environ.get('MODELO_CACHE_ESTABELECIMENTOS', 5000))
+
+# Intervalo entre verificações de um modelo retreinado por outro processo
+MODELO_TTL = float(os.environ.get('MODELO_TTL', 60))
+
+# Palavras com pelo menos duas letras; números (valores, datas, códigos) são ignorados
+PALAVRA = re.compile(r'[a-z]{2,}')
+
+
+def criar_tabela_modelos(tx):
+    """Modelos de categorização treinados, serializados em JSON"""
+    tx.execute('''CREATE TABLE IF NOT EXISTS modelos(
+        nome TEXT PRIMARY KEY,
+        conteudo TEXT NOT NULL,
+        treinado_em TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+
+def palavras(descricao):
+    return PALAVRA.findall(normalizar(descricao))
+
+
+def estabelecimento(descricao):
+    """Chave do cache: a descrição sem acentos, números e pontuação ('UBER *TRIP 1234' -> 'uber trip')"""
+    return ' '.join(palavras(descricao))
+
+
+class ModeloCategorias:
+    """Naive Bayes multinomial sobre as palavras da descrição"""
+
+    def __init__(self, vocabulario, categorias, log_prior, log_verossimilhanca):
+        self.vocabulario = vocabulario                    # palavra -> coluna
+        self.categorias = categorias                      # lista de nomes
+        self.log_prior = np.asarray(log_prior)             # (C,)
+        self.log_verossimilhanca = np.asarray(log_verossimilhanca)  # (V, C)
+
+    @classmethod
+    def treinar(cls, descricoes, categorias, alfa=1.0):
+        nomes = sorted(set(categorias))
+        indice_categoria = {nome: i for i, nome in enumerate(nomes)}
+        vocabulario = {}
+        linhas, colunas = [], []
+        for descricao, categoria in zip(descricoes, categorias):
+            for palavra in palavras(descricao):
+                linhas.append(indice_categoria[categoria])
+                colunas.append(vocabulario.setdefault(palavra, len(vocabulario)))
+
+        contagens = np.zeros((len(vocabulario), len(nomes)))
+        np.add.at(contagens, (np.array(colunas, dtype=np.intp), np.array(linhas, dtype=np.intp)), 1)
+
+        exemplos = np.bincount([indice_categoria[c] for c in categorias], minlength=len(nomes))
+        log_prior = np.log(exemplos / exemplos.sum())
+        suavizadas = contagens + alfa
+        log_verossimilhanca = np.log(suavizadas / suavizadas.sum(axis=0))
+        return cls(vocabulario, nomes, log_prior, log_verossimilhanca)
+
+    def prever_lote(self, descricoes):
+        """Categoria mais provável de cada descrição (None se o modelo não tiver confiança)"""
+        if not descricoes:
+            return []
+        linhas, colunas = [], []
+        for i, descricao in enumerate(descricoes):
+            for palavra in palavras(descricao):
+                coluna = self.vocabulario.get(palavra)
+                if coluna is not None:
+                    linhas.append(i)
+                    colunas.append(coluna)
+
+        # Soma de log-probabilidades de todas as descrições numa única operação
+        pontuacao = np.tile(self.log_prior, (len(descricoes), 1))
+        np.add.at(pontuacao, np.array(linhas, dtype=np.intp),
+                  self.log_verossimilhanca[np.array(colunas, dtype=np.intp)])
+
+        pontuacao -= pontuacao.max(axis=1, keepdims=True)
+        probabilidades = np.exp(pontuacao)
+        probabilidades /= probabilidades.sum(axis=1, keepdims=True)
+        melhores = probabilidades.argmax(axis=1)
+        confiancas = probabilidades[np.arange(len(descricoes)), melhores]
+
+        # Descrições sem nenhuma palavra conhecida ficariam só com o prior
+        conhecidas = np.zeros(len(descricoes), dtype=bool)
+        conhecidas[linhas] = True
+
+        return [self.categorias[melhor] if conhecida and confianca >= CONFIANCA_MINIMA else None
+                for melhor, confianca, conhecida in zip(melhores, confiancas, conhecidas)]
+
+    def para_json(self):
+        return json.dumps({
+            'vocabulario': self.vocabulario,
+            'categorias': self.categorias,
+            'log_prior': self.log_prior.tolist(),
+            'log_verossimilhanca': self.log_verossimilhanca.tolist()
+        })
+
+    @classmethod
+    def de_json(cls, conteudo):
+        dados = json.loads(conteudo)
+        return cls(dados['vocabulario'], dados['categorias'], dados['log_prior'], dados['log_verossimilhanca'])
+
+
+# estabelecimento -> categoria prevista, para não repetir a inferência
+cache_estabelecimentos = CacheLRU(TAMANHO_CACHE)
+
+_modelo = None
+_versao = None
+_verificado_em = 0.0
+_lock = threading.Lock()
+
+
+def obter_modelo():
+    """Modelo treinado mais recente (ou None), recarregado quando outro processo retreina.
+
+    Cada treino incrementa a versão de 'modelos' em versao_dados (ver versoes.py),
+    então dois treinos no mesmo segundo também são percebidos.
+    """
+    global _modelo, _versao, _verificado_em
+    with _lock:
+        if _verificado_em and time.monotonic() - _verificado_em < MODELO_TTL:
+            return _modelo
+        _verificado_em = time.monotonic()
+        versao = versoes(('modelos',))[0]
+        if versao != _versao:
+            conteudo = execute_query("SELECT conteudo FROM modelos WHERE nome = 'categorias'")
+            _modelo = ModeloCategorias.de_json(conteudo[0]['conteudo']) if conteudo else None
+            _versao = versao
+            cache_estabelecimentos.limpar()
+        return _modelo
+
+
+def treinar_modelo():
+    """Treina com os gastos já categorizados e grava o modelo. Retorna o número de exemplos."""
+    linhas = execute_query('''SELECT descricao, categoria FROM gastos
+                              WHERE categoria IS NOT NULL AND categoria NOT IN ('', ?)''',
+                           (CATEGORIA_PADRAO,))
+    exemplos = [(row['descricao'], row['categoria']) for row in linhas if palavras(row['descricao'])]
+    if len({categoria for _, categoria in exemplos}) < 2:
+        raise ValueError('São necessários gastos de pelo menos duas categorias para treinar')
+
+    modelo = ModeloCategorias.treinar([d for d, _ in exemplos], [c for _, c in exemplos])
+    with transaction() as tx:
+        tx.execute('''INSERT INTO modelos (nome, conteudo, treinado_em) VALUES ('categorias', ?, CURRENT_TIMESTAMP)
+                      ON CONFLICT (nome) DO UPDATE SET conteudo = excluded.conteudo,
+                                                       treinado_em = excluded.treinado_em''',
+                   (modelo.para_json(),))
+        incrementar_versao(tx, 'modelos')
+
+    global _verificado_em
+    with _lock:
+        _verificado_em = 0.0
+    print(f"✅ Modelo de categorias treinado: {len(exemplos)} exemplos, "
+          f"{len(modelo.vocabulario)} palavras, {len(modelo.categorias)} categorias")
+    return len(exemplos)
+
+
+def sugerir_categorias(descricoes):
+    """Categoria de cada descrição: regras do usuário primeiro, depois o modelo treinado"""
+    categorias = categorizar_lote(descricoes)
+    modelo = obter_modelo()
+    if modelo is None:
+        return categorias
+
+    pendentes = {}
+    for i, (descricao, categoria) in enumerate(zip(descricoes, categorias)):
+        if categoria != CATEGORIA_PADRAO:
+            continue
+        chave = estabelecimento(descricao)
+        encontrado, prevista = cache_estabelecimentos.obter(chave)
+        if encontrado:
+            categorias[i] = prevista or CATEGORIA_PADRAO
+        else:
+            pendentes.setdefault(chave, []).append(i)
+
+    if pendentes:
+        chaves = list(pendentes)
+        for chave, prevista in zip(chaves, modelo.prever_lote(chaves)):
+            cache_estabelecimentos.guardar(chave, prevista)
+            for i in pendentes[chave]:
+                categorias[i] = prevista or CATEGORIA_PADRAO
+
+    return categorias
+
+
+def sugerir_categoria(descricao):
+    return sugerir_categorias([descricao])[0]
@@ -0,0 +1,168 @@
+# previsao.py
+"""Projeção do saldo dia a dia para os próximos meses.
+
+Combina três fontes:
+  - histórico: quanto entra e sai, em média, em cada dia do mês (salário no
+    dia 5, aluguel no dia 10...), calculado sobre os últimos meses completos;
+  - despesas fixas: cobradas todo mês no DIA_FIXAS;
+  - dívidas: descontadas na data de vencimento.
+
+O resultado fica em cache por processo e só é recalculado quando a versão de
+alguma das tabelas usadas muda (ver versoes.py) ou quando o dia vira.
+"""
+import os
+import re
+from datetime import date
+
+import numpy as np
+
+from cache_lru import CacheLRU
+from database import execute_query
+from resumo import calcular_resumo
+from versoes import versoes
+
+# Meses completos de histórico usados para estimar entradas e gastos
+HISTORICO_MESES = int(os.environ.get('PREVISAO_HISTORICO_MESES', 6))
+
+# Dia do mês em que as despesas fixas são descontadas
+DIA_FIXAS = int(os.environ.get('PREVISAO_DIA_FIXAS', 1))
+
+MESES_MAXIMO = 24
+
+TABELAS_PREVISAO = ('entradas', 'gastos', 'dividas', 'fixas')
+
+TAMANHO_CACHE = 32
+
+VENCIMENTO = re.compile(r'^(\d{4})-(\d{2})-(\d{2})|^(\d{2})/(\d{2})/(\d{4})')
+
+
+def perfil_mensal(hoje):
+    """Média de entradas e de gastos em cada dia do mês (arrays de 31 posições)"""
+    fim = np.datetime64(hoje, 'M')              # mês atual (incompleto) fica de fora
+    inicio = fim - HISTORICO_MESES
+    linhas = execute_query('''
+        SELECT 0 AS tipo, SUBSTR(CAST(data AS TEXT), 1, 10) AS dia, COALESCE(SUM(valor), 0) AS total
+        FROM entradas WHERE data >= ? AND data < ? GROUP BY 2
+        UNION ALL
+        SELECT 1, SUBSTR(CAST(data AS TEXT), 1, 10), COALESCE(SUM(valor), 0)
+        FROM gastos WHERE data >= ? AND data < ? GROUP BY 2
+    ''', (f'{inicio}-01', f'{fim}-01') * 2)
+    if not linhas:
+        return np.zeros(31), np.zeros(31), 0
+
+    tipos = np.array([row['tipo'] for row in linhas], dtype=np.int8)
+    dias = np.array([row['dia'] for row in linhas], dtype='datetime64[D]')
+    totais = np.array([float(row['total']) for row in linhas])
+
+    # Meses sem nenhum movimento antes do primeiro registro não contam na média
+    primeiro = max(inicio, dias.min().astype('datetime64[M]'))
+    meses_observados = max(int((fim - primeiro).astype(int)), 1)
+
+    dia_do_mes = (dias - dias.astype('datetime64[M]')).astype(int)   # 0..30
+    entradas = np.bincount(dia_do_mes[tipos == 0], weights=totais[tipos == 0], minlength=31)
+    gastos = np.bincount(dia_do_mes[tipos == 1], weights=totais[tipos == 1], minlength=31)
+    return entradas / meses_observados, gastos / meses_observados, meses_observados
+
+
+def _vencimento(texto):
+    """Data de vencimento de uma dívida (YYYY-MM-DD ou DD/MM/YYYY), ou None"""
+    encontrado = VENCIMENTO.match((texto or '').strip())
+    if not encontrado:
+        return None
+    grupos = encontrado.groups()
+    ano, mes, dia = grupos[:3] if grupos[0] else (grupos[5], grupos[4], grupos[3])
+    try:
+        return date(int(ano), int(mes), int(dia))
+    except ValueError:
+        return None
+
+
+def calcular_previsao(meses=3, saldo_inicial=None, hoje=None):
+    """Saldo projetado para cada dia de hoje até o fim do horizonte de `meses` meses"""
+    hoje = hoje or date.today()
+    inicio = np.datetime64(hoje, 'D')
+    fim = (np.datetime64(hoje, 'M') + meses + 1).astype('datetime64[D]')   # exclusivo
+    dias = np.arange(inicio, fim)
+    if saldo_inicial is None:
+        # Sem as fixas: na projeção elas são descontadas mês a mês
+        resumo = calcular_resumo()
+        saldo_inicial = resumo['entradas'] - resumo['gastos']
+
+    # Histórico distribuído pelos dias do mês; dias 29-31 caem no último dia dos meses curtos
+    media_entradas, media_gastos, meses_observados = perfil_mensal(hoje)
+    inicio_mes = dias.astype('datetime64[M]')
+    ultimo_dia = ((inicio_mes + 1).astype('datetime64[D]') - inicio_mes.astype('datetime64[D]')).astype(int) - 1
+    dia_do_mes = (dias - inicio_mes.astype('datetime64[D]')).astype(int)
+    eh_ultimo = dia_do_mes == ultimo_dia
+    excedente_entradas = _excedente(media_entradas, ultimo_dia) * eh_ultimo
+    excedente_gastos = _excedente(media_gastos, ultimo_dia) * eh_ultimo
+    entradas = media_entradas[dia_do_mes] + excedente_entradas
+    saidas = media_gastos[dia_do_mes] + excedente_gastos
+
+    eventos = []
+
+    # Despesas fixas, todo mês no DIA_FIXAS (ou no último dia, em meses mais curtos)
+    fixas = execute_query('SELECT nome, valor FROM fixas')
+    total_fixas = sum(float(row['valor'] or 0) for row in fixas)
+    if total_fixas:
+        dia_fixas = np.minimum(DIA_FIXAS - 1, ultimo_dia)
+        cobranca = dia_do_mes == dia_fixas
+        saidas = saidas + cobranca * total_fixas
+        for dia in dias[cobranca]:
+            eventos.extend({'data': str(dia), 'tipo': 'fixa', 'descricao': row['nome'],
+                            'valor': float(row['valor'] or 0)} for row in fixas)
+
+    # Dívidas com vencimento dentro do horizonte
+    vencimentos, valores = [], []
+    for row in execute_query('SELECT descricao, valor, vencimento FROM dividas'):
+        vencimento = _vencimento(row['vencimento'])
+        if vencimento and hoje <= vencimento < fim.item():
+            vencimentos.append(vencimento)
+            valores.append(float(row['valor'] or 0))
+            eventos.append({'data': vencimento.isoformat(), 'tipo': 'divida',
+                            'descricao': row['descricao'], 'valor': float(row['valor'] or 0)})
+    if vencimentos:
+        posicoes = (np.array(vencimentos, dtype='datetime64[D]') - inicio).astype(int)
+        saidas = saidas + np.bincount(posicoes, weights=valores, minlength=dias.size)
+
+    saldo = saldo_inicial + np.cumsum(entradas - saidas)
+    menor = int(saldo.argmin())
+    negativos = np.flatnonzero(saldo < 0)
+    eventos.sort(key=lambda evento: evento['data'])
+
+    return {
+        'inicio': str(dias[0]),
+        'fim': str(dias[-1]),
+        'historico_meses': meses_observados,
+        'saldo_inicial': round(float(saldo_inicial), 2),
+        'dias': dias.astype(str).tolist(),
+        'entradas': np.round(entradas, 2).tolist(),
+        'saidas': np.round(saidas, 2).tolist(),
+        'saldo': np.round(saldo, 2).tolist(),
+        'saldo_final': round(float(saldo[-1]), 2),
+        'menor_saldo': {'data': str(dias[menor]), 'valor': round(float(saldo[menor]), 2)},
+        'primeiro_dia_negativo': str(dias[negativos[0]]) if negativos.size else None,
+        'eventos': eventos,
+    }
+
+
+def _excedente(media, ultimo_dia):
+    """Para cada dia, a soma da média dos dias do mês que não existem depois de `ultimo_dia`"""
+    depois = np.concatenate((np.cumsum(media[::-1])[::-1][1:], [0.0]))   # soma de media[d+1:]
+    return depois[ultimo_dia]
+
+
+# (meses, saldo_inicial, dia) -> previsão, válida para uma versão das tabelas
+cache_previsoes = CacheLRU(TAMANHO_CACHE)
+
+
+def obter_previsao(meses=3, saldo_inicial=None):
+    """Previsão em cache enquanto as tabelas usadas não mudarem (e no mesmo dia)"""
+    meses = min(max(int(meses), 1), MESES_MAXIMO)
+    chave = (meses, saldo_inicial, date.today())
+    versao = versoes(TABELAS_PREVISAO)
+    encontrado, previsao = cache_previsoes.obter(chave, versao)
+    if not encontrado:
+        previsao = calcular_previsao(meses, saldo_inicial, chave[2])
+        cache_previsoes.guardar(chave, previsao, versao)
+    return previsao
@@ -0,0 +1,171 @@
+# relatorios.py
+"""Relatórios mensais: séries, participação por categoria, médias móveis e variação mês a mês.
+
+Uma única consulta traz os totais de entradas e gastos por (mês, categoria)
+dentro do período; o resto é feito com arrays NumPy (matriz categoria x mês),
+então o custo não cresce com o número de meses nem de transações em Python.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from database import execute_query
+from resumo import filtro_datas
+from categorizacao import CATEGORIA_PADRAO
+
+# Meses cobertos quando nenhum período é informado
+MESES_PADRAO = 12
+
+# Janela padrão (em meses) das médias móveis
+JANELA_PADRAO = 3
+
+
+def periodo_padrao(hoje=None):
+    """Últimos MESES_PADRAO meses, incluindo o atual"""
+    hoje = hoje or date.today()
+    mes = np.datetime64(hoje.strftime('%Y-%m'), 'M') - (MESES_PADRAO - 1)
+    return f'{mes}-01', None
+
+
+def carregar_totais(periodo):
+    """Totais por (tipo, mês, categoria) do período: tipo 0 = entradas, 1 = gastos"""
+    where, params = filtro_datas(periodo)
+    linhas = execute_query(f'''
+        SELECT 0 AS tipo, SUBSTR(CAST(data AS TEXT), 1, 7) AS mes, '' AS categoria,
+               COALESCE(SUM(valor), 0) AS total
+        FROM entradas WHERE {where}
+        GROUP BY 2
+        UNION ALL
+        SELECT 1, SUBSTR(CAST(data AS TEXT), 1, 7), COALESCE(NULLIF(categoria, ''), ?), COALESCE(SUM(valor), 0)
+        FROM gastos WHERE {where}
+        GROUP BY 2, 3
+    ''', params + (CATEGORIA_PADRAO,) + params)
+    linhas = [row for row in linhas if row['mes']]
+    return (np.array([row['tipo'] for row in linhas], dtype=np.int8),
+            np.array([row['mes'] for row in linhas], dtype='datetime64[M]'),
+            np.array([row['categoria'] for row in linhas], dtype=object),
+            np.array([float(row['total']) for row in linhas], dtype=np.float64))
+
+
+def _limites_meses(periodo, meses):
+    """Primeiro e último mês do relatório (inclusive)"""
+    inicio, fim = periodo or (None, None)
+    hoje = np.datetime64(date.today().strftime('%Y-%m'), 'M')
+    if inicio:
+        primeiro = np.datetime64(inicio[:7], 'M')
+    else:
+        primeiro = meses.min() if meses.size else hoje
+    if fim:
+        # fim é exclusivo: o último mês é o do dia anterior
+        ultimo = np.datetime64((date.fromisoformat(fim[:10]) - timedelta(days=1)).strftime('%Y-%m'), 'M')
+    else:
+        ultimo = max(hoje, meses.max()) if meses.size else hoje
+    return primeiro, max(primeiro, ultimo)
+
+
+def media_movel(serie, janela):
+    """Média dos últimos `janela` meses; nos primeiros meses, dos que existirem"""
+    acumulado = np.concatenate(([0.0], np.cumsum(serie)))
+    posicoes = np.arange(1, serie.size + 1)
+    inicio = np.maximum(posicoes - janela, 0)
+    return (acumulado[posicoes] - acumulado[inicio]) / (posicoes - inicio)
+
+
+def variacao(serie):
+    """(diferença, variação percentual) em relação ao mês anterior; NaN onde não existe"""
+    anterior = np.concatenate(([np.nan], serie[:-1]))
+    diferenca = serie - anterior
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentual = np.where(anterior != 0, diferenca / np.abs(anterior) * 100, np.nan)
+    return diferenca, percentual
+
+
+def _lista(valores, casas=2):
+    # JSON não tem NaN: vira null
+    return [None if np.isnan(v) else round(float(v), casas) for v in valores]
+
+
+def gerar_relatorio(periodo=None, janela=JANELA_PADRAO):
+    """Relatório do período ((inicio, fim_exclusivo) como em resumo.intervalo_datas)"""
+    periodo = periodo or periodo_padrao()
+    tipos, meses, categorias, totais = carregar_totais(periodo)
+    primeiro, ultimo = _limites_meses(periodo, meses)
+    quantidade_meses = int((ultimo - primeiro).astype(int)) + 1
+
+    # Meses fora do intervalo (dados com data futura, por exemplo) ficam de fora
+    indice_mes = (meses - primeiro).astype(int)
+    dentro = (indice_mes >= 0) & (indice_mes < quantidade_meses)
+    tipos, indice_mes, categorias, totais = tipos[dentro], indice_mes[dentro], categorias[dentro], totais[dentro]
+
+    e_gasto = tipos == 1
+    entradas = np.bincount(indice_mes[~e_gasto], weights=totais[~e_gasto], minlength=quantidade_meses)
+    gastos = np.bincount(indice_mes[e_gasto], weights=totais[e_gasto], minlength=quantidade_meses)
+    saldo = entradas - gastos
+
+    nomes, indice_categoria = np.unique(categorias[e_gasto].astype(str), return_inverse=True)
+    por_categoria = np.zeros((nomes.size, quantidade_meses))
+    np.add.at(por_categoria, (indice_categoria, indice_mes[e_gasto]), totais[e_gasto])
+    total_categoria = por_categoria.sum(axis=1)
+    ordem = np.argsort(-total_categoria, kind='stable')
+    total_gastos = gastos.sum()
+    participacao = total_categoria / total_gastos * 100 if total_gastos else np.zeros(nomes.size)
+
+    variacao_entradas, percentual_entradas = variacao(entradas)
+    variacao_gastos, percentual_gastos = variacao(gastos)
+    rotulos = np.arange(primeiro, ultimo + 1).astype(str).tolist()
+
+    return {
+        'periodo': {'inicio': rotulos[0], 'fim': rotulos[-1]},
+        'meses': rotulos,
+        'entradas': _lista(entradas),
+        'gastos': _lista(gastos),
+        'saldo': _lista(saldo),
+        'media_movel': {
+            'janela': janela,
+            'entradas': _lista(media_movel(entradas, janela)),
+            'gastos': _lista(media_movel(gastos, janela)),
+        },
+        'variacao_mensal': {
+            'entradas': _lista(variacao_entradas),
+            'entradas_percentual': _lista(percentual_entradas, 1),
+            'gastos': _lista(variacao_gastos),
+            'gastos_percentual': _lista(percentual_gastos, 1),
+        },
+        'categorias': [
+            {'categoria': str(nomes[i]), 'total': round(float(total_categoria[i]), 2),
+             'participacao': round(float(participacao[i]), 1), 'mensal': _lista(por_categoria[i])}
+            for i in ordem
+        ],
+        'totais': {
+            'entradas': round(float(entradas.sum()), 2),
+            'gastos': round(float(total_gastos), 2),
+            'saldo': round(float(saldo.sum()), 2),
+            'media_mensal_gastos': round(float(gastos.mean()), 2),
+        },
+    }
+
+
+def _percentual(valor):
+    return '—' if valor is None else f'{valor:+.1f}%'
+
+
+def texto_relatorio(relatorio):
+    """Resumo do relatório em texto, para o chat"""
+    meses = relatorio['meses']
+    atual = len(meses) - 1
+    variacoes = relatorio['variacao_mensal']
+    linhas = [
+        f"📊 **Relatório {relatorio['periodo']['inicio']} a {relatorio['periodo']['fim']}**",
+        '',
+        f"📅 {meses[atual]}: 📥 R$ {relatorio['entradas'][atual]:.2f} "
+        f"({_percentual(variacoes['entradas_percentual'][atual])}) | "
+        f"📤 R$ {relatorio['gastos'][atual]:.2f} ({_percentual(variacoes['gastos_percentual'][atual])})",
+        f"📈 Média de gastos ({relatorio['media_movel']['janela']} meses): "
+        f"R$ {relatorio['media_movel']['gastos'][atual]:.2f}",
+        f"💰 Saldo do período: R$ {relatorio['totais']['saldo']:.2f}",
+    ]
+    if relatorio['categorias']:
+        linhas += ['', '🏷️ Maiores categorias:']
+        linhas += [f"• {item['categoria']}: R$ {item['total']:.2f} ({item['participacao']:.1f}%)"
+                   for item in relatorio['categorias'][:3]]
+    return '\n'.join(linhas)
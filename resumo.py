@@ -0,0 +1,115 @@
+# resumo.py
+import calendar
+import re
+from datetime import date, timedelta
+
+from database import execute_query
+
+FORMATO_DATA = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})')
+
+
+def _parse_data(texto):
+    """Converte YYYY-MM-DD em date, ajustando dias além do fim do mês (ex.: 2024-02-31)"""
+    match = FORMATO_DATA.match(texto.strip())
+    if not match:
+        raise ValueError(f'Data inválida: {texto}')
+    ano, mes, dia = (int(parte) for parte in match.groups())
+    if not 1 <= mes <= 12 or dia < 1:
+        raise ValueError(f'Data inválida: {texto}')
+    return date(ano, mes, min(dia, calendar.monthrange(ano, mes)[1]))
+
+
+def intervalo_datas(data_inicio=None, data_fim=None):
+    """Converte os filtros da requisição em (inicio, fim_exclusivo), ambos YYYY-MM-DD.
+
+    Retorna None quando nenhum filtro foi informado; os limites ausentes ficam None.
+    """
+    if not data_inicio and not data_fim:
+        return None
+    inicio = _parse_data(data_inicio).isoformat() if data_inicio else None
+    fim = (_parse_data(data_fim) + timedelta(days=1)).isoformat() if data_fim else None
+    return inicio, fim
+
+
+def filtro_datas(periodo, coluna='data'):
+    """Cláusula WHERE e parâmetros para filtrar `coluna` pelo período"""
+    if not periodo:
+        return '1=1', ()
+    inicio, fim = periodo
+    condicoes, params = [], []
+    if inicio:
+        condicoes.append(f'{coluna} >= ?')
+        params.append(inicio)
+    if fim:
+        condicoes.append(f'{coluna} < ?')
+        params.append(fim)
+    return ' AND '.join(condicoes), tuple(params)
+
+
+def _meses_inteiros(periodo):
+    """O período cobre só meses completos (pode ser respondido pelos agregados)?"""
+    return all(limite is None or limite.endswith('-01') for limite in periodo)
+
+
+def _linhas_saldos(periodo):
+    where, params = '1=1', ()
+    if periodo:
+        inicio, fim = periodo
+        where, params = filtro_datas((inicio and inicio[:7], fim and fim[:7]), 'mes')
+        # Despesas fixas não têm mês: valem para qualquer período
+        where = f"(tabela = 'fixas' OR ({where}))"
+    return execute_query(f'''SELECT tabela, categoria, SUM(total) AS total
+                             FROM saldos
+                             WHERE {where}
+                             GROUP BY tabela, categoria''', params)
+
+
+def _linhas_tabelas(periodo):
+    where, params = filtro_datas(periodo)
+    return execute_query(f'''
+        SELECT 'entradas' AS tabela, NULL AS categoria, COALESCE(SUM(valor), 0) AS total
+        FROM entradas WHERE {where}
+        UNION ALL
+        SELECT 'gastos', categoria, COALESCE(SUM(valor), 0)
+        FROM gastos WHERE {where} GROUP BY categoria
+        UNION ALL
+        SELECT 'dividas', NULL, COALESCE(SUM(valor), 0)
+        FROM dividas WHERE {where}
+        UNION ALL
+        SELECT 'fixas', NULL, COALESCE(SUM(valor), 0) FROM fixas
+    ''', params * 3)
+
+
+def calcular_resumo(periodo=None):
+    """Calcula todos os totais e os gastos por categoria, opcionalmente dentro de um período.
+
+    Períodos de meses inteiros (e o histórico completo) são lidos dos agregados em
+    `saldos`, com custo que não depende do número de transações. Outros períodos
+    usam uma única consulta às tabelas base, apoiada nos índices de `data`.
+    """
+    if periodo is None or _meses_inteiros(periodo):
+        linhas = _linhas_saldos(periodo)
+    else:
+        linhas = _linhas_tabelas(periodo)
+
+    totais = {'entradas': 0.0, 'gastos': 0.0, 'dividas': 0.0, 'fixas': 0.0}
+    gastos_por_categoria = {}
+
+    for row in linhas:
+        total = float(row['total'] or 0)
+        totais[row['tabela']] += total
+        if row['tabela'] == 'gastos':
+            categoria = row['categoria'] or 'outros'
+            gastos_por_categoria[categoria] = gastos_por_categoria.get(categoria, 0.0) + total
+
+    total_gastos = totais['gastos'] + totais['fixas']
+
+    return {
+        'entradas': totais['entradas'],
+        'gastos': totais['gastos'],
+        'dividas': totais['dividas'],
+        'fixas': totais['fixas'],
+        'total_gastos': total_gastos,
+        'saldo': totais['entradas'] - total_gastos,
+        'gastos_por_categoria': gastos_por_categoria
+    }
@@ -0,0 +1,109 @@
+# saldos.py
+from datetime import datetime, timezone
+
+from database import transaction
+from versoes import incrementar_versao
+
+# Tabelas de movimentos cujos totais ficam materializados em `saldos`
+TABELAS_MOVIMENTO = ('entradas', 'gastos', 'dividas')
+
+UPSERT_SALDO = '''INSERT INTO saldos (tabela, categoria, mes, total, quantidade)
+                  VALUES (?, ?, ?, ?, ?)
+                  ON CONFLICT (tabela, categoria, mes) DO UPDATE SET
+                      total = saldos.total + excluded.total,
+                      quantidade = saldos.quantidade + excluded.quantidade'''
+
+
+def criar_tabela_saldos(tx):
+    """Cria a tabela de agregados (por tabela, categoria e mês)"""
+    tx.execute('''CREATE TABLE IF NOT EXISTS saldos(
+        tabela TEXT NOT NULL,
+        categoria TEXT NOT NULL DEFAULT '',
+        mes TEXT NOT NULL DEFAULT '',
+        total REAL NOT NULL DEFAULT 0,
+        quantidade INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (tabela, categoria, mes)
+    )''')
+
+
+def mes_de(data):
+    """Mês (YYYY-MM) de uma data; None é o mês atual (DEFAULT CURRENT_TIMESTAMP)"""
+    if data is None:
+        return datetime.now(timezone.utc).strftime('%Y-%m')
+    if isinstance(data, datetime):
+        return data.strftime('%Y-%m')
+    return str(data)[:7]
+
+
+def registrar_movimentos(tx, tabela, movimentos):
+    """Soma movimentos (categoria, data, valor) aos agregados na transação `tx`"""
+    deltas = {}
+    for categoria, data, valor in movimentos:
+        chave = (categoria or '', mes_de(data))
+        total, quantidade = deltas.get(chave, (0.0, 0))
+        deltas[chave] = (total + float(valor or 0), quantidade + 1)
+
+    if deltas:
+        tx.executemany(UPSERT_SALDO, [
+            (tabela, categoria, mes, total, quantidade)
+            for (categoria, mes), (total, quantidade) in deltas.items()
+        ])
+        incrementar_versao(tx, tabela)
+
+
+def registrar_movimento(tx, tabela, categoria, data, valor):
+    registrar_movimentos(tx, tabela, [(categoria, data, valor)])
+
+
+def remover_movimentos(tx, tabela, where, params=()):
+    """Desconta dos agregados as linhas de `tabela` que casam com `where`.
+
+    Deve ser chamada na mesma transação, antes do DELETE com o mesmo filtro.
+    """
+    categoria = 'categoria' if tabela == 'gastos' else "''"
+    linhas = tx.execute(f'''SELECT COALESCE({categoria}, '') AS categoria,
+                                   COALESCE(SUBSTR(CAST(data AS TEXT), 1, 7), '') AS mes,
+                                   COALESCE(SUM(valor), 0) AS total,
+                                   COUNT(*) AS quantidade
+                            FROM {tabela} WHERE {where}
+                            GROUP BY 1, 2''', params)
+
+    if linhas:
+        tx.executemany(UPSERT_SALDO, [
+            (tabela, row['categoria'], row['mes'], -float(row['total']), -int(row['quantidade']))
+            for row in linhas
+        ])
+        tx.execute("DELETE FROM saldos WHERE tabela = ? AND quantidade <= 0", (tabela,))
+        incrementar_versao(tx, tabela)
+
+
+def definir_fixa(tx, nome, valor):
+    """Despesas fixas não são somadas: o agregado acompanha o valor atual"""
+    tx.execute('''INSERT INTO saldos (tabela, categoria, mes, total, quantidade)
+                  VALUES ('fixas', ?, '', ?, 1)
+                  ON CONFLICT (tabela, categoria, mes) DO UPDATE SET
+                      total = excluded.total,
+                      quantidade = 1''', (nome, valor))
+    incrementar_versao(tx, 'fixas')
+
+
+def reconciliar_saldos():
+    """Reconstrói os agregados a partir das tabelas base"""
+    with transaction() as tx:
+        tx.execute('DELETE FROM saldos')
+        for tabela in TABELAS_MOVIMENTO:
+            categoria = 'categoria' if tabela == 'gastos' else "''"
+            tx.execute(f'''INSERT INTO saldos (tabela, categoria, mes, total, quantidade)
+                           SELECT '{tabela}',
+                                  COALESCE({categoria}, ''),
+                                  COALESCE(SUBSTR(CAST(data AS TEXT), 1, 7), ''),
+                                  COALESCE(SUM(valor), 0),
+                                  COUNT(*)
+                           FROM {tabela}
+                           GROUP BY 2, 3''')
+        tx.execute('''INSERT INTO saldos (tabela, categoria, mes, total, quantidade)
+                      SELECT 'fixas', nome, '', COALESCE(valor, 0), 1 FROM fixas''')
+        # Os totais podem ter mudado: invalida os caches que dependem deles
+        for tabela in TABELAS_MOVIMENTO + ('fixas',):
+            incrementar_versao(tx, tabela)
+        return tx.execute('SELECT COUNT(*) AS linhas FROM saldos')[0]['linhas']
@@ -965,40 +965,33 @@ async function uploadComprovante() {
     btn.style.background = '#6c757d';
 
     try {
-        // Ler arquivo como base64
-        const reader = new FileReader();
-        reader.onload = async function(e) {
-            const arquivoBase64 = e.target.result;
-
-            const response = await fetch('/upload_comprovante', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({
-                    tipo: tipoComprovanteAtual,
-                    descricao: descricao,
-                    mes_ano: mesAno,
-                    arquivo_nome: arquivo.name,
-                    arquivo_dados: arquivoBase64
-                })
-            });
-
-            const data = await response.json();
-
-            if (data.ok) {
-                alert('✅ Comprovante salvo com sucesso!');
-                // Limpar campos
-                document.getElementById('comprovante_desc').value = '';
-                document.getElementById('comprovante_mes').value = '';
-                document.getElementById('comprovante_ano').value = '';
-                document.getElementById('comprovante_arquivo').value = '';
-
-                // Recarregar lista
-                carregarComprovantes();
-            } else {
-                alert('❌ Erro: ' + data.error);
-            }
-        };
-        reader.readAsDataURL(arquivo);
+        // Envia o arquivo como multipart (sem converter para base64)
+        const formData = new FormData();
+        formData.append('tipo', tipoComprovanteAtual);
+        formData.append('descricao', descricao);
+        formData.append('mes_ano', mesAno);
+        formData.append('arquivo', arquivo);
+
+        const response = await fetch('/upload_comprovante', {
+            method: 'POST',
+            body: formData
+        });
+
+        const data = await response.json();
+
+        if (data.ok) {
+            alert('✅ Comprovante salvo com sucesso!');
+            // Limpar campos
+            document.getElementById('comprovante_desc').value = '';
+            document.getElementById('comprovante_mes').value = '';
+            document.getElementById('comprovante_ano').value = '';
+            document.getElementById('comprovante_arquivo').value = '';
+
+            // Recarregar lista
+            carregarComprovantes();
+        } else {
+            alert('❌ Erro: ' + data.error);
+        }
 
     } catch (error) {
         console.error('❌ Erro no upload:', error);
@@ -1128,60 +1121,39 @@ async function uploadContracheque() {
     btn.style.background = '#6c757d';
 
     try {
-        // Ler arquivo como base64
-        const reader = new FileReader();
-        reader.onload = async function(e) {
-            const arquivoBase64 = e.target.result;
-
-            const response = await fetch('/upload_contracheque', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({
-                    mes: mes,
-                    arquivo_nome: arquivo.name,
-                    arquivo_dados: arquivoBase64
-                })
-            });
-
-            const data = await response.json();
-
-            if (data.ok) {
-                alert('✅ Contracheque salvo com sucesso!');
-
-                // 🆕 MOSTRAR ANÁLISE AUTOMÁTICA
-                if (data.analise) {
-                    console.log('📊 Análise automática:', data.analise);
-
-                    let mensagemAnalise = '📊 Análise Automática:\n';
-                    if (data.analise.data_detectada) {
-                        mensagemAnalise += `📅 Data: ${data.analise.data_detectada}\n`;
-                    }
-                    if (data.analise.valor_liquido) {
-                        mensagemAnalise += `💰 Líquido: R$ ${data.analise.valor_liquido.toFixed(2)}\n`;
-                    }
-                    if (data.analise.valor_bruto) {
-                        mensagemAnalise += `💵 Bruto: R$ ${data.analise.valor_bruto.toFixed(2)}\n`;
-                    }
-                    if (data.analise.erros && data.analise.erros.length > 0) {
-                        mensagemAnalise += `⚠️ Observações: ${data.analise.erros.join(', ')}\n`;
-                    }
+        // Envia o arquivo como multipart (sem converter para base64)
+        const formData = new FormData();
+        formData.append('mes', mes);
+        formData.append('arquivo', arquivo);
 
-                    alert(mensagemAnalise);
-                }
+        const response = await fetch('/upload_contracheque', {
+            method: 'POST',
+            body: formData
+        });
 
-                // Limpar campos
-                document.getElementById('contracheque_mes').value = '';
-                document.getElementById('contracheque_arquivo').value = '';
+        const data = await response.json();
 
-                // Recarregar lista
-                carregarTodosContracheques();
-            } else {
-                alert('❌ Erro: ' + data.error);
+        if (data.ok) {
+            alert('✅ Contracheque salvo com sucesso!');
+
+            // 🆕 MOSTRAR ANÁLISE AUTOMÁTICA (na hora, se o PDF já foi analisado antes)
+            if (data.analise) {
+                mostrarAnaliseContracheque(data.analise);
+            } else if (data.status_url) {
+                acompanharTarefa(data.status_url)
+                    .then(mostrarAnaliseContracheque)
+                    .catch(error => console.error('❌ Erro na análise do contracheque:', error));
             }
-        };
 
-        // 🔥 ESTA LINHA ESTAVA NO LUGAR ERRADO - mover para dentro do try
-        reader.readAsDataURL(arquivo);
+            // Limpar campos
+            document.getElementById('contracheque_mes').value = '';
+            document.getElementById('contracheque_arquivo').value = '';
+
+            // Recarregar lista
+            carregarTodosContracheques();
+        } else {
+            alert('❌ Erro: ' + data.error);
+        }
 
     } catch (error) {
         console.error('❌ Erro no upload:', error);
@@ -1195,6 +1167,49 @@ async function uploadContracheque() {
     }
 }
 
+function mostrarAnaliseContracheque(analise) {
+    if (!analise) {
+        return;
+    }
+    console.log('📊 Análise automática:', analise);
+
+    let mensagemAnalise = '📊 Análise Automática:\n';
+    if (analise.data_detectada) {
+        mensagemAnalise += `📅 Data: ${analise.data_detectada}\n`;
+    }
+    if (analise.valor_liquido) {
+        mensagemAnalise += `💰 Líquido: R$ ${analise.valor_liquido.toFixed(2)}\n`;
+    }
+    if (analise.valor_bruto) {
+        mensagemAnalise += `💵 Bruto: R$ ${analise.valor_bruto.toFixed(2)}\n`;
+    }
+    if (analise.erros && analise.erros.length > 0) {
+        mensagemAnalise += `⚠️ Observações: ${analise.erros.join(', ')}\n`;
+    }
+
+    alert(mensagemAnalise);
+}
+
+// Consulta o status de uma tarefa em segundo plano até ela terminar (ou até tempoMaximo ms)
+async function acompanharTarefa(statusUrl, intervalo = 1500, tempoMaximo = 10 * 60 * 1000) {
+    const limite = Date.now() + tempoMaximo;
+    while (true) {
+        if (Date.now() > limite) {
+            throw new Error('Tempo esgotado aguardando a tarefa em segundo plano');
+        }
+        const response = await fetch(statusUrl);
+        const tarefa = await response.json();
+
+        if (tarefa.status === 'concluida') {
+            return tarefa.resultado;
+        }
+        if (tarefa.status === 'erro' || tarefa.error) {
+            throw new Error(tarefa.erro || tarefa.error);
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalo));
+    }
+}
+
 async function carregarTodosContracheques() {
     try {
         const response = await fetch('/listar_contracheques/todos');
@@ -0,0 +1,95 @@
+# stub_itau.py
+"""Servidor local que imita os endpoints de contas/transações do Open Banking do Itaú.
+
+Uso:
+    python stub_itau.py
+    ITAU_BASE_URL=http://localhost:5001 ITAU_AUTH_URL=http://localhost:5001 python app.py
+
+Variáveis: STUB_CONTAS, STUB_TRANSACOES_POR_CONTA, STUB_LATENCIA (segundos por
+requisição) e STUB_TAXA_ERRO (fração de respostas 429/503, para testar os retries).
+"""
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask, request, jsonify
+
+stub = Flask(__name__)
+
+CONTAS = int(os.environ.get('STUB_CONTAS', 3))
+TRANSACOES_POR_CONTA = int(os.environ.get('STUB_TRANSACOES_POR_CONTA', 50))
+LATENCIA = float(os.environ.get('STUB_LATENCIA', 0.2))
+TAXA_ERRO = float(os.environ.get('STUB_TAXA_ERRO', 0.0))
+
+NOMES = ['Supermercado Extra', 'Uber Trip', 'Netflix', 'Farmacia Pague Menos',
+         'Posto Shell', 'Salario Empresa', 'Pix Recebido', 'Padaria Central']
+
+
+def _transacoes_da_conta(account_id):
+    """Transações determinísticas por conta, distribuídas nos últimos 90 dias"""
+    gerador = random.Random(account_id)
+    hoje = datetime.now().date()
+    transacoes = []
+    for i in range(TRANSACOES_POR_CONTA):
+        nome = gerador.choice(NOMES)
+        credito = nome.startswith(('Salario', 'Pix'))
+        transacoes.append({
+            'transactionId': f'{account_id}-{i}',
+            'transactionName': nome,
+            'amount': round(gerador.uniform(5, 500), 2),
+            'creditDebitType': 'CREDIT' if credito else 'DEBIT',
+            'bookingDate': (hoje - timedelta(days=gerador.randint(0, 90))).isoformat()
+        })
+    return transacoes
+
+
+@stub.before_request
+def simular_rede():
+    time.sleep(LATENCIA)
+    if TAXA_ERRO and random.random() < TAXA_ERRO:
+        status = random.choice([429, 503])
+        resposta = jsonify({'errors': [{'code': str(status)}]})
+        resposta.headers['Retry-After'] = '1'
+        return resposta, status
+
+
+@stub.route('/token', methods=['POST'])
+def token():
+    return jsonify({
+        'access_token': f'stub-{random.getrandbits(64):x}',
+        'refresh_token': f'stub-refresh-{random.getrandbits(64):x}',
+        'expires_in': 300
+    })
+
+
+@stub.route('/open-banking/accounts/v1/accounts')
+def contas():
+    return jsonify({'data': {'brand': {'accounts': [
+        {'accountId': f'conta-{i}'} for i in range(CONTAS)
+    ]}}})
+
+
+@stub.route('/open-banking/accounts/v1/accounts/<account_id>/transactions')
+def transacoes(account_id):
+    inicio = request.args.get('fromBookingDate', '')
+    fim = request.args.get('toBookingDate', '9999-12-31')
+    selecionadas = [t for t in _transacoes_da_conta(account_id) if inicio <= t['bookingDate'] <= fim]
+
+    # Paginação no formato do Open Banking Brasil (page/page-size, links.next, meta.totalPages)
+    pagina = request.args.get('page', 1, type=int)
+    tamanho = request.args.get('page-size', 25, type=int)
+    total_paginas = max(1, -(-len(selecionadas) // tamanho))
+    corpo = {
+        'data': {'transactions': selecionadas[(pagina - 1) * tamanho:pagina * tamanho]},
+        'links': {},
+        'meta': {'totalRecords': len(selecionadas), 'totalPages': total_paginas}
+    }
+    if pagina < total_paginas:
+        corpo['links']['next'] = (f"{request.base_url}?fromBookingDate={inicio}&toBookingDate={fim}"
+                                  f"&page={pagina + 1}&page-size={tamanho}")
+    return jsonify(corpo)
+
+
+if __name__ == '__main__':
+    stub.run(host='127.0.0.1', port=int(os.environ.get('STUB_PORT', 5001)), threaded=True)
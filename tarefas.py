@@ -0,0 +1,204 @@
+# tarefas.py
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from database import transaction, execute_query, add_column
+
+# Intervalo entre consultas à fila quando não há tarefas pendentes
+INTERVALO_FILA = float(os.environ.get('TAREFAS_INTERVALO', 2))
+
+# Uma tarefa 'executando' sem sinal de vida há mais que isso é de um worker que
+# morreu (crash, redeploy) e volta para a fila
+TIMEOUT_TAREFA = float(os.environ.get('TAREFAS_TIMEOUT', 300))
+
+# Quantas vezes uma tarefa abandonada é reexecutada antes de ser marcada como erro
+MAX_TENTATIVAS = int(os.environ.get('TAREFAS_MAX_TENTATIVAS', 3))
+
+# tipo -> função que executa a tarefa
+_handlers = {}
+
+
+def criar_tabela_tarefas(tx):
+    """Fila de tarefas em segundo plano (importações, extrações de PDF...)"""
+    tx.execute('''CREATE TABLE IF NOT EXISTS tarefas(
+        id SERIAL PRIMARY KEY,
+        tipo TEXT NOT NULL,
+        parametros TEXT,
+        status TEXT NOT NULL DEFAULT 'pendente',
+        progresso INTEGER DEFAULT 0,
+        total INTEGER,
+        mensagem TEXT,
+        resultado TEXT,
+        erro TEXT,
+        criado_em TEXT DEFAULT CURRENT_TIMESTAMP,
+        iniciado_em TEXT,
+        concluido_em TEXT
+    )''')
+    # Sinal de vida do worker que executa a tarefa (UTC, YYYY-MM-DD HH:MM:SS)
+    add_column(tx, 'tarefas', 'atualizado_em', 'TEXT')
+    add_column(tx, 'tarefas', 'tentativas', 'INTEGER DEFAULT 0')
+    tx.execute('CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas(status, id)')
+
+
+def tarefa(tipo):
+    """Registra a função que executa as tarefas de um tipo.
+
+    A função recebe um Progresso e os parâmetros passados para enfileirar();
+    o que ela retornar (serializável em JSON) vira o resultado da tarefa.
+    """
+    def registrar(funcao):
+        _handlers[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def enfileirar(tipo, **parametros):
+    """Cria uma tarefa pendente e retorna o seu id"""
+    if tipo not in _handlers:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+    with transaction() as tx:
+        tarefa_id = tx.insert('INSERT INTO tarefas (tipo, parametros) VALUES (?, ?)',
+                              (tipo, json.dumps(parametros)))
+    print(f"📥 Tarefa {tarefa_id} ({tipo}) enfileirada")
+    return tarefa_id
+
+
+def obter(tarefa_id):
+    """Status, progresso e resultado de uma tarefa (ou None)"""
+    linhas = execute_query('''SELECT id, tipo, status, progresso, total, mensagem, resultado, erro,
+                                     criado_em, iniciado_em, concluido_em
+                              FROM tarefas WHERE id = ?''', (tarefa_id,))
+    if not linhas:
+        return None
+    dados = dict(linhas[0])
+    dados['resultado'] = json.loads(dados['resultado']) if dados['resultado'] else None
+    return dados
+
+
+def _agora(segundos_atras=0):
+    # Texto comparável nas duas bases (a coluna é TEXT)
+    return (datetime.now(timezone.utc) - timedelta(seconds=segundos_atras)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def em_andamento(tipo):
+    """Id de uma tarefa do tipo ainda pendente ou em execução (ou None).
+
+    Tarefas 'executando' abandonadas (sem sinal de vida há TIMEOUT_TAREFA) não contam.
+    """
+    linhas = execute_query('''SELECT id FROM tarefas
+                              WHERE tipo = ? AND (status = 'pendente'
+                                    OR (status = 'executando' AND atualizado_em >= ?))
+                              ORDER BY id LIMIT 1''', (tipo, _agora(TIMEOUT_TAREFA)))
+    return linhas[0]['id'] if linhas else None
+
+
+def sinalizar(tarefa_id):
+    """Renova o sinal de vida da tarefa em execução"""
+    execute_query("UPDATE tarefas SET atualizado_em = ? WHERE id = ? AND status = 'executando'",
+                  (_agora(), tarefa_id))
+
+
+class Progresso:
+    """Permite à tarefa em execução informar quanto já foi feito"""
+
+    def __init__(self, tarefa_id, intervalo=1.0):
+        self.tarefa_id = tarefa_id
+        self.intervalo = intervalo
+        self._ultima_gravacao = 0.0
+
+    def atualizar(self, progresso, total=None, mensagem=None, forcar=False):
+        # Grava no máximo uma vez por `intervalo` segundos para não competir com a tarefa
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_gravacao < self.intervalo:
+            return
+        self._ultima_gravacao = agora
+        execute_query('''UPDATE tarefas SET progresso = ?, total = COALESCE(?, total),
+                                            mensagem = COALESCE(?, mensagem), atualizado_em = ?
+                         WHERE id = ?''', (progresso, total, mensagem, _agora(), self.tarefa_id))
+
+
+def _recuperar_abandonadas(tx):
+    """Devolve à fila (ou marca como erro) as tarefas de workers que pararam de dar sinal"""
+    limite = _agora(TIMEOUT_TAREFA)
+    abandonadas = "status = 'executando' AND (atualizado_em IS NULL OR atualizado_em < ?)"
+    falhas = tx.execute(f'''UPDATE tarefas SET status = 'erro', concluido_em = CURRENT_TIMESTAMP,
+                                                  erro = 'Worker interrompido durante a execução'
+                            WHERE {abandonadas} AND COALESCE(tentativas, 0) >= ?''', (limite, MAX_TENTATIVAS))
+    devolvidas = tx.execute(f"UPDATE tarefas SET status = 'pendente' WHERE {abandonadas}", (limite,))
+    if falhas or devolvidas:
+        print(f"⚠️ Tarefas abandonadas: {devolvidas} devolvida(s) à fila, {falhas} marcada(s) como erro")
+
+
+def _reservar_proxima():
+    """Marca a tarefa pendente mais antiga como em execução.
+
+    O UPDATE condicional garante que, com vários workers, só um fica com ela.
+    """
+    while True:
+        with transaction() as tx:
+            _recuperar_abandonadas(tx)
+            candidatas = tx.execute('''SELECT id, tipo, parametros FROM tarefas
+                                       WHERE status = 'pendente' ORDER BY id LIMIT 1''')
+            if not candidatas:
+                return None
+            candidata = dict(candidatas[0])
+            reservada = tx.execute('''UPDATE tarefas SET status = 'executando', iniciado_em = CURRENT_TIMESTAMP,
+                                                       atualizado_em = ?, tentativas = COALESCE(tentativas, 0) + 1
+                                      WHERE id = ? AND status = 'pendente' ''', (_agora(), candidata['id']))
+        if reservada == 1:
+            return candidata
+
+
+def _manter_viva(tarefa_id, terminou):
+    # Tarefas que passam muito tempo sem chamar progresso.atualizar() continuam reservadas
+    while not terminou.wait(TIMEOUT_TAREFA / 3):
+        try:
+            sinalizar(tarefa_id)
+        except Exception as e:
+            print(f"⚠️ Sinal de vida da tarefa {tarefa_id} falhou: {e}")
+
+
+def executar_tarefa(candidata):
+    tarefa_id, tipo = candidata['id'], candidata['tipo']
+    print(f"⚙️ Executando tarefa {tarefa_id} ({tipo})")
+    terminou = threading.Event()
+    threading.Thread(target=_manter_viva, args=(tarefa_id, terminou), daemon=True,
+                     name=f'tarefa-{tarefa_id}-sinal').start()
+    try:
+        parametros = json.loads(candidata['parametros'] or '{}')
+        resultado = _handlers[tipo](Progresso(tarefa_id), **parametros)
+        execute_query('''UPDATE tarefas SET status = 'concluida', resultado = ?, concluido_em = CURRENT_TIMESTAMP
+                         WHERE id = ?''', (json.dumps(resultado, ensure_ascii=False, default=str), tarefa_id))
+        print(f"✅ Tarefa {tarefa_id} concluída")
+    except Exception as e:
+        traceback.print_exc()
+        execute_query('''UPDATE tarefas SET status = 'erro', erro = ?, concluido_em = CURRENT_TIMESTAMP
+                         WHERE id = ?''', (str(e), tarefa_id))
+        print(f"❌ Tarefa {tarefa_id} falhou: {e}")
+    finally:
+        terminou.set()
+
+
+def executar_worker(parar=None, uma_vez=False):
+    """Consome a fila até `parar` ser sinalizado (ou até esvaziá-la, com uma_vez=True)"""
+    parar = parar or threading.Event()
+    print(f"👷 Worker de tarefas iniciado (pid {os.getpid()})")
+    while not parar.is_set():
+        candidata = _reservar_proxima()
+        if candidata is None:
+            if uma_vez:
+                return
+            parar.wait(INTERVALO_FILA)
+            continue
+        executar_tarefa(candidata)
+
+
+def iniciar_worker_embutido():
+    """Roda o worker numa thread do próprio processo web (para planos sem processo separado)"""
+    thread = threading.Thread(target=executar_worker, daemon=True, name='worker-tarefas')
+    thread.start()
+    return thread
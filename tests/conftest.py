@@ -0,0 +1,23 @@
+# tests/conftest.py
+import pytest
+
+import database
+import modelo_categorias
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Banco SQLite vazio em tmp_path, com todas as tabelas criadas pelo init_db() do app"""
+    monkeypatch.setattr(database, 'USE_POSTGRES', False)
+    monkeypatch.setattr(database, 'SQLITE_FILE', str(tmp_path / 'financas.db'))
+    monkeypatch.setattr(database, '_pool', None)
+    # O modelo de categorias fica em cache por processo: começa sem nenhum
+    monkeypatch.setattr(modelo_categorias, '_modelo', None)
+    monkeypatch.setattr(modelo_categorias, '_versao', None)
+    monkeypatch.setattr(modelo_categorias, '_verificado_em', 0.0)
+    modelo_categorias.cache_estabelecimentos.limpar()
+
+    import app   # noqa: F401 - a primeira importação já roda init_db() neste banco
+    app.init_db()
+    yield database
+    database.get_pool().closeall()
@@ -0,0 +1,49 @@
+# tests/test_armazenamento.py
+import io
+
+import pytest
+
+import armazenamento
+from armazenamento import receber_stream, guardar_recebido, salvar_bytes, remover_se_orfao, existe
+from database import transaction
+
+
+@pytest.fixture(autouse=True)
+def diretorio(banco, tmp_path, monkeypatch):
+    monkeypatch.setattr(armazenamento, 'DIRETORIO', str(tmp_path / 'arquivos'))
+
+
+def _inserir_contracheque(arquivo_hash):
+    with transaction() as tx:
+        tx.execute("INSERT INTO contracheques (mes, arquivo_nome, arquivo_hash) VALUES ('2026-01', 'a.pdf', ?)",
+                   (arquivo_hash,))
+
+
+def test_arquivo_referenciado_nao_e_removido():
+    arquivo_hash, _ = salvar_bytes(b'conteudo')
+    _inserir_contracheque(arquivo_hash)
+    assert not remover_se_orfao(arquivo_hash)
+    assert existe(arquivo_hash)
+
+
+def test_arquivo_orfao_e_removido():
+    arquivo_hash, _ = salvar_bytes(b'conteudo')
+    assert remover_se_orfao(arquivo_hash)
+    assert not existe(arquivo_hash)
+
+
+def test_upload_do_mesmo_conteudo_sobrevive_a_remocao_concorrente():
+    arquivo_hash, _ = salvar_bytes(b'conteudo')       # arquivo de uma linha que acabou de ser excluída
+    recebido = receber_stream(io.BytesIO(b'conteudo'))
+    assert remover_se_orfao(arquivo_hash)             # remoção entre o upload e o INSERT
+    with transaction() as tx:
+        guardar_recebido(tx, recebido)
+        tx.execute("INSERT INTO contracheques (mes, arquivo_nome, arquivo_hash) VALUES ('2026-01', 'b.pdf', ?)",
+                   (arquivo_hash,))
+    assert existe(arquivo_hash)
+
+
+def test_arquivo_muito_grande_nao_deixa_temporario(tmp_path):
+    with pytest.raises(armazenamento.ArquivoMuitoGrande):
+        receber_stream(io.BytesIO(b'x' * 20), tamanho_maximo=10)
+    assert list((tmp_path / 'arquivos').iterdir()) == []
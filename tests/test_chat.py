@@ -0,0 +1,28 @@
+# tests/test_chat.py
+import pytest
+
+from database import execute_query
+
+
+@pytest.fixture
+def cliente(banco):
+    import app
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize('mensagem', ['gastei 0 no mercado', 'gastei -50 no mercado', 'recebi -100 de salário'])
+def test_valor_nao_positivo_nao_e_gravado(cliente, mensagem):
+    resposta = cliente.post('/chat', json={'msg': mensagem}).get_json()
+    assert 'maior que zero' in resposta['resposta']
+    assert execute_query('SELECT COUNT(*) AS n FROM gastos')[0]['n'] == 0
+    assert execute_query('SELECT COUNT(*) AS n FROM entradas')[0]['n'] == 0
+
+
+def test_deletar_entrada_pelo_nome(cliente):
+    cliente.post('/chat', json={'msg': 'recebi salário 3500'})
+    previa = cliente.post('/chat', json={'msg': 'deletar salário'}).get_json()['resposta']
+    assert 'Encontrei 1 item' in previa
+    codigo = previa.rsplit(' ', 1)[-1]
+    resposta = cliente.post('/chat', json={'msg': f'confirmar delete {codigo}'}).get_json()['resposta']
+    assert '1 item(ns)' in resposta
+    assert execute_query('SELECT COUNT(*) AS n FROM entradas')[0]['n'] == 0
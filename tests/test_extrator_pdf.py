@@ -0,0 +1,50 @@
+# tests/test_extrator_pdf.py
+import pytest
+
+from extrator_pdf import analisar_linha_extrato, corrigir_virada_de_ano
+
+
+@pytest.mark.parametrize('linha, esperado', [
+    ('05/03 PIX RECEBIDO JOAO 1.500,00', ('PIX RECEBIDO JOAO', 1500.0, 'CREDIT', '2026-03-05')),
+    ('05/03 SUPERMERCADO BOM -234,90', ('SUPERMERCADO BOM', 234.9, 'DEBIT', '2026-03-05')),
+    ('06/03 UBER TRIP 18,40 D 1.246,70', ('UBER TRIP', 18.4, 'DEBIT', '2026-03-06')),
+    ('07/03/25 TARIFA PACOTE 39,90-', ('TARIFA PACOTE', 39.9, 'DEBIT', '2025-03-07')),
+    ('08/03/2024 RENDIMENTO POUPANCA 2,15 C', ('RENDIMENTO POUPANCA', 2.15, 'CREDIT', '2024-03-08')),
+])
+def test_linha_de_transacao(linha, esperado):
+    transacao = analisar_linha_extrato(linha, 2026)
+    assert (transacao['transactionName'], transacao['amount'],
+            transacao['creditDebitType'], transacao['bookingDate']) == esperado
+
+
+@pytest.mark.parametrize('linha', [
+    '05/03 SALDO ANTERIOR 1.000,00',
+    '05/03 Saldo do dia 765,10',
+    'EXTRATO CONTA CORRENTE - MARÇO 2026',
+    '05/03 SEM VALOR',
+])
+def test_linhas_ignoradas(linha):
+    assert analisar_linha_extrato(linha, 2026) is None
+
+
+def _transacoes(datas, ano=2025):
+    return [analisar_linha_extrato(f'{data} COMPRA 10,00 D', ano) for data in datas]
+
+
+def test_virada_de_ano_dezembro_para_janeiro():
+    transacoes = _transacoes(['28/12', '30/12', '02/01', '15/01'])
+    assert corrigir_virada_de_ano(transacoes, 2025) == (2026, 1)
+    assert [t['bookingDate'] for t in transacoes] == ['2025-12-28', '2025-12-30', '2026-01-02', '2026-01-15']
+
+
+def test_virada_de_ano_entre_lotes():
+    primeiro, segundo = _transacoes(['31/12']), _transacoes(['01/01', '03/01'])
+    anterior = corrigir_virada_de_ano(primeiro, 2025)
+    corrigir_virada_de_ano(segundo, 2025, anterior)
+    assert [t['bookingDate'] for t in primeiro + segundo] == ['2025-12-31', '2026-01-01', '2026-01-03']
+
+
+def test_linhas_com_ano_e_extrato_de_um_mes_nao_mudam():
+    transacoes = _transacoes(['05/03', '20/03']) + [analisar_linha_extrato('02/01/2024 TARIFA 5,00 D', 2025)]
+    corrigir_virada_de_ano(transacoes, 2025)
+    assert [t['bookingDate'] for t in transacoes] == ['2025-03-05', '2025-03-20', '2024-01-02']
@@ -0,0 +1,55 @@
+# tests/test_importacao_itau.py
+from database import execute_query
+import importacao_itau
+from importacao_itau import importar_lote
+
+TRANSACOES = [
+    {'transactionId': 't1', 'transactionName': 'SALARIO', 'amount': 3000.0,
+     'creditDebitType': 'CREDIT', 'bookingDate': '2026-01-05'},
+    {'transactionId': 't2', 'transactionName': 'MERCADO', 'amount': 120.0,
+     'creditDebitType': 'DEBIT', 'bookingDate': '2026-01-06'},
+    # Sem transactionId e idênticas: as duas são gravadas (a ordem entra na chave)
+    {'transactionName': 'CAFE', 'amount': 8.0, 'creditDebitType': 'DEBIT', 'bookingDate': '2026-01-07'},
+    {'transactionName': 'CAFE', 'amount': 8.0, 'creditDebitType': 'DEBIT', 'bookingDate': '2026-01-07'},
+]
+
+
+def _totais():
+    return {row['tabela']: (round(row['total'], 2), row['quantidade'])
+            for row in execute_query('SELECT tabela, SUM(total) AS total, SUM(quantidade) AS quantidade '
+                                     'FROM saldos GROUP BY tabela')}
+
+
+def test_importa_lote_e_atualiza_saldos(banco):
+    resumos, estatisticas = importar_lote(TRANSACOES, conta='123')
+    assert len(resumos) == 4
+    assert estatisticas['linhas'] == 4
+    assert estatisticas['duplicadas'] == 0
+    assert estatisticas['ultima_data'] == '2026-01-07'
+    assert _totais() == {'entradas': (3000.0, 1), 'gastos': (136.0, 3)}
+
+
+def test_reimportar_nao_duplica(banco):
+    importar_lote(TRANSACOES, conta='123')
+    resumos, estatisticas = importar_lote(TRANSACOES, conta='123')
+    assert resumos == []
+    assert estatisticas['linhas'] == 0
+    assert estatisticas['duplicadas'] == 4
+    assert execute_query('SELECT COUNT(*) AS n FROM gastos')[0]['n'] == 3
+    assert _totais() == {'entradas': (3000.0, 1), 'gastos': (136.0, 3)}
+
+
+def test_mesma_transacao_em_outra_conta_e_importada(banco):
+    importar_lote(TRANSACOES[:1], conta='123')
+    resumos, _ = importar_lote(TRANSACOES[:1], conta='456')
+    assert len(resumos) == 1
+
+
+def test_importacao_concorrente_nao_soma_duas_vezes(banco, monkeypatch):
+    importar_lote(TRANSACOES, conta='123')
+    # Outro processo gravou o lote entre a checagem de chaves e o INSERT deste
+    monkeypatch.setattr(importacao_itau, '_chaves_existentes', lambda tx, chaves: set())
+    resumos, estatisticas = importar_lote(TRANSACOES, conta='123')
+    assert resumos == []
+    assert estatisticas['duplicadas'] == 4
+    assert _totais() == {'entradas': (3000.0, 1), 'gastos': (136.0, 3)}
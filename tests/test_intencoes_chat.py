@@ -0,0 +1,92 @@
+# tests/test_intencoes_chat.py
+from datetime import datetime, timezone
+
+import pytest
+
+from intencoes_chat import interpretar
+
+AGORA = datetime(2026, 3, 20, 15, 0, tzinfo=timezone.utc)
+
+
+def test_gasto_com_valor_data_e_categoria():
+    comando = interpretar('gastei R$ 1.234,56 na tv ontem categoria casa', AGORA)
+    assert comando.intencao == 'gasto'
+    assert comando.valor == 1234.56
+    assert comando.data == '2026-03-19 15:00:00'
+    assert comando.categoria == 'casa'
+    assert comando.descricao == 'Tv'
+
+
+def test_entrada_mantem_palavra_chave_na_descricao():
+    comando = interpretar('recebi salário 3500', AGORA)
+    assert comando.intencao == 'entrada'
+    assert comando.valor == 3500.0
+    assert comando.descricao == 'Salário'
+
+
+def test_data_sem_ano_no_futuro_e_do_ano_anterior():
+    comando = interpretar('gastei 80 no presente 15/12', AGORA)
+    assert comando.data == '2025-12-15 12:00:00'
+
+
+def test_quantidade_nao_vira_valor():
+    comando = interpretar('comprei 2 pizzas por 80', AGORA)
+    assert comando.valor == 80.0
+    assert comando.descricao == '2 pizzas'
+
+
+@pytest.mark.parametrize('mensagem', ['quanto gastei no mercado?', 'gastei 50 no mercado?'])
+def test_pergunta_nao_e_lancamento(mensagem):
+    assert interpretar(mensagem, AGORA).pergunta
+
+
+def test_varios_numeros_sem_valor_claro():
+    comando = interpretar('gastei 50 no 99', AGORA)
+    assert comando.valor is None
+    assert comando.valores_possiveis == (50.0, 99.0)
+
+
+def test_deletar_tem_prioridade_sobre_gasto():
+    comando = interpretar('delete gasto uber', AGORA)
+    assert comando.intencao == 'deletar'
+    assert not comando.confirmado
+
+
+def test_mensagem_sem_intencao():
+    assert interpretar('bom dia', AGORA) is None
+
+
+@pytest.mark.parametrize('mensagem, termo', [
+    ('deletar salário', 'salário'),
+    ('excluir entrada 10', 'entrada 10'),
+    ('apagar receita do freela', 'receita do freela'),
+    ('delete resumo mensal', 'resumo mensal'),
+    ('delete gasto uber 15/03', 'gasto uber 15/03'),
+])
+def test_deletar_busca_o_texto_inteiro(mensagem, termo):
+    comando = interpretar(mensagem, AGORA)
+    assert comando.intencao == 'deletar'
+    assert comando.descricao == termo
+
+
+def test_confirmar_deletar_traz_o_codigo():
+    comando = interpretar('confirmar delete ab12cd34', AGORA)
+    assert comando.confirmado
+    assert comando.descricao == 'ab12cd34'
+
+
+@pytest.mark.parametrize('mensagem, valor', [
+    ('gastei 0 no mercado', 0.0),
+    ('gastei -50 no mercado', -50.0),
+    ('gastei R$ -20 no bar', -20.0),
+])
+def test_valor_zero_ou_negativo_e_mantido_para_ser_recusado(mensagem, valor):
+    comando = interpretar(mensagem, AGORA)
+    assert comando.valor == valor
+    assert comando.descricao in ('Mercado', 'Bar')
+
+
+def test_hifen_solto_nao_entra_na_descricao():
+    comando = interpretar('gastei uber - 25', AGORA)
+    assert comando.valor == 25.0
+    assert comando.descricao == 'Uber'
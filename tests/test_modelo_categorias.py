@@ -0,0 +1,42 @@
+# tests/test_modelo_categorias.py
+import pytest
+
+import modelo_categorias
+from database import transaction
+from modelo_categorias import ModeloCategorias, treinar_modelo, obter_modelo, sugerir_categorias
+from versoes import incrementar_versao
+
+# Descrições que as regras padrão de categorizacao.py não cobrem
+GASTOS = [('PETZ LOJA 1234', 'pets'), ('COBASI RACAO', 'pets'), ('PETZ BANHO TOSA', 'pets'),
+          ('RENNER MODA', 'vestuario'), ('RIACHUELO CALCA', 'vestuario'), ('RENNER CAMISA', 'vestuario')]
+
+
+@pytest.fixture
+def gastos(banco):
+    with transaction() as tx:
+        tx.executemany("INSERT INTO gastos (descricao, categoria, valor) VALUES (?, ?, 10)", GASTOS)
+
+
+def test_naive_bayes_preve_pelas_palavras():
+    modelo = ModeloCategorias.treinar([d for d, _ in GASTOS], [c for _, c in GASTOS])
+    assert modelo.prever_lote(['petz', 'renner camisa', 'posto shell']) == ['pets', 'vestuario', None]
+
+
+def test_treinar_e_sugerir(gastos):
+    assert treinar_modelo() == len(GASTOS)
+    assert sugerir_categorias(['PETZ *ONLINE 9876', 'RENNER SHOPPING 12', 'UBER TRIP']) == \
+        ['pets', 'vestuario', 'transporte']   # regras primeiro, modelo na falta delas
+
+
+def test_retreino_no_mesmo_segundo_e_recarregado(gastos, monkeypatch):
+    treinar_modelo()
+    assert obter_modelo().categorias == ['pets', 'vestuario']
+
+    # Outro processo grava um modelo novo sem mudar treinado_em
+    novo = ModeloCategorias.treinar(['academia', 'show'], ['esporte', 'cultura'])
+    with transaction() as tx:
+        tx.execute("UPDATE modelos SET conteudo = ? WHERE nome = 'categorias'", (novo.para_json(),))
+        incrementar_versao(tx, 'modelos')
+
+    monkeypatch.setattr(modelo_categorias, '_verificado_em', 0.0)   # MODELO_TTL expirou
+    assert obter_modelo().categorias == ['cultura', 'esporte']
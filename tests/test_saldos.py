@@ -0,0 +1,54 @@
+# tests/test_saldos.py
+from database import execute_query, transaction
+from saldos import registrar_movimentos, remover_movimentos, definir_fixa, reconciliar_saldos
+from versoes import versoes
+
+
+def _saldos():
+    return {(row['tabela'], row['categoria'], row['mes']): (round(row['total'], 2), row['quantidade'])
+            for row in execute_query('SELECT * FROM saldos')}
+
+
+def _inserir_gastos(gastos):
+    with transaction() as tx:
+        tx.executemany('INSERT INTO gastos (descricao, categoria, valor, data) VALUES (?, ?, ?, ?)', gastos)
+        registrar_movimentos(tx, 'gastos', [(categoria, data, valor) for _, categoria, valor, data in gastos])
+
+
+def test_registrar_soma_por_categoria_e_mes(banco):
+    _inserir_gastos([('mercado', 'alimentação', 100.0, '2026-01-10'),
+                     ('padaria', 'alimentação', 20.5, '2026-01-15'),
+                     ('uber', 'transporte', 30.0, '2026-02-01')])
+    assert _saldos() == {('gastos', 'alimentação', '2026-01'): (120.5, 2),
+                         ('gastos', 'transporte', '2026-02'): (30.0, 1)}
+
+
+def test_remover_desconta_e_apaga_grupos_vazios(banco):
+    _inserir_gastos([('mercado', 'alimentação', 100.0, '2026-01-10'),
+                     ('uber', 'transporte', 30.0, '2026-02-01')])
+    with transaction() as tx:
+        remover_movimentos(tx, 'gastos', 'descricao = ?', ('uber',))
+        tx.execute('DELETE FROM gastos WHERE descricao = ?', ('uber',))
+    assert _saldos() == {('gastos', 'alimentação', '2026-01'): (100.0, 1)}
+
+
+def test_escritas_incrementam_a_versao(banco):
+    antes = versoes(('gastos', 'fixas'))
+    _inserir_gastos([('mercado', 'alimentação', 100.0, '2026-01-10')])
+    with transaction() as tx:
+        definir_fixa(tx, 'aluguel', 1500.0)
+    depois = versoes(('gastos', 'fixas'))
+    assert depois[0] == antes[0] + 1
+    assert depois[1] == antes[1] + 1
+
+
+def test_reconciliar_reconstroi_e_invalida_caches(banco):
+    _inserir_gastos([('mercado', 'alimentação', 100.0, '2026-01-10')])
+    # Escrita por fora dos helpers: os agregados ficam desatualizados até reconciliar
+    execute_query("INSERT INTO gastos (descricao, categoria, valor, data) VALUES ('feira', 'alimentação', 50, '2026-01-20')")
+    antes = versoes(('entradas', 'gastos', 'dividas', 'fixas'))
+
+    reconciliar_saldos()
+
+    assert _saldos() == {('gastos', 'alimentação', '2026-01'): (150.0, 2)}
+    assert all(depois > anterior for anterior, depois in zip(antes, versoes(('entradas', 'gastos', 'dividas', 'fixas'))))
@@ -0,0 +1,87 @@
+# tests/test_tokens_bancarios.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import tokens_bancarios
+from database import execute_query
+from tokens_bancarios import TokenCache
+
+
+class ClienteFalso:
+    """Cliente da API que conta as renovações e responde com `resultado`"""
+
+    def __init__(self, resultado=True):
+        self.resultado = resultado
+        self.renovacoes = 0
+
+    def __call__(self):
+        return self
+
+    def refresh_access_token(self, refresh_token):
+        self.renovacoes += 1
+        if self.resultado:
+            self.access_token = f'novo-{self.renovacoes}'
+            self.refresh_token = f'refresh-{self.renovacoes}'
+            self.token_expires = datetime.now() + timedelta(hours=1)
+        return self.resultado
+
+
+@pytest.fixture
+def cliente(banco):
+    return ClienteFalso()
+
+
+def _cache_com_token(cliente, expira_em):
+    cache = TokenCache({'itau': cliente})
+    cache.salvar('itau', 'atual', 'refresh-0', datetime.now() + expira_em)
+    return cache
+
+
+def test_token_expirado_e_renovado_e_gravado(cliente):
+    cache = _cache_com_token(cliente, timedelta(seconds=-1))
+    token = cache.obter('itau')
+    assert token['access_token'] == 'novo-1'
+    assert cliente.renovacoes == 1
+    assert TokenCache({'itau': cliente}).obter('itau')['access_token'] == 'novo-1'
+
+
+def test_falha_espera_antes_de_tentar_de_novo(cliente, monkeypatch):
+    cliente.resultado = False
+    cache = _cache_com_token(cliente, timedelta(seconds=-1))
+    assert cache.obter('itau') is None
+    assert cache.obter('itau') is None
+    assert cliente.renovacoes == 1
+
+    monkeypatch.setattr(tokens_bancarios, 'ESPERA_APOS_FALHA', 0)
+    cliente.resultado = True
+    assert cache.obter('itau')['access_token'] == 'novo-2'
+
+
+def test_falha_em_segundo_plano_nao_dispara_outra_thread(cliente, monkeypatch):
+    cliente.resultado = False
+    cache = _cache_com_token(cliente, timedelta(seconds=60))   # dentro da margem de renovação
+    threads = []
+
+    class ThreadImediata:
+        def __init__(self, target, daemon):
+            threads.append(target)
+
+        def start(self):
+            threads[-1]()
+
+    monkeypatch.setattr(tokens_bancarios.threading, 'Thread', ThreadImediata)
+    for _ in range(3):
+        assert cache.obter('itau')['access_token'] == 'atual'
+    assert len(threads) == 1
+    assert cliente.renovacoes == 1
+
+
+def test_usa_token_renovado_por_outro_processo(cliente):
+    cache = _cache_com_token(cliente, timedelta(seconds=-1))
+    # Outro processo renovou e gravou um token novo no banco
+    execute_query('''INSERT INTO bancos_tokens (banco, access_token, refresh_token, expires_at)
+                     VALUES ('itau', 'de-outro-processo', 'refresh-x', ?)''',
+                  ((datetime.now() + timedelta(hours=1)).isoformat(),))
+    assert cache.obter('itau')['access_token'] == 'de-outro-processo'
+    assert cliente.renovacoes == 0
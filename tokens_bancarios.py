@@ -0,0 +1,147 @@
+# tokens_bancarios.py
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import transaction, execute_query, add_column
+
+# Antecedência com que um token é renovado antes de expirar
+MARGEM_RENOVACAO = timedelta(seconds=int(os.environ.get('TOKEN_MARGEM_RENOVACAO', 300)))
+
+# Depois de uma renovação que falhou, quantos segundos esperar antes de tentar de novo
+ESPERA_APOS_FALHA = float(os.environ.get('TOKEN_ESPERA_APOS_FALHA', 60))
+
+
+def criar_tabela_tokens(tx):
+    """Coluna do refresh_token e índice da busca pelo token mais recente do banco"""
+    add_column(tx, 'bancos_tokens', 'refresh_token', 'TEXT')
+    tx.execute('CREATE INDEX IF NOT EXISTS idx_bancos_tokens_banco ON bancos_tokens(banco, id)')
+
+
+class TokenCache:
+    """Cache em memória dos tokens de acesso por banco, persistido em bancos_tokens.
+
+    Tokens perto de expirar são renovados em segundo plano (o token atual
+    continua sendo usado); tokens já expirados são renovados na hora. Chamadas
+    simultâneas para o mesmo banco compartilham uma única renovação, também
+    entre processos (web e worker), e depois de uma falha ninguém tenta de
+    novo por ESPERA_APOS_FALHA segundos.
+    """
+
+    def __init__(self, criar_clientes):
+        # banco -> função que cria o cliente da API daquele banco
+        self.criar_clientes = criar_clientes
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._renovacoes = {}
+        self._falhas = {}   # banco -> time.monotonic() da última renovação que falhou
+
+    def salvar(self, banco, access_token, refresh_token, expires_at):
+        execute_query('''INSERT INTO bancos_tokens (banco, access_token, refresh_token, expires_at)
+                         VALUES (?, ?, ?, ?)''',
+                      (banco, access_token, refresh_token, expires_at.isoformat()))
+        token = {'access_token': access_token, 'refresh_token': refresh_token, 'expires_at': expires_at}
+        with self._lock:
+            self._tokens[banco] = token
+        return token
+
+    def _carregar(self, banco):
+        linhas = execute_query('''SELECT access_token, refresh_token, expires_at FROM bancos_tokens
+                                  WHERE banco = ? ORDER BY id DESC LIMIT 1''', (banco,))
+        if not linhas:
+            return None
+        token = dict(linhas[0])
+        token['expires_at'] = datetime.fromisoformat(str(token['expires_at']))
+        return token
+
+    def obter(self, banco):
+        """Token válido do banco ou None (sem token ou sem como renová-lo)"""
+        with self._lock:
+            token = self._tokens.get(banco)
+        if token is None:
+            token = self._carregar(banco)
+            if token is None:
+                return None
+            with self._lock:
+                token = self._tokens.setdefault(banco, token)
+
+        agora = datetime.now()
+        if agora >= token['expires_at']:
+            token = self._renovar(banco, token)
+        elif agora >= token['expires_at'] - MARGEM_RENOVACAO:
+            self._renovar_em_segundo_plano(banco, token)
+
+        if token is None or datetime.now() >= token['expires_at']:
+            return None
+        return token
+
+    def _lock_renovacao(self, banco):
+        with self._lock:
+            return self._renovacoes.setdefault(banco, threading.Lock())
+
+    def _em_espera(self, banco):
+        """True se a última renovação do banco falhou há menos de ESPERA_APOS_FALHA segundos"""
+        with self._lock:
+            falhou_em = self._falhas.get(banco)
+        return falhou_em is not None and time.monotonic() - falhou_em < ESPERA_APOS_FALHA
+
+    def _renovar(self, banco, token_visto):
+        with self._lock_renovacao(banco):
+            with self._lock:
+                atual = self._tokens.get(banco)
+            if atual is not None and atual is not token_visto:
+                # Outra thread já renovou enquanto esperávamos
+                return atual
+            if self._em_espera(banco):
+                return token_visto
+
+            with transaction() as tx:
+                # Trava o token mais recente do banco até o fim da renovação, para outro
+                # processo esperar aqui em vez de gastar o mesmo refresh_token (o UPDATE
+                # sem mudança trava a linha no PostgreSQL e o banco inteiro no SQLite)
+                tx.execute('''UPDATE bancos_tokens SET refresh_token = refresh_token
+                              WHERE id = (SELECT MAX(id) FROM bancos_tokens WHERE banco = ?)''', (banco,))
+
+                # Outro processo pode ter renovado (e invalidado o refresh_token que temos)
+                do_banco = self._carregar(banco)
+                if do_banco and do_banco['expires_at'] > token_visto['expires_at']:
+                    with self._lock:
+                        self._tokens[banco] = do_banco
+                    if datetime.now() < do_banco['expires_at'] - MARGEM_RENOVACAO:
+                        return do_banco
+                    token_visto = do_banco
+
+                if not token_visto.get('refresh_token'):
+                    print(f"❌ Token de {banco} sem refresh_token: é preciso reconectar")
+                    return token_visto
+
+                cliente = self.criar_clientes[banco]()
+                renovado = False
+                try:
+                    renovado = cliente.refresh_access_token(token_visto['refresh_token'])
+                finally:
+                    with self._lock:
+                        if renovado:
+                            self._falhas.pop(banco, None)
+                        else:
+                            self._falhas[banco] = time.monotonic()
+                if not renovado:
+                    print(f"⏸️ Renovação do token de {banco} falhou; nova tentativa em {ESPERA_APOS_FALHA:.0f}s")
+                    return token_visto
+
+                print(f"🔄 Token de {banco} renovado")
+                return self.salvar(banco, cliente.access_token, cliente.refresh_token, cliente.token_expires)
+
+    def _renovar_em_segundo_plano(self, banco, token_visto):
+        lock = self._lock_renovacao(banco)
+        if lock.locked() or self._em_espera(banco):
+            return  # renovação já em andamento, ou falhou há pouco
+
+        def renovar():
+            try:
+                self._renovar(banco, token_visto)
+            except Exception as e:
+                print(f"❌ Erro ao renovar token de {banco}: {e}")
+
+        threading.Thread(target=renovar, daemon=True).start()
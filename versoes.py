@@ -0,0 +1,35 @@
+# versoes.py
+"""Contador de versão por tabela, incrementado na mesma transação de cada escrita.
+
+Caches de resultados derivados (previsão, respostas do dashboard) guardam as
+versões das tabelas que leram e só recalculam quando alguma delas muda.
+Quem chama incrementar_versao():
+  - registrar_movimentos / remover_movimentos / definir_fixa (saldos.py),
+    usados por toda inserção e exclusão em entradas, gastos, dívidas e fixas;
+  - reconciliar_saldos, que reconstrói os agregados e incrementa todas;
+  - treinar_modelo (modelo_categorias.py), na versão de 'modelos'.
+Uma nova escrita nessas tabelas que não passe por esses helpers precisa
+chamar incrementar_versao() na mesma transação.
+"""
+from database import execute_query
+
+
+def criar_tabela_versoes(tx):
+    tx.execute('''CREATE TABLE IF NOT EXISTS versao_dados(
+        tabela TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0
+    )''')
+
+
+def incrementar_versao(tx, tabela):
+    tx.execute('''INSERT INTO versao_dados (tabela, versao) VALUES (?, 1)
+                  ON CONFLICT (tabela) DO UPDATE SET versao = versao_dados.versao + 1''', (tabela,))
+
+
+def versoes(tabelas):
+    """Versão atual de cada tabela, na ordem pedida (0 se nunca foi alterada)"""
+    marcadores = ', '.join('?' * len(tabelas))
+    linhas = execute_query(f'SELECT tabela, versao FROM versao_dados WHERE tabela IN ({marcadores})',
+                           tuple(tabelas))
+    atuais = {row['tabela']: int(row['versao']) for row in linhas}
+    return tuple(atuais.get(tabela, 0) for tabela in tabelas)